@@ -0,0 +1,140 @@
+"""
+Benchmark di concorrenza delle letture della dashboard: N sessioni simulate (thread, come le
+sessioni di Streamlit) eseguono le query di una visita alle pagine della dashboard senza cache
+dei risultati, con una connessione nuova per query (comportamento precedente) oppure con il
+pool di connessioni in sola lettura (src/db_pool.py). Con `--writer` un caricamento completo
+viene ripetuto in parallelo per misurare la contesa con le scritture dell'ETL.
+
+Uso (dalla directory principale del progetto):
+    python -m benchmarks.bench_dashboard --rows 200000 --sessions 8
+    python -m benchmarks.bench_dashboard --rows 200000 --sessions 8 --writer
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from benchmarks import synthetic_data
+from src import config
+from src import dashboard_queries
+from src.db_pool import ReadOnlyConnectionPool
+from src.main_pipeline import ETLPipelineOrchestrator
+
+def session_queries(page):
+    """
+    Query di una visita alle pagine della dashboard: (nome, funzione, argomenti). Il boxplot è
+    escluso perché dominato dal calcolo in SQLite (il pool non ne cambia il costo).
+    """
+    return [
+        ('conteggio', dashboard_queries.count_rows, ()),
+        ('pagina', dashboard_queries.read_page, (page, 100)),
+        ('riepilogo_reparto', pd.read_sql_query, ("SELECT reparto, numero_dipendenti FROM analisi_per_reparto ORDER BY reparto",)),
+        ('riepilogo_eta', pd.read_sql_query, ("SELECT fascia_eta, numero_dipendenti FROM analisi_per_fascia_eta ORDER BY fascia_eta",)),
+        ('riepilogo_anzianita', pd.read_sql_query, ("SELECT * FROM analisi_per_anzianita ORDER BY anzianita",)),
+        ('fasce_stipendio', dashboard_queries.group_counts, ('fascia_stipendio',)),
+        ('istogramma', dashboard_queries.salary_histogram, (20,)),
+    ]
+
+class NewConnectionPerQuery:
+    """Comportamento precedente della dashboard: una connessione aperta e chiusa per ogni query."""
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=config.SQLITE_READ_TIMEOUT)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+def run_query(source, function, args):
+    with source.connection() as conn:
+        if function is pd.read_sql_query:
+            return function(args[0], conn)
+        return function(conn, *args)
+
+def run_sessions(source, sessions, visits, num_pages):
+    """
+    Esegue `visits` visite per ciascuna delle `sessions` sessioni concorrenti.
+    Returns:
+        float: Tempo totale.
+        dict: Nome della query -> latenze (secondi).
+    """
+    latencies = [{} for _ in range(sessions)]
+    barrier = threading.Barrier(sessions + 1)
+
+    def session(index):
+        rng = np.random.default_rng(index)
+        barrier.wait()
+        for _ in range(visits):
+            for name, function, args in session_queries(int(rng.integers(1, num_pages + 1))):
+                start = time.perf_counter()
+                run_query(source, function, args)
+                latencies[index].setdefault(name, []).append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(index,)) for index in range(sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, {name: np.concatenate([session[name] for session in latencies]) for name in latencies[0]}
+
+def writer_loop(pipeline, stop):
+    """Ripete il caricamento completo dei dati già trasformati finché `stop` non è impostato."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        while not stop.is_set():
+            pipeline.loader.load_data(pipeline.transformed_data, statistics=pipeline.group_statistics)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000, help="Numero di righe sintetiche.")
+    parser.add_argument('--sessions', type=int, default=8, help="Sessioni concorrenti simulate.")
+    parser.add_argument('--visits', type=int, default=20, help="Visite a tutte le pagine per sessione.")
+    parser.add_argument('--writer', action='store_true', help="Caricamento completo ripetuto in parallelo alle letture.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_path = os.path.join(work_dir, 'input.csv')
+        db_path = os.path.join(work_dir, 'output.db')
+        synthetic_data.write_csv(input_path, args.rows)
+        pipeline = ETLPipelineOrchestrator(input_path, db_path, os.path.join(work_dir, 'visualizzazioni'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline.run_etl()
+        num_pages = -(-len(pipeline.transformed_data) // 100)
+
+        print(f"Benchmark letture dashboard su {args.rows} righe: {args.sessions} sessioni x {args.visits} visite"
+              f"{' con caricamenti concorrenti' if args.writer else ''}:")
+        pool = ReadOnlyConnectionPool(db_path, size=args.sessions)
+        results = {}
+        for name, source in (('connessione per query', NewConnectionPerQuery(db_path)), ('pool', pool)):
+            stop = threading.Event()
+            writer = threading.Thread(target=writer_loop, args=(pipeline, stop)) if args.writer else None
+            if writer:
+                writer.start()
+            try:
+                elapsed, latencies = run_sessions(source, args.sessions, args.visits, num_pages)
+            finally:
+                stop.set()
+                if writer:
+                    writer.join()
+            results[name] = elapsed
+            all_latencies = np.concatenate(list(latencies.values()))
+            p50, p95, p99 = np.percentile(all_latencies, [50, 95, 99]) * 1000
+            print(f"- {name}: {len(all_latencies) / elapsed:,.0f} query/s, latenza p50 {p50:.2f} ms, "
+                  f"p95 {p95:.2f} ms, p99 {p99:.2f} ms")
+            for query_name, values in latencies.items():
+                print(f"    - {query_name}: p50 {np.percentile(values, 50) * 1000:.2f} ms")
+        pool.close()
+    print(f"Speedup pool: {results['connessione per query'] / results['pool']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark di estrazione + conversione dei tipi: lettura CSV di pandas seguita dalle
+conversioni della trasformazione (pd.to_numeric sull'età, pd.to_datetime sulla data
+di assunzione) rispetto ai lettori tipizzati di DataExtractor (CSV con motore pyarrow,
+Parquet, Arrow IPC), che convertono una sola volta in lettura secondo config.INPUT_SCHEMA.
+
+Uso (dalla directory principale del progetto):
+    python -m benchmarks.bench_extraction --rows 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from src import config
+from src.data_extraction import DataExtractor
+
+def make_data(rows, seed=42):
+    """Genera un DataFrame sintetico con le colonne del file di input."""
+    rng = np.random.default_rng(seed)
+    hire_dates = pd.Timestamp('2024-01-01') - pd.to_timedelta(rng.integers(0, 30 * 365, size=rows), unit='D')
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'nome': rng.choice(['Mario', 'Laura', 'Giuseppe', 'Anna'], size=rows),
+        'cognome': rng.choice(['Rossi', 'Bianchi', 'Verdi', 'Russo'], size=rows),
+        'eta': rng.integers(18, 66, size=rows),
+        'stipendio': np.round(rng.uniform(25000, 90000, size=rows), 2),
+        'data_assunzione': hire_dates.strftime('%Y-%m-%d'),
+        'reparto': rng.choice(['Vendite', 'Marketing', 'Sviluppo', 'Risorse Umane', 'Amministrazione'], size=rows),
+    })
+
+def legacy_extract(path):
+    """Lettura CSV con inferenza dei tipi e conversioni nella trasformazione (implementazione precedente)."""
+    df = pd.read_csv(path)
+    df[config.AGE_COLUMN] = pd.to_numeric(df[config.AGE_COLUMN], errors='coerce')
+    df[config.HIRE_DATE_COLUMN] = pd.to_datetime(df[config.HIRE_DATE_COLUMN], errors='coerce')
+    return df
+
+def typed_extract(path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DataExtractor(path).extract_data()[0]
+
+def timed(func, path, repeat):
+    """Restituisce il miglior tempo su `repeat` esecuzioni e il risultato dell'ultima."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Numero di righe sintetiche.")
+    parser.add_argument('--repeat', type=int, default=3, help="Ripetizioni per misura (si usa la migliore).")
+    args = parser.parse_args()
+
+    df = make_data(args.rows)
+    print(f"Benchmark estrazione + conversione dei tipi su {args.rows} righe (migliore di {args.repeat}):")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {ext: os.path.join(tmp_dir, f'input{ext}') for ext in ('.csv', '.parquet', '.arrow')}
+        df.to_csv(paths['.csv'], index=False)
+        typed = df.assign(data_assunzione=pd.to_datetime(df['data_assunzione']))
+        typed.to_parquet(paths['.parquet'], index=False)
+        feather.write_feather(pa.Table.from_pandas(typed, preserve_index=False), paths['.arrow'])
+
+        legacy_time, legacy_result = timed(legacy_extract, paths['.csv'], args.repeat)
+        print(f"- CSV pandas + coercizione (precedente): {legacy_time:.3f}s")
+        for label, ext in (('CSV pyarrow tipizzato', '.csv'), ('Parquet', '.parquet'), ('Arrow IPC', '.arrow')):
+            elapsed, result = timed(typed_extract, paths[ext], args.repeat)
+            pd.testing.assert_frame_equal(legacy_result, result.astype({config.DEPARTMENT_COLUMN: legacy_result[config.DEPARTMENT_COLUMN].dtype}),
+                                          check_dtype=False)
+            print(f"- {label}: {elapsed:.3f}s (speedup {legacy_time / elapsed:.1f}x)")
+
+if __name__ == "__main__":
+    main()
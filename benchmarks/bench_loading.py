@@ -0,0 +1,81 @@
+"""
+Benchmark del caricamento in SQLite: DataFrame.to_sql rispetto al caricamento massivo
+di DataLoader (schema esplicito, executemany a lotti in un'unica transazione, pragma
+di config.SQLITE_PRAGMAS, indici creati dopo l'inserimento). Il tempo del caricamento
+massivo include la creazione degli indici, che `to_sql` non crea.
+
+Uso (dalla directory principale del progetto):
+    python -m benchmarks.bench_loading --rows 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.data_loading import DataLoader
+
+def make_data(rows, seed=42):
+    """Genera un DataFrame sintetico con le colonne della tabella `dipendenti` trasformata."""
+    rng = np.random.default_rng(seed)
+    departments = np.array(['IT', 'HR', 'Vendite', 'Marketing', 'Finanza'])
+    age = rng.integers(18, 66, size=rows)
+    salary = np.round(rng.uniform(25000, 90000, size=rows), 2)
+    years = np.round(rng.uniform(0, 30, size=rows), 1)
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'nome': rng.choice(['Mario', 'Laura', 'Giuseppe', 'Anna'], size=rows),
+        'cognome': rng.choice(['Rossi', 'Bianchi', 'Verdi', 'Russo'], size=rows),
+        'eta': age,
+        'stipendio': salary,
+        'data_assunzione': pd.Timestamp('2024-01-01') - pd.to_timedelta(np.round(years * 365.25), unit='D'),
+        'reparto': rng.choice(departments, size=rows),
+        'anni_di_servizio': years,
+        'stipendio_orario': np.round(salary / 2080, 2),
+        'fascia_eta': pd.cut(age, bins=[0, 30, 45, 100], labels=['Giovane', 'Adulto', 'Senior']).astype(str),
+        'fascia_stipendio': np.where(salary < 40000, 'Basso', np.where(salary < 60000, 'Medio', 'Alto')),
+        'bonus': np.where(years < 2, 500, np.where(years < 5, 1000, 2000)),
+        'anzianita': np.where(years < 2, 'Junior', np.where(years < 5, 'Intermedio', 'Senior')),
+        'valutazione_stipendio': rng.choice(['Sopra Media', 'Nella Media', 'Sotto Media'], size=rows),
+    })
+
+def timed_load(df, db_path, method):
+    """Carica `df` in un database nuovo e restituisce il tempo impiegato."""
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    loader = DataLoader(db_path)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        loader.load_data(df, method=method)
+    return time.perf_counter() - start
+
+def read_table(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return pd.read_sql_query('SELECT * FROM dipendenti ORDER BY id', conn)
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Numero di righe sintetiche.")
+    parser.add_argument('--repeat', type=int, default=3, help="Ripetizioni per misura (si usa la migliore).")
+    args = parser.parse_args()
+
+    df = make_data(args.rows)
+    print(f"Benchmark caricamento SQLite su {args.rows} righe (migliore di {args.repeat}):")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for method in ('to_sql', 'bulk'):
+            db_path = os.path.join(tmp_dir, f'{method}.db')
+            results[method] = min(timed_load(df, db_path, method) for _ in range(args.repeat))
+            if method == 'bulk':
+                pd.testing.assert_frame_equal(read_table(os.path.join(tmp_dir, 'to_sql.db')), read_table(db_path))
+            print(f"- {method}: {results[method]:.3f}s ({args.rows / results[method]:,.0f} righe/s)")
+    print(f"Speedup caricamento massivo: {results['to_sql'] / results['bulk']:.1f}x")
+
+if __name__ == "__main__":
+    main()
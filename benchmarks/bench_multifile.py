@@ -0,0 +1,73 @@
+"""
+Benchmark dell'estrazione da più file (una directory di export, come quelli degli uffici
+regionali): lettura sequenziale con concatenazioni ripetute (come unire i file a mano)
+rispetto a DataExtractor su una directory, con un solo thread e con il numero di thread
+predefinito (config.EXTRACTION_WORKERS). Il tempo dovrebbe dipendere da core e dischi
+disponibili, non dal numero di file.
+
+Uso (dalla directory principale del progetto):
+    python -m benchmarks.bench_multifile --rows 1000000 --files 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from benchmarks import synthetic_data
+from src import config
+from src.data_extraction import DataExtractor
+
+def write_files(directory, rows, files, seed=42):
+    """Scrive `rows` righe sintetiche suddivise in `files` CSV."""
+    data = pd.concat(synthetic_data.iter_chunks(rows, seed=seed), ignore_index=True)
+    for index, positions in enumerate(np.array_split(np.arange(rows), files)):
+        data.iloc[positions].to_csv(os.path.join(directory, f'ufficio_{index:04d}.csv'), index=False)
+
+def sequential_concat(directory):
+    """Un file alla volta, con una concatenazione per file."""
+    data = None
+    for name in sorted(os.listdir(directory)):
+        part = pd.read_csv(os.path.join(directory, name))
+        part[config.SOURCE_FILE_COLUMN] = name
+        data = part if data is None else pd.concat([data, part], ignore_index=True)
+    return data
+
+def extractor(directory, max_workers):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DataExtractor(directory, max_workers=max_workers).extract_data()[0]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Numero di righe sintetiche in totale.")
+    parser.add_argument('--files', type=int, default=200, help="Numero di file in cui suddividerle.")
+    parser.add_argument('--repeat', type=int, default=3, help="Ripetizioni per misura (si usa la migliore).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_files(directory, args.rows, args.files)
+        candidates = {
+            'sequenziale + concat ripetute': lambda: sequential_concat(directory),
+            'DataExtractor, 1 thread': lambda: extractor(directory, 1),
+            'DataExtractor, thread predefiniti': lambda: extractor(directory, None),
+        }
+        print(f"Benchmark estrazione di {args.rows} righe da {args.files} file (migliore di {args.repeat}, "
+              f"{os.cpu_count()} CPU):")
+        results = {}
+        for name, function in candidates.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                data = function()
+                timings.append(time.perf_counter() - start)
+            results[name] = min(timings)
+            assert len(data) == args.rows and data[config.SOURCE_FILE_COLUMN].nunique() == args.files
+            print(f"- {name}: {results[name]:.3f}s ({args.rows / results[name]:,.0f} righe/s)")
+    baseline = results['sequenziale + concat ripetute']
+    for name in list(results)[1:]:
+        print(f"Speedup {name}: {baseline / results[name]:.1f}x")
+
+if __name__ == "__main__":
+    main()
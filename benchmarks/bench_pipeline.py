@@ -0,0 +1,157 @@
+"""
+Benchmark della pipeline completa (DataExtractor, DataTransformer, DataLoader, ReportGenerator)
+su dati sintetici (benchmarks/synthetic_data.py), con confronto rispetto a una baseline salvata.
+
+Per ogni fase e sotto-fase misurata dalla strumentazione dell'orchestratore si registrano il
+throughput (righe in ingresso al secondo, migliore su `--repeat` esecuzioni) e il picco di
+memoria (tracemalloc, in un'esecuzione aggiuntiva non cronometrata perché tracemalloc rallenta).
+Con `--save-baseline` i risultati vengono salvati in `--baseline` (una voce per numero di righe);
+altrimenti vengono confrontati con la baseline e il comando termina con codice 1 se una fase
+principale perde più di `--tolerance` di throughput o usa più di `--tolerance` di memoria in più.
+La baseline dipende dalla macchina (CPU, dischi, versioni di Python e librerie): non è versionata
+e va generata localmente con `--save-baseline` prima del primo confronto.
+
+Uso (dalla directory principale del progetto):
+    python -m benchmarks.bench_pipeline --rows 100000
+    python -m benchmarks.bench_pipeline --rows 100000 --save-baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from benchmarks import synthetic_data
+from src.instrumentation import PipelineInstrumentation
+from src.main_pipeline import ETLPipelineOrchestrator
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_pipeline.json')
+# Fasi più brevi di così nella baseline non vengono confrontate (misure dominate dal rumore)
+MIN_COMPARED_SECONDS = 0.05
+MIN_COMPARED_BYTES = 1 << 20
+
+def run_pipeline(input_path, work_dir, trace_memory=False, visualizations=True):
+    """Esegue ETL e report una volta e restituisce le misure per fase."""
+    instrumentation = PipelineInstrumentation(trace_memory=trace_memory)
+    db_path = os.path.join(work_dir, 'output.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    # Directory nuova a ogni esecuzione: con gli hash della precedente i grafici non verrebbero ridisegnati
+    viz_dir = os.path.join(work_dir, 'visualizzazioni')
+    shutil.rmtree(viz_dir, ignore_errors=True)
+    pipeline = ETLPipelineOrchestrator(input_path, db_path, viz_dir, instrumentation=instrumentation)
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline.run_etl()
+        if visualizations:
+            pipeline.run_reporting()
+        else:
+            with instrumentation.stage('reporting', rows_in=len(pipeline.transformed_data)):
+                pipeline.reporter.generate_text_report(pipeline.transformed_data, pipeline.transform_stats)
+    return instrumentation.records
+
+def measure(input_path, rows, repeat, visualizations=True):
+    """
+    Misura throughput e picco di memoria di ogni fase.
+    Returns:
+        dict: fase -> {'righe_al_secondo', 'wall_secondi', 'picco_memoria_byte'}.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(repeat):
+            for name, record in run_pipeline(input_path, work_dir, visualizations=visualizations).items():
+                entry = results.setdefault(name, {'wall_secondi': float('inf')})
+                if record.wall_seconds < entry['wall_secondi']:
+                    entry['wall_secondi'] = record.wall_seconds
+                    entry['righe_al_secondo'] = (record.rows_in or rows) / max(record.wall_seconds, 1e-9)
+        for name, record in run_pipeline(input_path, work_dir, trace_memory=True, visualizations=visualizations).items():
+            results.setdefault(name, {})['picco_memoria_byte'] = record.tracemalloc_peak_bytes
+    return results
+
+def compare(results, baseline, tolerance):
+    """
+    Confronta le fasi principali (senza '.') con la baseline.
+    Returns:
+        list: Descrizioni delle regressioni trovate.
+    """
+    regressions = []
+    for name, reference in baseline.items():
+        if '.' in name or name not in results:
+            continue
+        current = results[name]
+        if reference.get('wall_secondi', 0) >= MIN_COMPARED_SECONDS and \
+                current['righe_al_secondo'] < reference['righe_al_secondo'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {current['righe_al_secondo']:,.0f} righe/s "
+                               f"(baseline {reference['righe_al_secondo']:,.0f})")
+        reference_memory, current_memory = reference.get('picco_memoria_byte'), current.get('picco_memoria_byte')
+        if reference_memory and current_memory and reference_memory >= MIN_COMPARED_BYTES and \
+                current_memory > reference_memory * (1 + tolerance):
+            regressions.append(f"{name}: picco di memoria {current_memory / 2**20:.1f} MiB "
+                               f"(baseline {reference_memory / 2**20:.1f} MiB)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000, help="Numero di righe sintetiche.")
+    parser.add_argument('--repeat', type=int, default=3, help="Ripetizioni per misura (si usa la migliore).")
+    parser.add_argument('--seed', type=int, default=42, help="Seme del generatore di dati.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="File JSON della baseline.")
+    parser.add_argument('--save-baseline', action='store_true', help="Salva i risultati come nuova baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.3, help="Peggioramento relativo tollerato (0.3 = 30%%).")
+    parser.add_argument('--no-visualizations', action='store_true', help="Esclude i grafici dalla fase di reporting.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        input_path = os.path.join(data_dir, 'input.csv')
+        start = time.perf_counter()
+        synthetic_data.write_csv(input_path, args.rows, seed=args.seed)
+        print(f"Generate {args.rows} righe sintetiche in {time.perf_counter() - start:.1f}s.")
+        results = measure(input_path, args.rows, args.repeat, visualizations=not args.no_visualizations)
+
+    print(f"Benchmark pipeline su {args.rows} righe (migliore di {args.repeat}):")
+    for name, entry in results.items():
+        memory = entry.get('picco_memoria_byte')
+        memory_text = f"{memory / 2**20:.1f} MiB" if memory is not None else "n/d"
+        print(f"{'  ' * name.count('.')}- {name.rsplit('.', 1)[-1]}: {entry['righe_al_secondo']:,.0f} righe/s "
+              f"({entry['wall_secondi']:.3f}s), picco memoria {memory_text}")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+    key = str(args.rows)
+
+    if args.save_baseline:
+        baselines[key] = {
+            'python': platform.python_version(),
+            'piattaforma': platform.platform(),
+            'fasi': {name: {k: round(v, 6) if isinstance(v, float) else v for k, v in entry.items()}
+                     for name, entry in results.items()},
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"Baseline per {args.rows} righe salvata in {args.baseline}.")
+        return
+
+    if key not in baselines:
+        print(f"Nessuna baseline per {args.rows} righe in {args.baseline}: usare --save-baseline per crearla.")
+        return
+    baseline = baselines[key]
+    if (baseline['python'], baseline['piattaforma']) != (platform.python_version(), platform.platform()):
+        print(f"Attenzione: baseline registrata su un altro ambiente (Python {baseline['python']}, "
+              f"{baseline['piattaforma']}): le misure potrebbero non essere confrontabili.")
+    regressions = compare(results, baseline['fasi'], args.tolerance)
+    if regressions:
+        print(f"Regressioni rispetto alla baseline (tolleranza {args.tolerance:.0%}):")
+        for regression in regressions:
+            print(f"- {regression}")
+        sys.exit(1)
+    print(f"Nessuna regressione rispetto alla baseline (tolleranza {args.tolerance:.0%}).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark dell'avvio a freddo: tempo di import (da `python -X importtime`) della pipeline da
+riga di comando e degli import della dashboard Streamlit, con gli import differiti attuali
+rispetto agli import anticipati precedenti (matplotlib caricato da src.reporting all'import;
+pandas, pyplot, query, metadati tramite src.data_loading e orchestratore importati da
+streamlit_app.py a ogni avvio dello script). Ogni misura avviene in un nuovo interprete; si
+riportano il tempo di import cumulativo, il tempo wall del processo e quali dipendenze pesanti
+sono state caricate.
+
+Uso (dalla directory principale del progetto):
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'pyarrow', 'matplotlib', 'streamlit')
+
+def dashboard_imports(path=os.path.join(PROJECT_DIR, 'streamlit_app.py')):
+    """Istruzioni di import eseguite da streamlit_app.py all'avvio dello script (livello di modulo)."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    return '\n'.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def parse_importtime(stderr):
+    """
+    Legge l'output di `-X importtime`.
+    Returns:
+        dict: Modulo di primo livello -> tempo cumulativo (microsecondi), più l'insieme di
+            tutti i moduli importati sotto la chiave None.
+    """
+    top_level, modules = {}, set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name_field = line[len('import time:'):].split('|')
+        name = name_field.strip()
+        modules.add(name)
+        if len(name_field) - len(name_field.lstrip()) == 1:
+            top_level[name] = top_level.get(name, 0) + int(cumulative)
+    top_level[None] = modules
+    return top_level
+
+def run_python(args):
+    """Esegue un nuovo interprete nella directory del progetto; restituisce (tempo wall, stderr)."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=PROJECT_DIR,
+                            capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stderr
+
+def measure(args, startup_modules, repeat):
+    """Migliore di `repeat` esecuzioni: (ms di import esclusi quelli dell'interprete, ms wall, moduli pesanti)."""
+    best_import, best_wall, heavy = None, None, []
+    for _ in range(repeat):
+        wall, stderr = run_python(args)
+        parsed = parse_importtime(stderr)
+        modules = parsed.pop(None)
+        import_us = sum(value for name, value in parsed.items() if name not in startup_modules)
+        best_import = import_us if best_import is None else min(best_import, import_us)
+        best_wall = wall if best_wall is None else min(best_wall, wall)
+        heavy = [name for name in HEAVY_MODULES if name in modules]
+    return best_import / 1000, best_wall * 1000, heavy
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help="Ripetizioni per misura (si usa la migliore).")
+    args = parser.parse_args()
+
+    startup_modules = set(parse_importtime(run_python(['-c', 'pass'])[1])) - {None}
+    dashboard = dashboard_imports()
+    candidates = {
+        'CLI, import anticipati (+ matplotlib.figure)': ['-c', 'import src.main_pipeline\nimport matplotlib.figure'],
+        'CLI, import differiti (--stages etl)': ['-c', 'import src.main_pipeline'],
+        'CLI, --help': ['-m', 'src.main_pipeline', '--help'],
+        'dashboard, import anticipati (+ pandas, pyplot, query e orchestratore)':
+            ['-c', dashboard + '\nimport pandas\nimport matplotlib.pyplot\nfrom src import dashboard_queries'
+                               '\nfrom src.data_loading import read_metadata\nimport src.main_pipeline'],
+        'dashboard, import differiti': ['-c', dashboard],
+    }
+    print(f"Benchmark avvio a freddo (migliore di {args.repeat}, {sys.executable}):")
+    results = {}
+    for name, python_args in candidates.items():
+        import_ms, wall_ms, heavy = measure(python_args, startup_modules, args.repeat)
+        results[name] = import_ms
+        print(f"- {name}: import {import_ms:.0f} ms, wall {wall_ms:.0f} ms, "
+              f"dipendenze pesanti: {', '.join(heavy) or 'nessuna'}")
+    for kind in ('CLI', 'dashboard'):
+        eager = next(value for name, value in results.items() if name.startswith(f'{kind}, import anticipati'))
+        lazy = results[f'{kind}, import differiti' + (' (--stages etl)' if kind == 'CLI' else '')]
+        print(f"Import {kind}: {eager:.0f} ms -> {lazy:.0f} ms ({eager / lazy:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark delle regole vettoriali di DataTransformer (bonus e validazione delle stringhe)
+rispetto all'implementazione precedente basata su lambda riga per riga.
+
+Uso (dalla directory principale del progetto):
+    python -m benchmarks.bench_transform_rules --rows 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src import config
+from src.data_transformation import tier_values, valid_string_mask
+
+STRING_COLUMNS = ['nome', 'cognome', config.DEPARTMENT_COLUMN]
+
+def make_data(rows, seed=42):
+    """Genera colonne sintetiche con una piccola quota di stringhe vuote, di soli spazi e mancanti."""
+    rng = np.random.default_rng(seed)
+    pool = np.array(['Mario', 'Laura', 'Giuseppe', 'Anna', '', '   ', None], dtype=object)
+    weights = [0.24, 0.24, 0.24, 0.25, 0.01, 0.01, 0.01]
+    data = {col: pd.Series(rng.choice(pool, size=rows, p=weights), dtype='str') for col in STRING_COLUMNS}
+    data['anni_di_servizio'] = np.round(rng.uniform(0, 30, size=rows), 1)
+    return pd.DataFrame(data)
+
+def legacy_bonus(df):
+    return df['anni_di_servizio'].apply(lambda anni: 500 if anni < 2 else (1000 if anni < 5 else 2000))
+
+def vectorized_bonus(df):
+    return tier_values(df['anni_di_servizio'], config.BONUS_BINS, config.BONUS_VALUES)
+
+def legacy_strings(df):
+    for col in STRING_COLUMNS:
+        invalid_mask = (~df[col].apply(lambda x: isinstance(x, str))) | \
+                       (df[col].str.strip() == '') | \
+                       (df[col].isna())
+        df = df[~invalid_mask]
+    return df
+
+def vectorized_strings(df):
+    for col in STRING_COLUMNS:
+        df = df[valid_string_mask(df[col])]
+    return df
+
+def timed(func, df, repeat):
+    """Restituisce il miglior tempo su `repeat` esecuzioni e il risultato dell'ultima."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Numero di righe sintetiche.")
+    parser.add_argument('--repeat', type=int, default=3, help="Ripetizioni per misura (si usa la migliore).")
+    args = parser.parse_args()
+
+    df = make_data(args.rows)
+    print(f"Benchmark regole di trasformazione su {args.rows} righe (migliore di {args.repeat}):")
+    for name, legacy, vectorized in (('bonus', legacy_bonus, vectorized_bonus),
+                                     ('validazione stringhe', legacy_strings, vectorized_strings)):
+        legacy_time, legacy_result = timed(legacy, df, args.repeat)
+        vectorized_time, vectorized_result = timed(vectorized, df, args.repeat)
+        if isinstance(legacy_result, pd.Series):
+            assert (legacy_result.to_numpy() == vectorized_result.to_numpy()).all(), f"Risultati diversi per {name}"
+        else:
+            assert legacy_result.index.equals(vectorized_result.index), f"Risultati diversi per {name}"
+        print(f"- {name}: lambda {legacy_time:.3f}s, vettoriale {vectorized_time:.3f}s "
+              f"(speedup {legacy_time / vectorized_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
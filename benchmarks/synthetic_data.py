@@ -0,0 +1,165 @@
+"""
+Generatore di dati sintetici sui dipendenti con lo stesso schema di data/input.csv
+(id + config.DUPLICATE_CHECK_COLUMNS), per misurare la pipeline da 10^4 a 10^8 righe.
+I dati sono prodotti e scritti a blocchi, quindi la memoria non dipende dal numero di righe,
+e sono riproducibili: stesso seme e stessi parametri producono lo stesso file (le sole date
+future sono relative al giorno di generazione, perché devono restare future).
+
+Le anomalie gestite dalla trasformazione sono inserite con quote configurabili:
+duplicati (righe identiche tranne l'id), stipendi negativi, stipendi mancanti, date di
+assunzione future, età fuori dall'intervallo lavorativo e nomi/cognomi vuoti o di soli spazi.
+
+Uso (dalla directory principale del progetto):
+    python -m benchmarks.synthetic_data --rows 10000000 --output data/dipendenti_sintetici.csv
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src import config
+
+FIRST_NAMES = [
+    'Mario', 'Laura', 'Giuseppe', 'Anna', 'Marco', 'Giulia', 'Luca', 'Francesca', 'Andrea', 'Chiara',
+    'Alessandro', 'Sara', 'Francesco', 'Valentina', 'Matteo', 'Elena', 'Lorenzo', 'Martina', 'Davide', 'Federica',
+    'Simone', 'Silvia', 'Stefano', 'Paola', 'Roberto', 'Alessia', 'Paolo', 'Roberta', 'Antonio', 'Elisa',
+    'Giovanni', 'Ilaria', 'Riccardo', 'Barbara', 'Fabio', 'Monica', 'Daniele', 'Cristina', 'Michele', 'Serena',
+]
+LAST_NAMES = [
+    'Rossi', 'Bianchi', 'Verdi', 'Neri', 'Russo', 'Ferrari', 'Esposito', 'Romano', 'Colombo', 'Ricci',
+    'Marino', 'Greco', 'Bruno', 'Gallo', 'Conti', 'De Luca', 'Mancini', 'Costa', 'Giordano', 'Rizzo',
+    'Lombardi', 'Moretti', 'Barbieri', 'Fontana', 'Santoro', 'Mariani', 'Rinaldi', 'Caruso', 'Ferrara', 'Galli',
+    'Martini', 'Leone', 'Longo', 'Gentile', 'Martinelli', 'Vitale', 'Lombardo', 'Serra', 'Coppola', 'De Santis',
+]
+# Reparto -> stipendio medio di partenza (cresce con l'anzianità)
+DEPARTMENT_BASE_SALARIES = {
+    'Vendite': 40000,
+    'Marketing': 42000,
+    'Sviluppo': 46000,
+    'Risorse Umane': 39000,
+    'Amministrazione': 41000,
+}
+BLANK_NAMES = ['', '   ']
+REFERENCE_DATE = np.datetime64('2024-12-31', 'D') # Data di riferimento delle assunzioni valide
+
+DEFAULT_RATES = {
+    'duplicate_rate': 0.01,
+    'negative_salary_rate': 0.005,
+    'missing_salary_rate': 0.03,
+    'future_date_rate': 0.005,
+    'invalid_age_rate': 0.005,
+    'blank_name_rate': 0.005,
+}
+
+def generate_chunk(rows, first_id, rng, duplicate_rate=0.01, negative_salary_rate=0.005, missing_salary_rate=0.03,
+                   future_date_rate=0.005, invalid_age_rate=0.005, blank_name_rate=0.005):
+    """
+    Genera un blocco di dipendenti sintetici.
+    Args:
+        rows (int): Righe del blocco.
+        first_id (int): Id della prima riga (gli id sono consecutivi e univoci).
+        rng (np.random.Generator): Generatore di numeri casuali del blocco.
+        duplicate_rate (float): Quota di righe che ripetono una riga precedente del blocco (id diverso).
+        negative_salary_rate (float): Quota di stipendi negativi.
+        missing_salary_rate (float): Quota di stipendi mancanti.
+        future_date_rate (float): Quota di date di assunzione future.
+        invalid_age_rate (float): Quota di età fuori dall'intervallo lavorativo (sotto 16 o sopra 70).
+        blank_name_rate (float): Quota di righe con nome o cognome vuoto o di soli spazi.
+    Returns:
+        pd.DataFrame: Blocco con le colonne di data/input.csv.
+    """
+    departments = np.array(list(DEPARTMENT_BASE_SALARIES))
+    department_codes = rng.integers(0, len(departments), size=rows)
+    age = np.clip(np.round(rng.normal(38, 8, size=rows)), 22, 64).astype('int64')
+    # Assunzione tra i 20 anni e oggi, al massimo 30 anni fa
+    max_service_days = np.minimum((age - 20) * 365, 30 * 365)
+    service_days = (rng.random(size=rows) * max_service_days).astype('int64')
+    hire_dates = REFERENCE_DATE - service_days
+    base_salaries = np.array(list(DEPARTMENT_BASE_SALARIES.values()), dtype='float64')[department_codes]
+    salary = np.round(base_salaries + service_days / 365 * 700 + rng.normal(0, 4000, size=rows), -1)
+
+    # Anomalie
+    salary[rng.random(rows) < negative_salary_rate] *= -1
+    salary[rng.random(rows) < missing_salary_rate] = np.nan
+    future_mask = rng.random(rows) < future_date_rate
+    hire_dates[future_mask] = np.datetime64('today', 'D') + rng.integers(1, 730, size=int(future_mask.sum()))
+    invalid_age_mask = rng.random(rows) < invalid_age_rate
+    age[invalid_age_mask] = rng.choice([12, 14, 15, 75, 80, 99], size=int(invalid_age_mask.sum()))
+
+    first_names = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), size=rows)]
+    last_names = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), size=rows)]
+    blank_mask = rng.random(rows) < blank_name_rate
+    blank_values = np.array(BLANK_NAMES, dtype=object)[rng.integers(0, len(BLANK_NAMES), size=int(blank_mask.sum()))]
+    blank_first = rng.random(int(blank_mask.sum())) < 0.5 # Metà nel nome, metà nel cognome
+    blank_positions = np.flatnonzero(blank_mask)
+    first_names[blank_positions[blank_first]] = blank_values[blank_first]
+    last_names[blank_positions[~blank_first]] = blank_values[~blank_first]
+
+    df = pd.DataFrame({
+        'id': np.arange(first_id, first_id + rows, dtype='int64'),
+        'nome': first_names,
+        'cognome': last_names,
+        config.AGE_COLUMN: age,
+        config.SALARY_COLUMN: salary,
+        config.HIRE_DATE_COLUMN: np.datetime_as_string(hire_dates, unit='D'),
+        config.DEPARTMENT_COLUMN: departments[department_codes],
+    })
+
+    # Duplicati: copia di una riga precedente del blocco in tutte le colonne di DUPLICATE_CHECK_COLUMNS
+    duplicate_positions = np.flatnonzero(rng.random(rows) < duplicate_rate)
+    duplicate_positions = duplicate_positions[duplicate_positions > 0]
+    if len(duplicate_positions):
+        source_positions = (rng.random(len(duplicate_positions)) * duplicate_positions).astype('int64')
+        columns = [df.columns.get_loc(col) for col in config.DUPLICATE_CHECK_COLUMNS]
+        df.iloc[duplicate_positions, columns] = df.iloc[source_positions, columns].to_numpy()
+    return df
+
+def iter_chunks(rows, chunk_rows=1_000_000, seed=42, **rates):
+    """
+    Genera i dati sintetici a blocchi, in modo riproducibile (un seme derivato per blocco).
+    Args:
+        rows (int): Righe totali.
+        chunk_rows (int): Righe per blocco.
+        seed (int): Seme del generatore.
+        **rates: Quote delle anomalie (vedi `generate_chunk`; default in DEFAULT_RATES).
+    Yields:
+        pd.DataFrame: Blocco di dati.
+    """
+    rates = {**DEFAULT_RATES, **rates}
+    num_chunks = -(-rows // chunk_rows)
+    for index, chunk_seed in enumerate(np.random.SeedSequence(seed).spawn(num_chunks)):
+        chunk_size = min(chunk_rows, rows - index * chunk_rows)
+        yield generate_chunk(chunk_size, index * chunk_rows + 1, np.random.default_rng(chunk_seed), **rates)
+
+def write_csv(path, rows, chunk_rows=1_000_000, seed=42, **rates):
+    """
+    Scrive un CSV sintetico con lo schema di data/input.csv.
+    Args:
+        path (str): Percorso del file da scrivere (sovrascritto).
+        rows (int): Righe totali.
+        chunk_rows (int): Righe per blocco.
+        seed (int): Seme del generatore.
+        **rates: Quote delle anomalie (vedi `generate_chunk`).
+    Returns:
+        str: Percorso del file scritto.
+    """
+    for index, chunk in enumerate(iter_chunks(rows, chunk_rows, seed, **rates)):
+        chunk.to_csv(path, mode='w' if index == 0 else 'a', header=index == 0, index=False)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Numero di righe da generare.")
+    parser.add_argument('--output', default='data/dipendenti_sintetici.csv', help="File CSV di output.")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000, help="Righe per blocco generato.")
+    parser.add_argument('--seed', type=int, default=42, help="Seme del generatore.")
+    for name, default in DEFAULT_RATES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default, help=f"Quota (default {default}).")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rates = {name: getattr(args, name) for name in DEFAULT_RATES}
+    write_csv(args.output, args.rows, args.chunk_rows, args.seed, **rates)
+    print(f"Generate {args.rows} righe in {args.output} in {time.perf_counter() - start:.1f}s.")
+
+if __name__ == "__main__":
+    main()
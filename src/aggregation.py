@@ -0,0 +1,156 @@
+import pandas as pd
+from src import config
+
+# Statistiche di gruppo disponibili: nome -> (espressione SQL equivalente, tipo SQLite)
+STATISTICS = {
+    'numero_dipendenti': ('COUNT(*)', 'INTEGER'),
+    'stipendio_medio': (f'AVG({config.SALARY_COLUMN})', 'REAL'),
+    'stipendio_min': (f'MIN({config.SALARY_COLUMN})', 'REAL'),
+    'stipendio_max': (f'MAX({config.SALARY_COLUMN})', 'REAL'),
+    'eta_media': (f'AVG({config.AGE_COLUMN})', 'REAL'),
+    'media_anni_servizio': ('AVG(anni_di_servizio)', 'REAL'),
+    'totale_bonus': ('SUM(bonus)', 'INTEGER'),
+}
+
+# Tabelle di riepilogo del database: nome -> (colonna di raggruppamento, statistiche)
+SUMMARY_TABLES = {
+    'analisi_per_reparto': (config.DEPARTMENT_COLUMN, [
+        'numero_dipendenti', 'stipendio_medio', 'stipendio_min', 'stipendio_max', 'media_anni_servizio', 'totale_bonus'
+    ]),
+    'analisi_per_fascia_eta': ('fascia_eta', [
+        'numero_dipendenti', 'stipendio_medio', 'stipendio_min', 'stipendio_max', 'media_anni_servizio'
+    ]),
+    'analisi_per_anzianita': ('anzianita', [
+        'numero_dipendenti', 'stipendio_medio', 'stipendio_min', 'stipendio_max'
+    ]),
+}
+
+def sql_select_list(statistics):
+    """
+    Espressioni SQL delle statistiche indicate, per le query di aggregazione su `dipendenti`.
+    Args:
+        statistics (list): Nomi di STATISTICS.
+    Returns:
+        str: Elenco 'COUNT(*) as numero_dipendenti, AVG(stipendio) as stipendio_medio, ...'.
+    """
+    return ',\n'.join(f'{STATISTICS[name][0]} as {name}' for name in statistics)
+
+class GroupStatistics:
+    def __init__(self):
+        """
+        Statistiche di gruppo dei dati trasformati calcolate con un solo raggruppamento.
+        Il DataFrame viene raggruppato una volta per la combinazione delle colonne di
+        config.AGGREGATION_GROUP_COLUMNS (un "cubo" con conteggi, somme, minimi e massimi per
+        cella); le statistiche per una singola colonna (report, grafici, tabelle di riepilogo)
+        si ottengono aggregando le celle del cubo, il cui numero non dipende dalle righe.
+        Il cubo si può aggiornare blocco per blocco (modalità out-of-core).
+        """
+        self.cube = None
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Calcola le statistiche di un DataFrame trasformato.
+        Args:
+            df (pd.DataFrame): DataFrame trasformato.
+        Returns:
+            GroupStatistics: Statistiche calcolate.
+        """
+        statistics = cls()
+        statistics.update(df)
+        return statistics
+
+    def update(self, df):
+        """
+        Aggiunge al cubo le righe di un blocco trasformato.
+        Args:
+            df (pd.DataFrame): Blocco trasformato.
+        """
+        group_columns = [col for col in config.AGGREGATION_GROUP_COLUMNS if col in df.columns]
+        salary = df[config.SALARY_COLUMN].astype('float64')
+        cube = pd.DataFrame({
+            'conteggio': 1,
+            'somma_stipendio': salary,
+            'stipendio_min': salary,
+            'stipendio_max': salary,
+            'somma_eta': df[config.AGE_COLUMN].astype('int64'),
+            # I valori float32 compattati sono riportati ai decimali originali, come nel database
+            'somma_anni_servizio': df['anni_di_servizio'].astype('float64').round(config.DERIVED_COLUMN_DECIMALS['anni_di_servizio']),
+            'somma_bonus': df['bonus'].astype('int64'),
+        }, index=df.index)
+        cube = cube.groupby([df[col] for col in group_columns], observed=True, dropna=False).agg(self._merge_functions())
+        # Chiavi come valori semplici: i blocchi possono avere categorie diverse
+        cube.index = pd.MultiIndex.from_frame(cube.index.to_frame(index=False).astype(object))
+        if self.cube is None:
+            self.cube = cube
+        else:
+            combined = pd.concat([self.cube, cube])
+            self.cube = combined.groupby(level=list(range(combined.index.nlevels)), dropna=False).agg(self._merge_functions())
+
+    @staticmethod
+    def _merge_functions():
+        """Funzione con cui si combinano le celle del cubo per ciascuna misura."""
+        return {
+            'conteggio': 'sum',
+            'somma_stipendio': 'sum',
+            'stipendio_min': 'min',
+            'stipendio_max': 'max',
+            'somma_eta': 'sum',
+            'somma_anni_servizio': 'sum',
+            'somma_bonus': 'sum',
+        }
+
+    @property
+    def total_rows(self):
+        """Numero di righe aggregate."""
+        return 0 if self.cube is None else int(self.cube['conteggio'].sum())
+
+    def rollup(self, column, labels=None):
+        """
+        Statistiche di STATISTICS per i valori di una colonna.
+        Args:
+            column (str): Colonna di raggruppamento (una di config.AGGREGATION_GROUP_COLUMNS).
+            labels (list, optional): Tutti i valori attesi, nell'ordine desiderato: i gruppi vuoti
+                compaiono con conteggio 0 (come groupby(observed=False) su una categorica).
+                Se None, solo i gruppi osservati, in ordine crescente.
+        Returns:
+            pd.DataFrame: Una riga per gruppo, indicizzata per `column`, una colonna per statistica.
+        """
+        cells = self.cube.groupby(level=column, dropna=False).agg(self._merge_functions())
+        count = cells['conteggio']
+        result = pd.DataFrame({
+            'numero_dipendenti': count.astype('int64'),
+            'stipendio_medio': cells['somma_stipendio'] / count,
+            'stipendio_min': cells['stipendio_min'],
+            'stipendio_max': cells['stipendio_max'],
+            'eta_media': cells['somma_eta'] / count,
+            'media_anni_servizio': cells['somma_anni_servizio'] / count,
+            'totale_bonus': cells['somma_bonus'].astype('int64'),
+        })
+        if labels is not None:
+            result = result.reindex(labels)
+            result[['numero_dipendenti', 'totale_bonus']] = result[['numero_dipendenti', 'totale_bonus']].fillna(0).astype('int64')
+        result.index.name = column
+        return result
+
+    def counts(self, column, labels=None):
+        """
+        Numero di righe per valore di una colonna (come value_counts, senza ordinare per frequenza).
+        Args:
+            column (str): Colonna di raggruppamento.
+            labels (list, optional): Tutti i valori attesi (vedi `rollup`).
+        Returns:
+            pd.Series: Conteggi indicizzati per valore.
+        """
+        return self.rollup(column, labels)['numero_dipendenti'].rename('count')
+
+    def summary_tables(self):
+        """
+        Contenuto delle tabelle di riepilogo di SUMMARY_TABLES (gruppi osservati).
+        Returns:
+            dict: Nome della tabella -> DataFrame con la colonna di raggruppamento e le statistiche.
+        """
+        return {
+            name: self.rollup(group_column)[statistics].reset_index()
+            for name, (group_column, statistics) in SUMMARY_TABLES.items()
+        }
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+import pandas as pd
+from src.data_extraction import resolve_input_files
+
+MANIFEST_FILE = 'manifest.json'
+DIGEST_BLOCK_SIZE = 1024 * 1024 # Byte letti per volta nel calcolo delle impronte dei file
+
+def _import_feather():
+    """Importa pyarrow solo quando serve; senza pyarrow i DataFrame vengono salvati con pickle."""
+    try:
+        import pyarrow
+        import pyarrow.feather
+    except ImportError:
+        return None, None
+    return pyarrow, pyarrow.feather
+
+def input_identity(input_path):
+    """
+    Identità dei file di input: percorso, dimensione e data di modifica (in nanosecondi)
+    di ciascun file, quindi cambia se un file viene modificato, aggiunto o rimosso.
+    Args:
+        input_path (str): File, directory o pattern glob (vedi `resolve_input_files`).
+    Returns:
+        list: Liste [percorso, dimensione, mtime_ns], una per file.
+    """
+    identity = []
+    for path in resolve_input_files(input_path)[0]:
+        stat = os.stat(path)
+        identity.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return identity
+
+def _file_digest(path):
+    """SHA-256 del contenuto di un file, letto a blocchi di DIGEST_BLOCK_SIZE byte."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(DIGEST_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def input_digests(input_path, known_files=None):
+    """
+    Impronte SHA-256 del contenuto dei file di input. Un file viene riletto solo se
+    dimensione o data di modifica sono diverse da quelle registrate in `known_files`.
+    Args:
+        input_path (str): File, directory o pattern glob (vedi `resolve_input_files`).
+        known_files (list, optional): Risultato di una chiamata precedente.
+    Returns:
+        list: Liste [etichetta, percorso, dimensione, mtime_ns, impronta], una per file
+            (etichetta None per un singolo file, altrimenti il percorso relativo).
+    """
+    known = {entry[1]: entry for entry in known_files or []}
+    files, labels = resolve_input_files(input_path)
+    digests = []
+    for path, label in zip(files, labels or [None] * len(files)):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        previous = known.get(path)
+        if previous is not None and previous[2:4] == [stat.st_size, stat.st_mtime_ns]:
+            digest = previous[4]
+        else:
+            digest = _file_digest(path)
+        digests.append([label, path, stat.st_size, stat.st_mtime_ns, digest])
+    return digests
+
+class StageCheckpoints:
+    def __init__(self, directory):
+        """
+        Checkpoint delle fasi della pipeline in `directory`: i DataFrame in formato Feather
+        (Arrow IPC: tipi, categorie e indice conservati, lettura senza parsing), gli altri
+        oggetti (statistiche) con pickle, più un manifest JSON dell'esecuzione con la sua
+        chiave (es. identità dell'input e database di output) e le fasi completate.
+        I file di una fase vengono scritti prima di aggiornare il manifest, entrambi con una
+        rinomina atomica: una fase interrotta a metà non risulta mai completata.
+        Args:
+            directory (str): Directory dei checkpoint (usata solo dalla pipeline).
+        """
+        self.directory = directory
+        self.manifest = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _write_atomically(self, name, write):
+        """Scrive un file tramite `write(percorso_temporaneo)` e lo rinomina in `name`."""
+        temporary_path = self._path(name + '.tmp')
+        write(temporary_path)
+        os.replace(temporary_path, self._path(name))
+
+    def _read_manifest(self):
+        try:
+            with open(self._path(MANIFEST_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self):
+        def write(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+        self._write_atomically(MANIFEST_FILE, write)
+
+    def start(self, run_key, resume=False):
+        """
+        Avvia un'esecuzione. Con `resume` le fasi completate dall'ultima esecuzione con la
+        stessa chiave restano valide; altrimenti i checkpoint precedenti vengono eliminati.
+        Args:
+            run_key (dict): Chiave dell'esecuzione (serializzabile in JSON).
+            resume (bool): Se riprendere l'esecuzione precedente.
+        Returns:
+            list: Fasi già completate, da ripristinare invece di eseguirle.
+        """
+        # Passaggio da JSON per confrontare la chiave con quella letta dal manifest (liste, non tuple)
+        run_key = json.loads(json.dumps(run_key))
+        manifest = self._read_manifest() if resume else None
+        if manifest is not None and manifest.get('chiave') == run_key:
+            self.manifest = manifest
+            completed = list(manifest['fasi'])
+            if completed:
+                print(f"Ripresa dell'esecuzione avviata il {manifest['avviata_il']}: "
+                      f"fasi già completate: {', '.join(completed)}.")
+            return completed
+        if manifest is not None:
+            print("I checkpoint presenti riguardano un input diverso: l'esecuzione riparte da zero.")
+        elif resume:
+            print("Nessun checkpoint da riprendere: l'esecuzione parte da zero.")
+        self.clear()
+        os.makedirs(self.directory, exist_ok=True)
+        self.manifest = {'chiave': run_key, 'avviata_il': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'fasi': {}}
+        self._write_manifest()
+        return []
+
+    def completed(self, stage):
+        """True se la fase risulta completata nel manifest dell'esecuzione corrente."""
+        return self.manifest is not None and stage in self.manifest['fasi']
+
+    def save(self, stage, **objects):
+        """
+        Salva gli oggetti prodotti da una fase e la segna come completata.
+        Args:
+            stage (str): Nome della fase.
+            **objects: Nome -> oggetto (DataFrame, None o qualsiasi oggetto serializzabile con pickle).
+        """
+        start = time.perf_counter()
+        pa, feather = _import_feather()
+        entries = {}
+        for name, value in objects.items():
+            if value is None:
+                entries[name] = {'formato': None}
+            elif isinstance(value, pd.DataFrame) and feather is not None:
+                file_name = f'{stage}.{name}.feather'
+                table = pa.Table.from_pandas(value)
+                self._write_atomically(file_name, lambda path: feather.write_feather(table, path))
+                entries[name] = {'formato': 'feather', 'file': file_name, 'righe': len(value)}
+            else:
+                file_name = f'{stage}.{name}.pkl'
+                def write(path):
+                    with open(path, 'wb') as f:
+                        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                self._write_atomically(file_name, write)
+                entries[name] = {'formato': 'pickle', 'file': file_name}
+        self.manifest['fasi'][stage] = {
+            'completata_il': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'secondi_salvataggio': round(time.perf_counter() - start, 3),
+            'oggetti': entries,
+        }
+        self._write_manifest()
+
+    def load(self, stage):
+        """
+        Legge gli oggetti salvati da una fase completata.
+        Returns:
+            dict: Nome -> oggetto.
+        Raises:
+            KeyError: Se la fase non è completata.
+        """
+        _, feather = _import_feather()
+        objects = {}
+        for name, entry in self.manifest['fasi'][stage]['oggetti'].items():
+            if entry['formato'] is None:
+                objects[name] = None
+            elif entry['formato'] == 'feather':
+                if feather is None:
+                    raise ImportError("Il ripristino dei checkpoint Feather richiede pyarrow (pip install pyarrow).")
+                objects[name] = feather.read_table(self._path(entry['file'])).to_pandas()
+            else:
+                with open(self._path(entry['file']), 'rb') as f:
+                    objects[name] = pickle.load(f)
+        return objects
+
+    def clear(self):
+        """Elimina tutti i checkpoint (es. al termine di un'esecuzione completata)."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.manifest = None
@@ -7,8 +7,15 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INPUT_CSV_PATH = os.path.join(BASE_DIR, 'data', 'input.csv')
 OUTPUT_DB_PATH = os.path.join(BASE_DIR, 'data', 'output.db')
 VISUALIZATIONS_DIR = os.path.join(BASE_DIR, 'data', 'visualizzazioni')
+OUTPUT_PARQUET_DIR = os.path.join(BASE_DIR, 'data', 'dipendenti_parquet')
+# Checkpoint delle fasi della pipeline (Feather + manifest), eliminati al termine di un'esecuzione completata
+CHECKPOINT_DIR = os.path.join(BASE_DIR, 'data', 'checkpoint')
 
-# Colonne per la rimozione dei duplicati (tutte tranne 'id')
+# Estrazione da più file (directory o pattern glob come percorso di input)
+SOURCE_FILE_COLUMN = 'file_origine'  # Colonna con il file di provenienza di ogni riga (esclusa dai duplicati)
+EXTRACTION_WORKERS = None  # Thread di lettura dei file; None = min(32, CPU + 4)
+
+# Colonne per la rimozione dei duplicati (tutte tranne 'id' e la colonna del file di provenienza)
 DUPLICATE_CHECK_COLUMNS = [
     'nome', 'cognome', 'eta', 'stipendio',
     'data_assunzione', 'reparto'
@@ -30,5 +37,161 @@ SALARY_LABELS = ['Basso', 'Medio', 'Alto']
 SENIORITY_BINS = [-1, 2, 5, 8, float('inf')]
 SENIORITY_LABELS = ['Junior', 'Mid', 'Senior', 'Expert']
 
+# Fasce di bonus in base agli anni di servizio (limite inferiore incluso, superiore escluso)
+BONUS_BINS = [float('-inf'), 2, 5, float('inf')]
+BONUS_VALUES = [500, 1000, 2000]
+
+# Soglie di valutazione dello stipendio rispetto alla media del reparto
+VALUATION_UPPER_FACTOR = 1.1  # Sopra Media se stipendio > media * fattore
+VALUATION_LOWER_FACTOR = 0.9  # Sotto Media se stipendio < media * fattore
+
 HOURS_PER_WEEK = 40
-WEEKS_PER_YEAR = 52
\ No newline at end of file
+WEEKS_PER_YEAR = 52
+
+# Parametri per l'estrazione a blocchi (streaming)
+CHUNK_SIZE = 100_000  # Righe per blocco
+# Tipi espliciti per la lettura a blocchi: garantiscono lo stesso dtype in ogni blocco.
+# Età e data di assunzione restano testuali perché la coercizione (con gestione
+# dei valori non validi) avviene nella trasformazione.
+INPUT_DTYPES = {
+    'id': 'Int64',
+    'nome': str,
+    'cognome': str,
+    'eta': str,
+    'stipendio': 'float64',
+    'data_assunzione': str,
+    'reparto': str,
+}
+
+# Schema dichiarato dell'input (colonna -> tipo logico: 'int64', 'float64', 'string',
+# 'timestamp', 'category'). I lettori Parquet/Arrow e CSV (motore pyarrow) leggono solo
+# queste colonne e convertono numeri e date una sola volta, in lettura; se un valore non
+# rispetta il tipo si ripiega su una conversione tollerante (valori non validi -> NaN/NaT).
+INPUT_SCHEMA = {
+    'id': 'int64',
+    'nome': 'string',
+    'cognome': 'string',
+    'eta': 'int64',
+    'stipendio': 'float64',
+    'data_assunzione': 'timestamp',
+    'reparto': 'category',
+}
+INPUT_DATE_FORMAT = '%Y-%m-%d'
+# Valori interpretati come mancanti dal lettore CSV pyarrow (gli stessi di pandas.read_csv)
+INPUT_NULL_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+
+# Rappresentazione compatta del risultato della trasformazione
+COMPACT_CATEGORICAL_COLUMNS = ['reparto', 'fascia_eta', 'fascia_stipendio', 'anzianita', 'valutazione_stipendio']
+COMPACT_STRING_COLUMNS = ['nome', 'cognome']  # Stringhe Arrow (alta cardinalità)
+COMPACT_STRING_DTYPE = 'string[pyarrow]'
+# Decimali delle colonne derivate arrotondate: diventano float32 solo se l'arrotondamento
+# a questi decimali restituisce esattamente i valori originali (il caricamento li riarrotonda)
+DERIVED_COLUMN_DECIMALS = {
+    'anni_di_servizio': 1,
+    'stipendio_orario': 2,
+}
+
+# Parametri per la trasformazione parallela
+PARALLEL_WORKERS = None  # None = numero di CPU disponibili
+# Avvio dei processi dei pool (multiprocessing): 'spawn' o 'forkserver', non 'fork', perché la
+# pipeline può essere eseguita in un thread (PipelineJobRunner della dashboard) e un fork da un
+# processo multithread può ereditare lock acquisiti da altri thread
+PROCESS_START_METHOD = 'spawn'
+
+# Schema esplicito della tabella `dipendenti` (colonna -> tipo SQLite).
+# Colonne non elencate ricevono un tipo dedotto dal dtype.
+DIPENDENTI_SCHEMA = {
+    'id': 'INTEGER',
+    'nome': 'TEXT',
+    'cognome': 'TEXT',
+    'eta': 'INTEGER',
+    'stipendio': 'REAL',
+    'data_assunzione': 'TIMESTAMP',
+    'reparto': 'TEXT',
+    'anni_di_servizio': 'REAL',
+    'stipendio_orario': 'REAL',
+    'fascia_eta': 'TEXT',
+    'fascia_stipendio': 'TEXT',
+    'bonus': 'INTEGER',
+    'anzianita': 'TEXT',
+    'valutazione_stipendio': 'TEXT',
+    'file_origine': 'TEXT',
+}
+# Tabella ombra in cui viene scritto un caricamento completo prima dello scambio con `dipendenti`
+DIPENDENTI_SHADOW_TABLE = '_dipendenti_in_caricamento'
+# Indici creati sulla tabella `dipendenti` al termine del caricamento
+# (le colonne di raggruppamento servono al ricalcolo per gruppo delle tabelle di riepilogo)
+DIPENDENTI_INDEXES = ['id', 'reparto', 'fascia_eta', 'anzianita']
+
+# Parametri del caricamento massivo in SQLite
+LOAD_BATCH_SIZE = 50_000  # Righe per executemany
+LOAD_ROWS_PER_STATEMENT = 50  # Righe per istruzione INSERT multi-riga
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # I lettori non vengono bloccati durante le scritture
+    'synchronous': 'NORMAL',  # Sicuro in modalità WAL, molte meno fsync
+    'cache_size': -262144,  # Valori negativi in KiB: 256 MiB di cache
+    'temp_store': 'MEMORY',
+}
+# Attesa massima (secondi) dei lettori (dashboard) se il database è bloccato
+SQLITE_READ_TIMEOUT = 30
+# Pool di connessioni in sola lettura della dashboard (src/db_pool.py)
+DASHBOARD_POOL_SIZE = 8  # Connessioni aperte al massimo (query concorrenti delle sessioni)
+SQLITE_STATEMENT_CACHE_SIZE = 128  # Istruzioni preparate riutilizzate per connessione
+DASHBOARD_JOB_POLL_SECONDS = 1  # Intervallo di aggiornamento dell'avanzamento della pipeline in background
+# Cache dei risultati delle query della dashboard, indicizzata anche per versione dei dati
+DASHBOARD_CACHE_MAX_ENTRIES = 256  # Risultati in cache al massimo per funzione (i meno recenti vengono eliminati)
+DASHBOARD_CACHE_TTL_SECONDS = 3600  # Durata massima di un risultato in cache
+SQLITE_READ_PRAGMAS = {
+    'mmap_size': 268435456,  # Lettura del file tramite memory map (256 MiB) invece di read()
+    'cache_size': -65536,  # 64 MiB di cache per connessione
+    'query_only': 1,
+}
+
+# Output Parquet (ParquetSink): colonne codificate a dizionario
+# (la partizione per reparto è config.DEPARTMENT_COLUMN)
+PARQUET_DICTIONARY_COLUMNS = ['fascia_eta', 'fascia_stipendio', 'anzianita', 'valutazione_stipendio']
+
+# Colonne del raggruppamento unico da cui si ricavano le statistiche di report, grafici
+# e tabelle di riepilogo (src/aggregation.py): una cella per combinazione di valori
+AGGREGATION_GROUP_COLUMNS = ['reparto', 'fascia_eta', 'anzianita', 'fascia_stipendio', 'valutazione_stipendio']
+
+# Visualizzazioni (ReportGenerator)
+VISUALIZATION_WORKERS = None  # Processi di disegno; None = numero di CPU disponibili
+# Sotto questa soglia di righe i grafici si disegnano nello stesso processo: i dati da disegnare
+# sono limitati (scatter plot campionato) e l'avvio dei processi costa più del disegno
+VISUALIZATION_PARALLEL_MIN_ROWS = 1_000_000
+VISUALIZATION_CACHE_FILE = '.hash_visualizzazioni.json'  # Hash dei dati di ogni grafico (nella directory delle visualizzazioni)
+SCATTER_MAX_POINTS = 20_000  # Oltre questa soglia lo scatter plot disegna un campione casuale deterministico
+BOXPLOT_MAX_FLIERS = 1_000  # Outlier disegnati al massimo per reparto nel boxplot
+DASHBOARD_PAGE_SIZES = [25, 100, 500]  # Righe per pagina selezionabili nella tabella della dashboard
+
+# Strumentazione della pipeline: misure per fase (tempo wall e CPU, memoria, righe in/out)
+METRICS_JSON_PATH = os.path.join(BASE_DIR, 'data', 'metriche_pipeline.json')
+METRICS_PROMETHEUS_PATH = None  # Es. '/var/lib/node_exporter/textfile/etl.prom' (None = non scritto)
+METRICS_TRACE_MEMORY = False  # Picco di allocazioni con tracemalloc (preciso ma rallenta la pipeline)
+
+# Metadati dei caricamenti (versione e impronta dei dati di `dipendenti`) nel database di output
+METADATA_TABLE = '_etl_metadati'
+# Parametri che determinano il contenuto del database di output: insieme al contenuto dell'input,
+# a TRANSFORMER_VERSION e alla data formano l'impronta di un'esecuzione, con cui la pipeline
+# completa salta le esecuzioni invariate
+RUN_FINGERPRINT_CONFIG = [
+    'SOURCE_FILE_COLUMN', 'DUPLICATE_CHECK_COLUMNS',
+    'SALARY_COLUMN', 'HIRE_DATE_COLUMN', 'DEPARTMENT_COLUMN', 'AGE_COLUMN',
+    'AGE_BINS', 'AGE_LABELS', 'SALARY_BINS', 'SALARY_LABELS', 'SENIORITY_BINS', 'SENIORITY_LABELS',
+    'BONUS_BINS', 'BONUS_VALUES', 'VALUATION_UPPER_FACTOR', 'VALUATION_LOWER_FACTOR',
+    'HOURS_PER_WEEK', 'WEEKS_PER_YEAR',
+    'INPUT_SCHEMA', 'INPUT_DATE_FORMAT', 'INPUT_NULL_VALUES',
+    'DIPENDENTI_SCHEMA', 'DIPENDENTI_INDEXES', 'AGGREGATION_GROUP_COLUMNS',
+]
+
+# Indice delle impronte delle righe caricate in modalità di accodamento (duplicati tra esecuzioni)
+FINGERPRINT_TABLE = '_etl_impronte_righe'
+
+# Tabelle di stato per l'ETL incrementale (nel database di output)
+INCREMENTAL_STATE_TABLE = '_etl_stato_righe'
+INCREMENTAL_SALARY_AGGREGATES_TABLE = '_etl_aggregati_stipendi'
+INCREMENTAL_HIRE_DATE_AGGREGATES_TABLE = '_etl_aggregati_date'
@@ -0,0 +1,162 @@
+import math
+import numpy as np
+import pandas as pd
+from src import config
+
+# Ordinamento pseudo-casuale ma deterministico delle righe (hash moltiplicativo dell'id), per
+# campionare in SQL sempre le stesse righe: ORDER BY ... LIMIT usa un ordinamento limitato a N righe
+SAMPLE_ORDER = '(id * 2654435761) % 4294967296'
+
+def count_rows(conn, table='dipendenti'):
+    """Numero di righe di `table`."""
+    return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+def read_page(conn, page, page_size):
+    """
+    Una pagina della tabella `dipendenti` in ordine di id.
+    Args:
+        conn (sqlite3.Connection): Connessione al database.
+        page (int): Numero di pagina (da 1).
+        page_size (int): Righe per pagina.
+    Returns:
+        pd.DataFrame: Al massimo `page_size` righe.
+    """
+    return pd.read_sql_query('SELECT * FROM dipendenti ORDER BY id LIMIT ? OFFSET ?', conn,
+                             params=(page_size, (page - 1) * page_size))
+
+def group_counts(conn, column):
+    """
+    Numero di dipendenti per valore di `column`, calcolato in SQL (GROUP BY), dal più frequente.
+    Returns:
+        pd.DataFrame: Colonne `column` e `numero_dipendenti`.
+    """
+    return pd.read_sql_query(f'''
+        SELECT "{column}", COUNT(*) AS numero_dipendenti
+        FROM dipendenti
+        GROUP BY "{column}"
+        ORDER BY numero_dipendenti DESC, "{column}"
+    ''', conn)
+
+def salary_histogram(conn, bins=20):
+    """
+    Istogramma degli stipendi calcolato in SQL: solo i conteggi per intervallo arrivano in Python.
+    Gli intervalli sono come quelli di np.histogram (equispaziati tra minimo e massimo, l'ultimo
+    include il massimo).
+    Args:
+        conn (sqlite3.Connection): Connessione al database.
+        bins (int): Numero di intervalli.
+    Returns:
+        np.ndarray: Limiti degli intervalli (bins + 1 valori), oppure None se non ci sono stipendi.
+        np.ndarray: Conteggi per intervallo.
+    """
+    salary = config.SALARY_COLUMN
+    low, high, count = conn.execute(f'SELECT MIN({salary}), MAX({salary}), COUNT({salary}) FROM dipendenti').fetchone()
+    if not count:
+        return None, np.zeros(bins, dtype='int64')
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    width = (high - low) / bins
+    counts = np.zeros(bins, dtype='int64')
+    rows = conn.execute(f'''
+        SELECT MIN(CAST(({salary} - ?) / ? AS INTEGER), ?) AS intervallo, COUNT(*)
+        FROM dipendenti
+        WHERE {salary} IS NOT NULL
+        GROUP BY intervallo
+    ''', (low, width, bins - 1))
+    for bin_index, bin_count in rows:
+        counts[bin_index] = bin_count
+    return np.linspace(low, high, bins + 1), counts
+
+def _quantile_positions(q):
+    """Condizione SQL sulle posizioni (1-based) dei due valori che interpolano il quantile q."""
+    return f'rn = CAST((n - 1) * {q} AS INTEGER) + 1 OR rn = CAST((n - 1) * {q} AS INTEGER) + 2'
+
+def salary_box_stats(conn, max_fliers=None):
+    """
+    Statistiche del boxplot degli stipendi per reparto (per Axes.bxp) calcolate in SQL:
+    quartili con interpolazione lineare (come np.percentile), baffi a 1.5 IQR e al massimo
+    `max_fliers` outlier per reparto (campione deterministico).
+    Args:
+        conn (sqlite3.Connection): Connessione al database.
+        max_fliers (int, optional): Outlier per reparto. Default: config.BOXPLOT_MAX_FLIERS.
+    Returns:
+        list: Un dizionario per reparto (label, q1, med, q3, whislo, whishi, fliers), in ordine di reparto.
+    """
+    max_fliers = max_fliers or config.BOXPLOT_MAX_FLIERS
+    salary, department = config.SALARY_COLUMN, config.DEPARTMENT_COLUMN
+    ranked = pd.read_sql_query(f'''
+        SELECT {department} AS reparto, rn, n, {salary} AS valore
+        FROM (
+            SELECT {department}, {salary},
+                   ROW_NUMBER() OVER (PARTITION BY {department} ORDER BY {salary}) AS rn,
+                   COUNT(*) OVER (PARTITION BY {department}) AS n
+            FROM dipendenti
+            WHERE {salary} IS NOT NULL
+        )
+        WHERE {' OR '.join(_quantile_positions(q) for q in (0.25, 0.5, 0.75))}
+    ''', conn)
+    if ranked.empty:
+        return []
+
+    stats = {}
+    for department_value, rows in ranked.groupby('reparto', sort=True):
+        values = dict(zip(rows['rn'], rows['valore']))
+        n = int(rows['n'].iloc[0])
+        quantiles = []
+        for q in (0.25, 0.5, 0.75):
+            position = (n - 1) * q
+            lower = math.floor(position)
+            below, above = values[lower + 1], values.get(lower + 2, values[lower + 1])
+            quantiles.append(below + (position - lower) * (above - below))
+        q1, med, q3 = quantiles
+        iqr = q3 - q1
+        stats[department_value] = {'label': str(department_value), 'q1': q1, 'med': med, 'q3': q3,
+                                   'low': q1 - 1.5 * iqr, 'high': q3 + 1.5 * iqr}
+
+    limits = ', '.join('(?, ?, ?)' for _ in stats)
+    limit_params = [value for department_value, entry in stats.items() for value in (department_value, entry['low'], entry['high'])]
+    limits_cte = f'WITH limiti(reparto, basso, alto) AS (VALUES {limits})'
+    whiskers = conn.execute(f'''
+        {limits_cte}
+        SELECT d.{department}, MIN(d.{salary}), MAX(d.{salary})
+        FROM dipendenti d JOIN limiti l ON d.{department} = l.reparto
+        WHERE d.{salary} BETWEEN l.basso AND l.alto
+        GROUP BY d.{department}
+    ''', limit_params).fetchall()
+    for department_value, whislo, whishi in whiskers:
+        stats[department_value].update(whislo=whislo, whishi=whishi)
+    fliers = pd.read_sql_query(f'''
+        {limits_cte}
+        SELECT reparto, valore FROM (
+            SELECT d.{department} AS reparto, d.{salary} AS valore,
+                   ROW_NUMBER() OVER (PARTITION BY d.{department} ORDER BY {SAMPLE_ORDER}) AS campione
+            FROM dipendenti d JOIN limiti l ON d.{department} = l.reparto
+            WHERE d.{salary} < l.basso OR d.{salary} > l.alto
+        )
+        WHERE campione <= ?
+    ''', conn, params=limit_params + [max_fliers])
+    fliers_by_department = fliers.groupby('reparto')['valore']
+    for department_value, entry in stats.items():
+        entry['fliers'] = np.sort(fliers_by_department.get_group(department_value).to_numpy()) \
+            if department_value in fliers_by_department.groups else np.array([])
+        del entry['low'], entry['high']
+    return list(stats.values())
+
+def scatter_sample(conn, max_points=None):
+    """
+    Punti dello scatter plot anni di servizio/stipendio: tutte le righe fino a `max_points`,
+    oltre un campione deterministico scelto in SQL.
+    Args:
+        conn (sqlite3.Connection): Connessione al database.
+        max_points (int, optional): Punti al massimo. Default: config.SCATTER_MAX_POINTS.
+    Returns:
+        pd.DataFrame: Colonne anni_di_servizio, stipendio, reparto.
+        int: Numero totale di righe della tabella.
+    """
+    max_points = max_points or config.SCATTER_MAX_POINTS
+    total = count_rows(conn)
+    columns = f'anni_di_servizio, {config.SALARY_COLUMN}, {config.DEPARTMENT_COLUMN}'
+    if total <= max_points:
+        return pd.read_sql_query(f'SELECT {columns} FROM dipendenti', conn), total
+    return pd.read_sql_query(f'SELECT {columns} FROM dipendenti ORDER BY {SAMPLE_ORDER} LIMIT ?', conn,
+                             params=(max_points,)), total
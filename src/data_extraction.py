@@ -1,50 +1,386 @@
+import csv
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from src import config
 
+CSV_EXTENSIONS = ('.csv',)
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+
+def _import_pyarrow():
+    """Importa pyarrow solo quando serve (lettori Parquet/Arrow e CSV con motore pyarrow)."""
+    try:
+        import pyarrow
+        import pyarrow.csv
+    except ImportError as e:
+        raise ImportError("La lettura Parquet/Arrow richiede pyarrow (pip install pyarrow).") from e
+    return pyarrow
+
+def _arrow_type(pa, logical_type):
+    """Tipo Arrow corrispondente a un tipo logico di config.INPUT_SCHEMA."""
+    return {
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'string': pa.string(),
+        'timestamp': pa.timestamp('us'),
+        'category': pa.dictionary(pa.int32(), pa.string()),
+    }[logical_type]
+
+def resolve_input_files(input_path):
+    """
+    File di input indicati da `input_path`: un singolo file, una directory (tutti i file
+    CSV, Parquet e Arrow che contiene, non ricorsivamente) oppure un pattern glob (es.
+    'data/uffici/*.csv' o 'data/**/*.parquet').
+    Args:
+        input_path (str): File, directory o pattern glob.
+    Returns:
+        list: Percorsi dei file, in ordine alfabetico.
+        list: Etichette dei file per config.SOURCE_FILE_COLUMN (percorsi relativi alla directory
+            comune), oppure None se `input_path` è un singolo file.
+    Raises:
+        FileNotFoundError: Se la directory o il pattern non contengono file.
+    """
+    if os.path.isdir(input_path):
+        extensions = CSV_EXTENSIONS + PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+        files = sorted(os.path.join(input_path, name) for name in os.listdir(input_path)
+                       if name.lower().endswith(extensions) and os.path.isfile(os.path.join(input_path, name)))
+    elif glob.has_magic(input_path):
+        files = sorted(path for path in glob.glob(input_path, recursive=True) if os.path.isfile(path))
+    else:
+        return [input_path], None
+    if not files:
+        raise FileNotFoundError(f"Nessun file di input trovato in {input_path}")
+    base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    return files, [os.path.relpath(os.path.abspath(path), base_dir) for path in files]
+
+def apply_schema(df, schema=None):
+    """
+    Porta le colonne ai tipi di `schema`, convertendo solo quelle che non li hanno già
+    (i lettori tipizzati restituiscono colonne già pronte e non vengono riconvertite).
+    La conversione è tollerante: i valori non validi diventano NaN/NaT, come nella trasformazione.
+    Args:
+        df (pd.DataFrame): Dati estratti.
+        schema (dict, optional): Colonna -> tipo logico. Default: config.INPUT_SCHEMA.
+    Returns:
+        pd.DataFrame: Dati con i tipi dello schema (le colonne assenti vengono ignorate).
+    """
+    schema = config.INPUT_SCHEMA if schema is None else schema
+    converted = {}
+    for col, logical_type in schema.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if logical_type in ('int64', 'float64') and not pd.api.types.is_numeric_dtype(series):
+            converted[col] = pd.to_numeric(series, errors='coerce')
+        elif logical_type == 'timestamp' and not pd.api.types.is_datetime64_any_dtype(series):
+            converted[col] = pd.to_datetime(series, errors='coerce')
+        elif logical_type == 'category':
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                converted[col] = series.astype('category')
+            elif not series.cat.categories.is_monotonic_increasing:
+                # I dizionari Arrow seguono l'ordine di apparizione: categorie ordinate come con astype('category')
+                converted[col] = series.cat.reorder_categories(series.cat.categories.sort_values())
+    return df.assign(**converted) if converted else df
+
+class RunningStatistics:
+    def __init__(self):
+        """
+        Accumula le statistiche iniziali blocco per blocco, senza tenere in memoria l'intero file.
+        """
+        self.num_records = 0
+        self.columns = []
+        self.departments = {}  # dict usato come insieme ordinato (ordine di prima apparizione)
+        self.age_min = None
+        self.age_max = None
+        self.salary_min = None
+        self.salary_max = None
+        self.missing_values = None
+
+    @staticmethod
+    def _merge_min(current, value):
+        if pd.isna(value):
+            return current
+        return value if current is None else min(current, value)
+
+    @staticmethod
+    def _merge_max(current, value):
+        if pd.isna(value):
+            return current
+        return value if current is None else max(current, value)
+
+    def update(self, chunk):
+        """
+        Aggiorna gli aggregati con un nuovo blocco di dati.
+        Args:
+            chunk (pd.DataFrame): Blocco di dati estratto, prima della conversione tollerante dei
+                tipi: i valori mancanti contati sono quelli del file, non i valori non validi.
+        """
+        self.num_records += len(chunk)
+        if not self.columns:
+            self.columns = chunk.columns.tolist()
+
+        if config.DEPARTMENT_COLUMN in chunk.columns:
+            for department in chunk[config.DEPARTMENT_COLUMN].unique():
+                # I reparti mancanti sono elencati come nan, come in pandas.unique
+                self.departments.setdefault(np.nan if pd.isna(department) else department, None)
+        if config.AGE_COLUMN in chunk.columns:
+            # L'età può arrivare come testo: il range considera solo i valori numerici
+            ages = pd.to_numeric(chunk[config.AGE_COLUMN], errors='coerce')
+            self.age_min = self._merge_min(self.age_min, ages.min())
+            self.age_max = self._merge_max(self.age_max, ages.max())
+        if config.SALARY_COLUMN in chunk.columns:
+            salaries = pd.to_numeric(chunk[config.SALARY_COLUMN], errors='coerce')
+            self.salary_min = self._merge_min(self.salary_min, salaries.min())
+            self.salary_max = self._merge_max(self.salary_max, salaries.max())
+
+        chunk_missing = chunk.isnull().sum()
+        if self.missing_values is None:
+            self.missing_values = chunk_missing
+        else:
+            self.missing_values = self.missing_values.add(chunk_missing, fill_value=0).astype(int)
+
+    def print_report(self):
+        """Stampa le statistiche iniziali accumulate."""
+        print("\nStatistiche iniziali:")
+        print(f"Numero di record: {self.num_records}")
+        print(f"Numero di colonne: {len(self.columns)}")
+        if config.DEPARTMENT_COLUMN in self.columns:
+            print(f"Reparti presenti: {list(self.departments)}")
+        if config.AGE_COLUMN in self.columns:
+            print(f"Range età: {self.age_min} - {self.age_max}")
+        if config.SALARY_COLUMN in self.columns:
+            print(f"Range stipendio: {self.salary_min} - {self.salary_max}")
+
+        # Verifica dei valori mancanti
+        missing_values = self.missing_values if self.missing_values is not None else pd.Series(dtype=int)
+        if missing_values.sum() > 0:
+            print("\nValori mancanti rilevati:")
+            print(missing_values[missing_values > 0].to_string())
+        else:
+            print("\nNessun valore mancante rilevato inizialmente.")
+
 class DataExtractor:
-    def __init__(self, input_path):
+    def __init__(self, input_path, max_workers=None):
         """
         Inizializza l'estrattore di dati.
         Args:
-            input_path (str): Percorso del file CSV di input.
+            input_path (str): Percorso del file di input, oppure una directory o un pattern glob
+                di più file (es. un export per ufficio regionale, vedi `resolve_input_files`):
+                i file vengono letti in parallelo e ogni riga riporta il file di provenienza
+                nella colonna config.SOURCE_FILE_COLUMN.
+            max_workers (int, optional): Thread di lettura dei file. Default: config.EXTRACTION_WORKERS.
         """
         self.input_path = input_path
+        self.max_workers = max_workers
+        self.initial_stats = None
 
     def extract_data(self):
         """
-        Estrae i dati dal file CSV.
+        Estrae i dati dal file di input. Il formato è dedotto dall'estensione: CSV, Parquet
+        (.parquet, .pq) o Arrow IPC/Feather (.arrow, .feather, .ipc).
         Returns:
             pd.DataFrame: DataFrame contenente i dati estratti.
-            pd.DataFrame: Copia del DataFrame originale.
+            pd.DataFrame: Copia del DataFrame originale (superficiale: con il Copy-on-Write di pandas
+                i dati sono condivisi e una colonna viene copiata solo se uno dei due la modifica).
         Raises:
             Exception: Se si verifica un errore durante l'estrazione.
         """
         print(f"Estraendo dati da {self.input_path}...")
         try:
-            data = pd.read_csv(self.input_path)
-            data_originale = data.copy() # Salva una copia per confronti successivi
+            files, labels = resolve_input_files(self.input_path)
+            data = self._read_file(files[0]) if labels is None else self._read_files(files, labels)
             print(f"Estratti {len(data)} record.")
 
             # Mostra alcune statistiche iniziali
-            print("\nStatistiche iniziali:")
-            print(f"Numero di record: {len(data)}")
-            print(f"Numero di colonne: {len(data.columns)}")
-            if config.DEPARTMENT_COLUMN in data.columns:
-                print(f"Reparti presenti: {data[config.DEPARTMENT_COLUMN].unique()}")
-            if config.AGE_COLUMN in data.columns:
-                print(f"Range età: {data[config.AGE_COLUMN].min()} - {data[config.AGE_COLUMN].max()}")
-            if config.SALARY_COLUMN in data.columns:
-                print(f"Range stipendio: {data[config.SALARY_COLUMN].min()} - {data[config.SALARY_COLUMN].max()}")
-
-            # Verifica dei valori mancanti
-            missing_values = data.isnull().sum()
-            if missing_values.sum() > 0:
-                print("\nValori mancanti rilevati:")
-                print(missing_values[missing_values > 0].to_string())
-            else:
-                print("\nNessun valore mancante rilevato inizialmente.")
+            self.initial_stats = RunningStatistics()
+            self.initial_stats.update(data)
+            self.initial_stats.print_report()
+
+            data = apply_schema(data)
+            data_originale = data.copy(deep=False) # Salva una copia per confronti successivi (senza duplicare i dati)
             
             return data, data_originale
         except Exception as e:
             print(f"Errore durante l'estrazione: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def _schema_columns(self, available_columns):
+        """Colonne di config.INPUT_SCHEMA presenti nel file (le altre non vengono lette)."""
+        return [col for col in config.INPUT_SCHEMA if col in available_columns]
+
+    def _read_file(self, path, as_table=False):
+        """
+        Legge un intero file con il lettore adatto al formato. Le colonne con valori non conformi
+        allo schema restano come lette (la conversione tollerante avviene in `apply_schema`).
+        Args:
+            path (str): Percorso del file.
+            as_table (bool): Se restituire la tabella Arrow letta invece del DataFrame (richiede pyarrow).
+        Returns:
+            pd.DataFrame: Dati letti (oppure pyarrow.Table se `as_table`).
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension in PARQUET_EXTENSIONS:
+            _import_pyarrow()
+            import pyarrow.parquet as pq
+            table = pq.read_table(path, columns=self._schema_columns(pq.read_schema(path).names))
+        elif extension in ARROW_EXTENSIONS:
+            pa = _import_pyarrow()
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+            table = table.select(self._schema_columns(table.column_names))
+        else:
+            try:
+                _import_pyarrow()
+            except ImportError:
+                # Senza pyarrow: lettura CSV di pandas con inferenza dei tipi
+                return pd.read_csv(path)
+            table = self._read_csv_pyarrow(path)
+        return table if as_table else table.to_pandas()
+
+    def _read_files(self, files, labels):
+        """
+        Legge più file in parallelo (thread: i lettori pyarrow e pandas rilasciano il GIL) e li
+        unisce in un unico DataFrame con la colonna config.SOURCE_FILE_COLUMN.
+        Con pyarrow le tabelle vengono concatenate senza copie e convertite in pandas una sola
+        volta, invece di convertire e concatenare un DataFrame per file.
+        Args:
+            files (list): Percorsi dei file.
+            labels (list): Etichetta di ciascun file (valore della colonna di provenienza).
+        Returns:
+            pd.DataFrame: Dati di tutti i file, nell'ordine di `files`, prima di `apply_schema`.
+        """
+        max_workers = min(self.max_workers or config.EXTRACTION_WORKERS or min(32, (os.cpu_count() or 1) + 4), len(files))
+        print(f"Lettura di {len(files)} file con {max_workers} thread...")
+        try:
+            pa = _import_pyarrow()
+        except ImportError:
+            pa = None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            parts = list(executor.map(lambda path: self._read_file(path, as_table=pa is not None), files))
+
+        source_dtype = pd.CategoricalDtype(labels)
+        if pa is None:
+            parts = [part.assign(**{config.SOURCE_FILE_COLUMN: pd.Categorical.from_codes(
+                np.full(len(part), code, dtype='int32'), dtype=source_dtype)}) for code, part in enumerate(parts)]
+            data = pd.concat(parts, ignore_index=True)
+        else:
+            dictionary = pa.array(labels, type=pa.string())
+            tables = [table.append_column(config.SOURCE_FILE_COLUMN, pa.DictionaryArray.from_arrays(
+                pa.array(np.full(table.num_rows, code, dtype='int32')), dictionary)) for code, table in enumerate(parts)]
+            try:
+                # Colonne unificate per nome; tipi compatibili promossi (es. int64 e float64)
+                data = pa.concat_tables(tables, promote_options='permissive').to_pandas()
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Tipi incompatibili tra file (es. una colonna rimasta come testo): concatenazione in pandas
+                data = pd.concat([table.to_pandas() for table in tables], ignore_index=True)
+        data[config.SOURCE_FILE_COLUMN] = data[config.SOURCE_FILE_COLUMN].astype(source_dtype)
+        return data
+
+    def _read_csv_pyarrow(self, path):
+        """
+        Legge il CSV con il motore pyarrow (multi-thread) in un solo passaggio, con tutte le
+        colonne come testo, e converte poi ogni colonna al tipo di config.INPUT_SCHEMA con i
+        kernel di pyarrow. Una colonna con valori non conformi al tipo dichiarato resta come
+        testo (la conversione tollerante avviene in `apply_schema`), senza rileggere il file.
+        Returns:
+            pyarrow.Table: Tabella letta.
+        """
+        pa = _import_pyarrow()
+        import pyarrow.compute as pc
+        with open(path, newline='', encoding='utf-8') as f:
+            header = next(csv.reader(f), [])
+        columns = self._schema_columns(header)
+        table = pa.csv.read_csv(path, convert_options=pa.csv.ConvertOptions(
+            include_columns=columns,
+            # Le categorie si leggono già come dizionario (ogni testo è valido), il resto come testo
+            column_types={col: _arrow_type(pa, config.INPUT_SCHEMA[col]) if config.INPUT_SCHEMA[col] in ('string', 'category')
+                          else pa.string() for col in columns},
+            null_values=config.INPUT_NULL_VALUES,
+            strings_can_be_null=True,
+        ))
+        for i, col in enumerate(table.column_names):
+            logical_type = config.INPUT_SCHEMA[col]
+            try:
+                if logical_type == 'timestamp':
+                    converted = pc.strptime(table.column(i), format=config.INPUT_DATE_FORMAT, unit='us')
+                elif logical_type in ('int64', 'float64'):
+                    converted = pc.cast(table.column(i), _arrow_type(pa, logical_type))
+                else:
+                    continue
+            except pa.ArrowInvalid as e:
+                print(f"Valori non conformi al tipo {logical_type} nella colonna '{col}' di {path} ({e}). "
+                      "Conversione tollerante dei tipi.")
+                continue
+            table = table.set_column(i, col, converted)
+        return table
+
+    def extract_chunks(self, chunksize=None, dtypes=None):
+        """
+        Estrae i dati dal file di input in blocchi di dimensione limitata (modalità streaming).
+        I file Parquet e Arrow IPC sono letti per batch, con le colonne e i tipi di config.INPUT_SCHEMA.
+        Non viene mantenuta alcuna copia dei dati originali: la memoria occupata è
+        proporzionale a `chunksize`, non alla dimensione del file. Le statistiche
+        iniziali sono calcolate come aggregati incrementali e stampate al termine.
+        Args:
+            chunksize (int, optional): Righe per blocco. Default: config.CHUNK_SIZE.
+            dtypes (dict, optional): Tipi espliciti delle colonne CSV. Default: config.INPUT_DTYPES.
+        Yields:
+            pd.DataFrame: Blocco di dati estratto.
+        Raises:
+            Exception: Se si verifica un errore durante l'estrazione.
+        """
+        chunksize = chunksize or config.CHUNK_SIZE
+        dtypes = config.INPUT_DTYPES if dtypes is None else dtypes
+        print(f"Estraendo dati a blocchi di {chunksize} righe da {self.input_path}...")
+        self.initial_stats = RunningStatistics()
+        try:
+            for chunk in self._read_chunks(chunksize, dtypes):
+                self.initial_stats.update(chunk)
+                yield chunk
+        except Exception as e:
+            print(f"Errore durante l'estrazione: {e}")
+            raise
+
+        print(f"Estratti {self.initial_stats.num_records} record.")
+        self.initial_stats.print_report()
+
+    def _read_chunks(self, chunksize, dtypes):
+        """
+        Legge i file di input a blocchi, uno dopo l'altro (la memoria resta proporzionale a
+        `chunksize`); con più file ogni blocco riporta il file di provenienza.
+        """
+        files, labels = resolve_input_files(self.input_path)
+        if labels is None:
+            yield from self._read_file_chunks(files[0], chunksize, dtypes)
+            return
+        source_dtype = pd.CategoricalDtype(labels)
+        for code, path in enumerate(files):
+            for chunk in self._read_file_chunks(path, chunksize, dtypes):
+                yield chunk.assign(**{config.SOURCE_FILE_COLUMN: pd.Categorical.from_codes(
+                    np.full(len(chunk), code, dtype='int32'), dtype=source_dtype)})
+
+    def _read_file_chunks(self, path, chunksize, dtypes):
+        """Legge un file a blocchi con il lettore adatto al formato."""
+        extension = os.path.splitext(path)[1].lower()
+        if extension in PARQUET_EXTENSIONS:
+            _import_pyarrow()
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(path)
+            columns = self._schema_columns(parquet_file.schema_arrow.names)
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+                yield apply_schema(batch.to_pandas())
+        elif extension in ARROW_EXTENSIONS:
+            pa = _import_pyarrow()
+            with pa.memory_map(path) as source:
+                reader = pa.ipc.open_file(source)
+                columns = self._schema_columns(reader.schema.names)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i).select(columns)
+                    for start in range(0, batch.num_rows, chunksize):
+                        yield apply_schema(batch.slice(start, chunksize).to_pandas())
+        else:
+            with pd.read_csv(path, dtype=dtypes, chunksize=chunksize) as reader:
+                yield from reader
@@ -1,9 +1,113 @@
+import hashlib
+from abc import ABC, abstractmethod
 import sqlite3
 import os
+import shutil
+import time
+import numpy as np
 import pandas as pd
 from src import config
+from src.aggregation import STATISTICS, SUMMARY_TABLES, sql_select_list
+from src.data_transformation import row_hashes
+from src.db_pool import read_metadata
+from src.fingerprint_index import RowFingerprintIndex
 
-class DataLoader:
+def widen_float(series):
+    """
+    Riporta una colonna float32 (compattata dalla trasformazione) a float64, riarrotondando
+    ai decimali di config.DERIVED_COLUMN_DECIMALS: viene scritto 12.3 e non 12.300000190734863.
+    """
+    widened = series.astype('float64')
+    decimals = config.DERIVED_COLUMN_DECIMALS.get(series.name)
+    return widened.round(decimals) if decimals is not None else widened
+
+class ContentFingerprint:
+    def __init__(self):
+        """
+        Impronta del contenuto di una tabella costruita blocco per blocco: somma (modulo 2^64)
+        degli hash delle righe e numero di righe. Non dipende dall'ordine delle righe né dalla
+        suddivisione in blocchi, quindi gli stessi dati producono la stessa impronta.
+        """
+        self.columns = None
+        self.rows = 0
+        self.hash_sum = np.uint64(0)
+
+    def update(self, df):
+        if self.columns is None:
+            self.columns = list(df.columns)
+        self.rows += len(df)
+        with np.errstate(over='ignore'):
+            self.hash_sum += row_hashes(df, list(df.columns)).sum(dtype='uint64')
+
+    def hexdigest(self):
+        payload = f"{self.columns}|{self.rows}|{int(self.hash_sum)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def write_to_sinks(chunks, sinks):
+    """
+    Scrive una sequenza di blocchi su più destinazioni in un solo passaggio: ogni blocco
+    viene consegnato a tutte le destinazioni prima di passare al successivo, così anche
+    un generatore (modalità out-of-core) viene consumato una sola volta.
+    Args:
+        chunks (iterable): Blocchi di DataFrame trasformati.
+        sinks (list): Istanze di DataSink.
+    Raises:
+        Exception: Se una destinazione fallisce; le destinazioni non ancora confermate vengono annullate.
+    """
+    sinks = list(sinks)
+    try:
+        for sink in sinks:
+            sink.begin()
+        for chunk in chunks:
+            for sink in sinks:
+                sink.write_chunk(chunk)
+        for sink in sinks:
+            sink.commit()
+    except Exception:
+        for sink in sinks:
+            sink.abort()
+        raise
+
+class DataSink(ABC):
+    """
+    Destinazione dei dati trasformati. Un caricamento completo è la sequenza
+    begin() -> write_chunk() (una o più volte) -> commit(); in caso di errore viene chiamato
+    abort(). Il contenuto precedente della destinazione viene sostituito solo al commit.
+    """
+    @abstractmethod
+    def begin(self):
+        """Prepara un nuovo caricamento completo."""
+
+    @abstractmethod
+    def write_chunk(self, df):
+        """Scrive un blocco di dati trasformati."""
+
+    @abstractmethod
+    def commit(self):
+        """Rende visibile il caricamento, sostituendo il contenuto precedente."""
+
+    @abstractmethod
+    def abort(self):
+        """Annulla il caricamento in corso (nessun effetto se non ce n'è uno)."""
+
+    def output_signature(self):
+        """
+        Firma dell'output attualmente scritto (serializzabile in JSON, es. file con dimensioni e
+        date di modifica), per riconoscere un output rimosso o modificato dopo l'ultimo caricamento.
+        Returns:
+            object: Firma, oppure None se l'output è assente o non verificabile (da riscrivere).
+        """
+        return None
+
+    def write(self, df):
+        """Sostituisce il contenuto della destinazione con `df`."""
+        write_to_sinks([df], [self])
+
+    def write_chunks(self, chunks):
+        """Sostituisce il contenuto della destinazione con i blocchi di `chunks`."""
+        write_to_sinks(chunks, [self])
+
+class DataLoader(DataSink):
     def __init__(self, db_path):
         """
         Inizializza il caricatore di dati.
@@ -11,74 +115,733 @@ class DataLoader:
             db_path (str): Percorso del database SQLite di output.
         """
         self.db_path = db_path
+        self._conn = None # Connessione del caricamento completo in corso (begin/commit)
+        self._shadow_created = False
+        # GroupStatistics dei dati del prossimo caricamento completo: se presenti, le tabelle di
+        # riepilogo vengono scritte da queste invece di essere ricalcolate in SQL (azzerate al commit)
+        self.group_statistics = None
+        self._fingerprint = None # ContentFingerprint del caricamento completo in corso
+        self._append_conn = None # Connessione del caricamento in accodamento in corso (begin_append/commit_append)
+        self._append_groups = None
+        self._append_fingerprint = None
+        self._append_rows = 0
 
-    def load_data(self, df):
+    def _connect(self, autocommit=True):
         """
-        Carica i dati trasformati in un database SQLite e crea viste.
+        Apre una connessione al database con le pragma di config.SQLITE_PRAGMAS.
+        Args:
+            autocommit (bool): Se True le transazioni sono gestite esplicitamente (isolation_level=None),
+                altrimenti si usa la gestione implicita di sqlite3 (richiesta da `to_sql`).
+        """
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, isolation_level=None if autocommit else 'DEFERRED')
+        for pragma, value in config.SQLITE_PRAGMAS.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def load_data(self, df, method='bulk', statistics=None):
+        """
+        Carica i dati trasformati in un database SQLite e crea le tabelle di riepilogo.
+        I dati sono scritti in una tabella ombra e sostituiscono `dipendenti` con uno scambio
+        atomico, quindi chi legge il database non vede mai una tabella vuota o parziale.
         Args:
             df (pd.DataFrame): DataFrame trasformato da caricare.
+            method (str): 'bulk' (schema esplicito, executemany a lotti in un'unica transazione)
+                oppure 'to_sql' (caricamento tramite DataFrame.to_sql, mantenuto per confronto).
+            statistics (GroupStatistics, optional): Statistiche di gruppo di `df` già calcolate,
+                usate per le tabelle di riepilogo.
         Raises:
-            ValueError: Se il DataFrame è None.
+            ValueError: Se il DataFrame è None o il metodo non è supportato.
             Exception: Se si verifica un errore durante il caricamento.
         """
         print(f"\nCaricamento dei dati in {self.db_path}...")
         if df is None:
             raise ValueError("Nessun dato da caricare. Esegui prima la trasformazione.")
+        if method == 'bulk':
+            self.load_chunks([df], verbose=False, statistics=statistics)
+            return
+        if method != 'to_sql':
+            raise ValueError(f"Metodo di caricamento non supportato: {method}")
 
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
+        self.group_statistics = statistics
+        conn = self._connect()
 
         try:
-            df.to_sql('dipendenti', conn, if_exists='replace', index=False)
+            shadow_conn = self._connect(autocommit=False)
+            try:
+                float32_columns = [col for col in df.columns if df[col].dtype == 'float32']
+                df = df.assign(**{col: widen_float(df[col]) for col in float32_columns})
+                df.to_sql(config.DIPENDENTI_SHADOW_TABLE, shadow_conn, if_exists='replace', index=False)
+                shadow_conn.commit()
+            finally:
+                shadow_conn.close()
+            fingerprint = ContentFingerprint()
+            fingerprint.update(df)
+            self._swap_in_shadow_table(conn, self.group_statistics, fingerprint.hexdigest())
+            self._print_load_summary(conn)
             
-            conn.execute('''
-                CREATE VIEW IF NOT EXISTS analisi_per_reparto AS
-                SELECT 
-                    reparto,
-                    COUNT(*) as numero_dipendenti,
-                    AVG(stipendio) as stipendio_medio,
-                    MIN(stipendio) as stipendio_min,
-                    MAX(stipendio) as stipendio_max,
-                    AVG(anni_di_servizio) as media_anni_servizio,
-                    SUM(bonus) as totale_bonus
-                FROM dipendenti
-                GROUP BY reparto
-            ''')
+        except Exception as e:
+            self._discard_shadow_table(conn)
+            print(f"Errore durante il caricamento: {e}")
+            raise
+        finally:
+            self.group_statistics = None
+            conn.close()
             
-            conn.execute('''
-                CREATE VIEW IF NOT EXISTS analisi_per_fascia_eta AS
-                SELECT 
-                    fascia_eta,
-                    COUNT(*) as numero_dipendenti,
-                    AVG(stipendio) as stipendio_medio,
-                    MIN(stipendio) as stipendio_min,
-                    MAX(stipendio) as stipendio_max,
-                    AVG(anni_di_servizio) as media_anni_servizio
+    def load_chunks(self, chunks, verbose=True, statistics=None):
+        """
+        Carica nel database SQLite una sequenza di blocchi trasformati (modalità out-of-core),
+        sostituendo la tabella `dipendenti` solo al termine del caricamento.
+        Args:
+            chunks (iterable): Blocchi di DataFrame trasformati (es. DataTransformer.transform_chunks()).
+            verbose (bool): Se stampare il messaggio di avvio del caricamento.
+            statistics (GroupStatistics, optional): Statistiche di gruppo dei blocchi, complete al
+                termine dell'iterazione (possono essere aggiornate mentre i blocchi vengono prodotti).
+        Raises:
+            Exception: Se si verifica un errore durante il caricamento (`dipendenti` resta invariata).
+        """
+        if verbose:
+            print(f"\nCaricamento a blocchi dei dati in {self.db_path}...")
+        self.group_statistics = statistics
+        try:
+            self.write_chunks(chunks)
+        except Exception as e:
+            print(f"Errore durante il caricamento: {e}")
+            raise
+
+    def begin(self):
+        """
+        Avvia un caricamento completo: i blocchi vengono scritti nella tabella ombra
+        config.DIPENDENTI_SHADOW_TABLE (schema esplicito, inserimenti a lotti) in un'unica transazione.
+        """
+        self._conn = self._connect()
+        self._shadow_created = False
+        self._fingerprint = ContentFingerprint()
+        self._conn.execute('BEGIN')
+        self._conn.execute(f'DROP TABLE IF EXISTS "{config.DIPENDENTI_SHADOW_TABLE}"')
+
+    def write_chunk(self, df):
+        if not self._shadow_created:
+            self._create_table(self._conn, config.DIPENDENTI_SHADOW_TABLE, df)
+            self._shadow_created = True
+        self._bulk_insert(self._conn, config.DIPENDENTI_SHADOW_TABLE, df)
+        self._fingerprint.update(df)
+
+    def commit(self):
+        """Conferma la tabella ombra e la scambia con `dipendenti` (vedi `_swap_in_shadow_table`)."""
+        conn, self._conn = self._conn, None
+        statistics, self.group_statistics = self.group_statistics, None
+        fingerprint, self._fingerprint = self._fingerprint, None
+        try:
+            if not self._shadow_created:
+                conn.execute('ROLLBACK')
+                print("Nessun blocco da caricare.")
+                return
+            conn.execute('COMMIT')
+            self._swap_in_shadow_table(conn, statistics, fingerprint.hexdigest())
+            self._print_load_summary(conn)
+        except Exception:
+            self._discard_shadow_table(conn)
+            raise
+        finally:
+            conn.close()
+
+    def abort(self):
+        self.group_statistics = None
+        self._fingerprint = None
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        try:
+            self._discard_shadow_table(conn)
+        finally:
+            conn.close()
+
+    def begin_append(self):
+        """
+        Avvia un caricamento in accodamento: le righe di un nuovo lotto vengono aggiunte a
+        `dipendenti` (creata se assente) in un'unica transazione, insieme alle loro impronte
+        nell'indice dei duplicati tra esecuzioni (config.FINGERPRINT_TABLE).
+        Returns:
+            RowFingerprintIndex: Indice delle impronte, sulla connessione della transazione.
+        """
+        self._append_conn = self._connect()
+        self._append_groups = {}
+        self._append_fingerprint = ContentFingerprint()
+        self._append_rows = 0
+        self._append_conn.execute('BEGIN IMMEDIATE')
+        fingerprint_index = RowFingerprintIndex(self._append_conn)
+        if not fingerprint_index.exists():
+            if self._append_conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dipendenti'").fetchone():
+                print("Attenzione: `dipendenti` non è stata caricata in accodamento: i duplicati tra esecuzioni "
+                      "sono riconosciuti solo rispetto ai lotti accodati da ora in poi.")
+            fingerprint_index.create()
+        return fingerprint_index
+
+    def append_chunk(self, df):
+        """Aggiunge a `dipendenti` un blocco trasformato del caricamento in accodamento in corso."""
+        conn = self._append_conn
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dipendenti'").fetchone():
+            self._create_table(conn, 'dipendenti', df)
+        else:
+            # Es. un lotto da più file aggiunge la colonna del file di provenienza
+            existing_columns = {row[1] for row in conn.execute('PRAGMA table_info("dipendenti")')}
+            for col in df.columns:
+                if col not in existing_columns:
+                    conn.execute(f'ALTER TABLE dipendenti ADD COLUMN "{col}" {config.DIPENDENTI_SCHEMA.get(col) or self._sql_type(df[col])}')
+        for col, values in self._affected_groups(conn, df).items():
+            self._append_groups.setdefault(col, set()).update(values)
+        self._bulk_insert(conn, 'dipendenti', df)
+        self._append_fingerprint.update(df)
+        self._append_rows += len(df)
+
+    def commit_append(self):
+        """
+        Conferma il caricamento in accodamento: indici, ricalcolo dei soli gruppi toccati nelle
+        tabelle di riepilogo e nuova versione dei dati (se sono state aggiunte righe).
+        Returns:
+            int: Numero di righe aggiunte.
+        """
+        conn, self._append_conn = self._append_conn, None
+        groups, self._append_groups = self._append_groups, None
+        fingerprint, self._append_fingerprint = self._append_fingerprint, None
+        rows, self._append_rows = self._append_rows, 0
+        try:
+            if rows:
+                self._create_indexes(conn)
+                existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                if set(SUMMARY_TABLES) <= existing:
+                    self._refresh_summary_groups(conn, groups)
+                else:
+                    self._create_summary_tables(conn)
+                # Impronta della versione precedente combinata con quella delle righe aggiunte
+                payload = f"{read_metadata(conn).get('impronta_dati')}|{fingerprint.hexdigest()}"
+                self._write_data_version(conn, hashlib.sha256(payload.encode('utf-8')).hexdigest())
+            conn.execute('COMMIT')
+            print(f"Accodati {rows} record.")
+            if rows:
+                self._print_load_summary(conn)
+            return rows
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def abort_append(self):
+        """Annulla il caricamento in accodamento in corso, impronte comprese (nessun effetto se non ce n'è uno)."""
+        self._append_groups = None
+        self._append_fingerprint = None
+        self._append_rows = 0
+        if self._append_conn is None:
+            return
+        conn, self._append_conn = self._append_conn, None
+        try:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+        finally:
+            conn.close()
+
+    def _swap_in_shadow_table(self, conn, statistics=None, fingerprint=None):
+        """
+        Sostituisce `dipendenti` con la tabella ombra in un'unica transazione (rinomina, indici,
+        tabelle di riepilogo, versione dei dati).
+        In modalità WAL i lettori continuano a vedere la versione precedente fino al COMMIT,
+        senza tabelle vuote o parziali e senza attendere il caricamento.
+        Args:
+            statistics (GroupStatistics, optional): Statistiche da cui scrivere le tabelle di riepilogo.
+            fingerprint (str, optional): Impronta del contenuto caricato (vedi `_write_data_version`).
+        """
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Le viste delle versioni precedenti farebbero fallire la rinomina (puntano a una tabella eliminata)
+            self._drop_summary_tables(conn)
+            conn.execute('DROP TABLE IF EXISTS dipendenti')
+            conn.execute(f'ALTER TABLE "{config.DIPENDENTI_SHADOW_TABLE}" RENAME TO dipendenti')
+            self._create_indexes(conn)
+            self._drop_incremental_state(conn)
+            self._create_summary_tables(conn, statistics)
+            self._write_data_version(conn, fingerprint)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _write_data_version(self, conn, fingerprint):
+        """
+        Aggiorna la versione dei dati in config.METADATA_TABLE, nella transazione del caricamento.
+        La versione ('versione_dati', un contatore) aumenta solo se l'impronta del contenuto
+        ('impronta_dati') cambia: ricaricare gli stessi dati non invalida le cache dei lettori.
+        Args:
+            conn (sqlite3.Connection): Connessione con la transazione del caricamento aperta.
+            fingerprint (str): Impronta del contenuto di `dipendenti` dopo il caricamento.
+        Returns:
+            bool: True se la versione è cambiata.
+        """
+        self._create_metadata_table(conn)
+        metadata = read_metadata(conn)
+        if fingerprint is not None and metadata.get('impronta_dati') == fingerprint:
+            return False
+        conn.executemany(f'INSERT OR REPLACE INTO "{config.METADATA_TABLE}" (chiave, valore) VALUES (?, ?)', [
+            ('versione_dati', str(int(metadata.get('versione_dati', 0)) + 1)),
+            ('impronta_dati', fingerprint),
+            ('aggiornato_il', time.strftime('%Y-%m-%dT%H:%M:%S%z')),
+        ])
+        return True
+
+    @staticmethod
+    def _create_metadata_table(conn):
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{config.METADATA_TABLE}" (chiave TEXT PRIMARY KEY, valore TEXT)')
+
+    def write_metadata(self, values):
+        """
+        Scrive chiavi di config.METADATA_TABLE in un'unica transazione (es. l'impronta
+        dell'ultima esecuzione completa della pipeline).
+        Args:
+            values (dict): Chiave -> valore testuale; None elimina la chiave.
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            self._create_metadata_table(conn)
+            conn.executemany(f'INSERT OR REPLACE INTO "{config.METADATA_TABLE}" (chiave, valore) VALUES (?, ?)',
+                             [(key, value) for key, value in values.items() if value is not None])
+            conn.executemany(f'DELETE FROM "{config.METADATA_TABLE}" WHERE chiave = ?',
+                             [(key,) for key, value in values.items() if value is None])
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _discard_shadow_table(self, conn):
+        """Annulla la transazione in corso ed elimina la tabella ombra di un caricamento fallito."""
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        conn.execute(f'DROP TABLE IF EXISTS "{config.DIPENDENTI_SHADOW_TABLE}"')
+
+    @staticmethod
+    def _sql_type(series):
+        """Tipo SQLite per una colonna non presente in config.DIPENDENTI_SCHEMA."""
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+            return 'INTEGER'
+        if pd.api.types.is_float_dtype(series):
+            return 'REAL'
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return 'TIMESTAMP'
+        return 'TEXT'
+
+    def _create_table(self, conn, table, df):
+        """Crea `table` con lo schema esplicito di config.DIPENDENTI_SCHEMA per le colonne di `df`."""
+        columns = ',\n'.join(
+            f'    "{col}" {config.DIPENDENTI_SCHEMA.get(col) or self._sql_type(df[col])}' for col in df.columns
+        )
+        conn.execute(f'CREATE TABLE "{table}" (\n{columns}\n)')
+
+    def _create_indexes(self, conn, table='dipendenti'):
+        """Crea gli indici di config.DIPENDENTI_INDEXES (dopo il caricamento, per non rallentare gli inserimenti)."""
+        existing_columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+        for col in config.DIPENDENTI_INDEXES:
+            if col in existing_columns:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_{col}" ON "{table}" ("{col}")')
+
+    def _drop_incremental_state(self, conn):
+        """
+        Elimina lo stato dell'ETL incrementale e l'indice delle impronte dell'accodamento,
+        non più validi dopo una sostituzione completa della tabella.
+        """
+        for table in (config.INCREMENTAL_STATE_TABLE, config.INCREMENTAL_SALARY_AGGREGATES_TABLE,
+                      config.INCREMENTAL_HIRE_DATE_AGGREGATES_TABLE, config.FINGERPRINT_TABLE):
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+
+    def _drop_summary_tables(self, conn):
+        """Elimina le tabelle di riepilogo (o le viste omonime create dalle versioni precedenti)."""
+        for name in SUMMARY_TABLES:
+            row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+            if row is not None:
+                conn.execute(f'DROP {"VIEW" if row[0] == "view" else "TABLE"} "{name}"')
+
+    def _create_summary_tables(self, conn, statistics=None):
+        """
+        Materializza le tabelle di riepilogo di SUMMARY_TABLES, con un indice sulla colonna di
+        raggruppamento: le letture della dashboard costano O(gruppi) invece di una scansione
+        di tutta la tabella.
+        Args:
+            statistics (GroupStatistics, optional): Statistiche già calcolate sui dati caricati
+                (nessuna scansione di `dipendenti`); se None le tabelle sono calcolate in SQL.
+        """
+        self._drop_summary_tables(conn)
+        summary_frames = statistics.summary_tables() if statistics is not None else {}
+        for name, (group_column, statistic_names) in SUMMARY_TABLES.items():
+            if name in summary_frames:
+                columns = ',\n'.join([f'    "{group_column}" TEXT'] +
+                                      [f'    "{statistic}" {STATISTICS[statistic][1]}' for statistic in statistic_names])
+                conn.execute(f'CREATE TABLE "{name}" (\n{columns}\n)')
+                self._bulk_insert(conn, name, summary_frames[name])
+            else:
+                conn.execute(f'''
+                    CREATE TABLE "{name}" AS
+                    SELECT "{group_column}", {sql_select_list(statistic_names)}
+                    FROM dipendenti
+                    GROUP BY "{group_column}"
+                ''')
+            conn.execute(f'CREATE INDEX "idx_{name}_{group_column}" ON "{name}" ("{group_column}")')
+
+    def _affected_groups(self, conn, df=None, id_table=None):
+        """
+        Raccoglie i valori delle colonne di raggruppamento toccati da un delta.
+        Args:
+            df (pd.DataFrame, optional): Righe inserite.
+            id_table (str, optional): Tabella temporanea con gli id delle righe eliminate da `dipendenti`.
+        Returns:
+            dict: Colonna di raggruppamento -> insieme dei valori (None per i valori mancanti).
+        """
+        group_columns = [group_column for group_column, _ in SUMMARY_TABLES.values()]
+        groups = {col: set() for col in group_columns}
+        if id_table is not None:
+            columns = ', '.join(f'"{col}"' for col in group_columns)
+            for row in conn.execute(f'SELECT DISTINCT {columns} FROM dipendenti WHERE id IN (SELECT id FROM "{id_table}")'):
+                for col, value in zip(group_columns, row):
+                    groups[col].add(value)
+        if df is not None:
+            for col in group_columns:
+                if col in df.columns:
+                    values = pd.unique(df[col].astype(object))
+                    groups[col].update(None if pd.isna(value) else value for value in values)
+        return groups
+
+    def _refresh_summary_groups(self, conn, groups):
+        """
+        Ricalcola nelle tabelle di riepilogo solo i gruppi indicati, usando gli indici di `dipendenti`
+        sulle colonne di raggruppamento.
+        Args:
+            groups (dict): Colonna di raggruppamento -> insieme dei valori da ricalcolare (vedi `_affected_groups`).
+        """
+        for name, (group_column, statistic_names) in SUMMARY_TABLES.items():
+            values = [value for value in groups.get(group_column, ()) if value is not None]
+            conditions = []
+            if values:
+                conditions.append(f'"{group_column}" IN ({", ".join("?" for _ in values)})')
+            if None in groups.get(group_column, ()):
+                conditions.append(f'"{group_column}" IS NULL')
+            if not conditions:
+                continue
+            where = ' OR '.join(conditions)
+            conn.execute(f'DELETE FROM "{name}" WHERE {where}', values)
+            conn.execute(f'''
+                INSERT INTO "{name}"
+                SELECT "{group_column}", {sql_select_list(statistic_names)}
                 FROM dipendenti
-                GROUP BY fascia_eta
+                WHERE {where}
+                GROUP BY "{group_column}"
+            ''', values)
+
+    def _print_load_summary(self, conn):
+        """Stampa il numero di record caricati e le tabelle di riepilogo disponibili."""
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM dipendenti')
+        total_records = cursor.fetchone()[0]
+        
+        print(f"Caricati con successo {total_records} record nel database.")
+        print(f"Tabelle di riepilogo create/aggiornate: {', '.join(SUMMARY_TABLES)}")
+
+    @staticmethod
+    def _sql_values(df):
+        """
+        Converte un DataFrame in una matrice (righe x colonne) di tipi Python nativi accettati da sqlite3
+        (date come testo 'YYYY-MM-DD HH:MM:SS', come fa `to_sql`; NaN/NaT come NULL).
+        """
+        values = np.empty((len(df), len(df.columns)), dtype=object)
+        for position, col in enumerate(df.columns):
+            series = df[col]
+            if series.dtype == 'float32':
+                series = widen_float(series)
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                series = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+            if series.hasnans:
+                series = series.astype(object)
+                series = series.where(series.notna(), None)
+            # tolist() restituisce già int/float/str Python
+            values[:, position] = series.tolist()
+        return values
+
+    def _bulk_insert(self, conn, table, df, batch_size=None):
+        """
+        Inserisce le righe di `df` in `table` con executemany, a lotti di `batch_size` righe
+        (le colonne devono esistere nella tabella). Ogni istruzione INSERT inserisce
+        config.LOAD_ROWS_PER_STATEMENT righe, per ridurre il costo per riga di sqlite3.
+        Non apre né chiude transazioni.
+        """
+        if df.empty:
+            return
+        batch_size = batch_size or config.LOAD_BATCH_SIZE
+        column_count = len(df.columns)
+        # Limite storico di SQLite sul numero di parametri per istruzione
+        rows_per_statement = max(1, min(config.LOAD_ROWS_PER_STATEMENT, 999 // column_count))
+        columns = ', '.join(f'"{col}"' for col in df.columns)
+        row_placeholders = '(' + ', '.join('?' for _ in df.columns) + ')'
+        single_row_statement = f'INSERT INTO "{table}" ({columns}) VALUES {row_placeholders}'
+        multi_row_statement = f'INSERT INTO "{table}" ({columns}) VALUES ' + ', '.join([row_placeholders] * rows_per_statement)
+        for start in range(0, len(df), batch_size):
+            values = self._sql_values(df.iloc[start:start + batch_size])
+            grouped_rows = len(values) - len(values) % rows_per_statement
+            if grouped_rows:
+                conn.executemany(multi_row_statement,
+                                 values[:grouped_rows].reshape(-1, rows_per_statement * column_count).tolist())
+            conn.executemany(single_row_statement, values[grouped_rows:].tolist())
+
+    def read_table_chunks(self, chunksize=None):
+        """
+        Rilegge la tabella `dipendenti` a blocchi (es. per esportarla verso altre destinazioni
+        dopo un caricamento incrementale).
+        Args:
+            chunksize (int, optional): Righe per blocco. Default: config.CHUNK_SIZE.
+        Yields:
+            pd.DataFrame: Blocchi della tabella, con `data_assunzione` come datetime.
+        """
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=config.SQLITE_READ_TIMEOUT)
+        try:
+            yield from pd.read_sql_query('SELECT * FROM dipendenti ORDER BY id', conn,
+                                         chunksize=chunksize or config.CHUNK_SIZE,
+                                         parse_dates=[config.HIRE_DATE_COLUMN])
+        finally:
+            conn.close()
+
+    def read_data_version(self):
+        """
+        Versione dei dati del database (vedi `_write_data_version`).
+        Returns:
+            dict: Metadati dei caricamenti ('versione_dati', 'impronta_dati', 'aggiornato_il');
+                vuoto se il database non esiste o non ha metadati.
+        """
+        if not os.path.exists(self.db_path):
+            return {}
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=config.SQLITE_READ_TIMEOUT)
+        try:
+            return read_metadata(conn)
+        finally:
+            conn.close()
+
+    def read_incremental_state(self):
+        """
+        Legge lo stato persistito dall'ETL incrementale.
+        Returns:
+            tuple: (stato per id, aggregati degli stipendi, istogrammi delle date) come DataFrame,
+                oppure (None, None, None) se il database o lo stato non esistono.
+        """
+        if not os.path.exists(self.db_path):
+            return None, None, None
+        conn = sqlite3.connect(self.db_path)
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            required_tables = {'dipendenti', config.INCREMENTAL_STATE_TABLE,
+                               config.INCREMENTAL_SALARY_AGGREGATES_TABLE, config.INCREMENTAL_HIRE_DATE_AGGREGATES_TABLE}
+            if not required_tables <= tables:
+                return None, None, None
+            state = pd.read_sql_query(f'SELECT * FROM "{config.INCREMENTAL_STATE_TABLE}"', conn)
+            salary_aggregates = pd.read_sql_query(f'SELECT * FROM "{config.INCREMENTAL_SALARY_AGGREGATES_TABLE}"', conn)
+            hire_date_aggregates = pd.read_sql_query(f'SELECT * FROM "{config.INCREMENTAL_HIRE_DATE_AGGREGATES_TABLE}"', conn)
+            return state, salary_aggregates, hire_date_aggregates
+        finally:
+            conn.close()
+
+    def apply_delta(self, rows_to_insert, ids_to_delete, state_rows, state_ids_to_delete,
+                    salary_aggregates, hire_date_aggregates, valuation_means, full_rebuild=False):
+        """
+        Applica un delta dell'ETL incrementale in un'unica transazione: elimina e reinserisce
+        le righe modificate (upsert per id), aggiorna `valutazione_stipendio` nei reparti la cui
+        media è cambiata, ricalcola nelle tabelle di riepilogo i soli gruppi toccati dal delta
+        e sostituisce stato e aggregati persistiti.
+        Args:
+            rows_to_insert (pd.DataFrame): Righe trasformate da inserire in `dipendenti`.
+            ids_to_delete (list): Id da eliminare da `dipendenti` prima dell'inserimento.
+            state_rows (pd.DataFrame): Righe di stato da inserire o sostituire (per id).
+            state_ids_to_delete (list): Id da eliminare dallo stato.
+            salary_aggregates (pd.DataFrame): Colonne reparto, somma, conteggio.
+            hire_date_aggregates (pd.DataFrame): Colonne reparto, data_assunzione (nanosecondi), conteggio.
+            valuation_means (dict): Reparto -> stipendio medio, per i reparti da rivalutare.
+            full_rebuild (bool): Se ricostruire da zero tabella e stato.
+        Raises:
+            Exception: Se si verifica un errore durante il caricamento (la transazione viene annullata).
+        """
+        print(f"\nCaricamento incrementale dei dati in {self.db_path}...")
+        conn = self._connect()
+        state_table = config.INCREMENTAL_STATE_TABLE
+        salary_table = config.INCREMENTAL_SALARY_AGGREGATES_TABLE
+        date_table = config.INCREMENTAL_HIRE_DATE_AGGREGATES_TABLE
+
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # Le righe eliminate dal delta renderebbero obsolete le impronte dell'accodamento
+            conn.execute(f'DROP TABLE IF EXISTS "{config.FINGERPRINT_TABLE}"')
+            if full_rebuild:
+                self._drop_summary_tables(conn)
+                for table in ('dipendenti', state_table, salary_table, date_table):
+                    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS "{state_table}" (
+                    id INTEGER PRIMARY KEY,
+                    hash_riga INTEGER,
+                    hash_contenuto INTEGER,
+                    esito TEXT,
+                    reparto TEXT,
+                    stipendio REAL,
+                    data_assunzione INTEGER -- microsecondi dall'epoch, NULL se imputata
+                )
             ''')
-            
-            conn.execute('''
-                CREATE VIEW IF NOT EXISTS analisi_per_anzianita AS
-                SELECT 
-                    anzianita,
-                    COUNT(*) as numero_dipendenti,
-                    AVG(stipendio) as stipendio_medio,
-                    MIN(stipendio) as stipendio_min,
-                    MAX(stipendio) as stipendio_max
-                FROM dipendenti
-                GROUP BY anzianita
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{salary_table}" (reparto TEXT PRIMARY KEY, somma REAL, conteggio INTEGER)')
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS "{date_table}" (
+                    reparto TEXT, data_assunzione INTEGER, conteggio INTEGER,
+                    PRIMARY KEY (reparto, data_assunzione)
+                )
             ''')
-            
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM dipendenti')
-            total_records = cursor.fetchone()[0]
-            
-            print(f"Caricati con successo {total_records} record nel database.")
-            print("Viste create/aggiornate: analisi_per_reparto, analisi_per_fascia_eta, analisi_per_anzianita")
-            
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dipendenti'").fetchone():
+                self._create_table(conn, 'dipendenti', rows_to_insert)
+
+            # Upsert per id: eliminazione delle versioni precedenti e inserimento delle nuove
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS _id_da_eliminare (id INTEGER PRIMARY KEY)')
+            conn.execute('DELETE FROM _id_da_eliminare')
+            conn.executemany('INSERT OR IGNORE INTO _id_da_eliminare VALUES (?)', [(int(i),) for i in ids_to_delete])
+            affected_groups = self._affected_groups(conn, rows_to_insert, id_table='_id_da_eliminare')
+            conn.execute('DELETE FROM dipendenti WHERE id IN (SELECT id FROM _id_da_eliminare)')
+            self._bulk_insert(conn, 'dipendenti', rows_to_insert)
+            self._create_indexes(conn)
+
+            # Rivalutazione degli stipendi nei reparti la cui media è cambiata
+            conn.executemany('''
+                UPDATE dipendenti SET valutazione_stipendio = CASE
+                    WHEN stipendio > :media * :fattore_sopra THEN 'Sopra Media'
+                    WHEN stipendio < :media * :fattore_sotto THEN 'Sotto Media'
+                    ELSE 'Nella Media'
+                END
+                WHERE reparto = :reparto
+            ''', [{'reparto': department, 'media': float(mean),
+                  'fattore_sopra': config.VALUATION_UPPER_FACTOR, 'fattore_sotto': config.VALUATION_LOWER_FACTOR}
+                 for department, mean in valuation_means.items()])
+
+            # Stato per id e aggregati per reparto
+            conn.executemany(f'DELETE FROM "{state_table}" WHERE id = ?', [(int(i),) for i in state_ids_to_delete])
+            columns = ', '.join(state_rows.columns)
+            placeholders = ', '.join('?' for _ in state_rows.columns)
+            conn.executemany(f'INSERT OR REPLACE INTO "{state_table}" ({columns}) VALUES ({placeholders})',
+                             self._sql_values(state_rows).tolist())
+            conn.execute(f'DELETE FROM "{salary_table}"')
+            self._bulk_insert(conn, salary_table, salary_aggregates)
+            conn.execute(f'DELETE FROM "{date_table}"')
+            self._bulk_insert(conn, date_table, hire_date_aggregates)
+
+            # Tabelle di riepilogo: ricalcolo dei soli gruppi toccati (creazione completa se assenti)
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if set(SUMMARY_TABLES) <= existing:
+                self._refresh_summary_groups(conn, affected_groups)
+            else:
+                self._create_summary_tables(conn)
+
+            # Nuova versione dei dati solo se `dipendenti` è cambiata: impronta della versione
+            # precedente combinata con quella del delta
+            if full_rebuild or len(rows_to_insert) or len(ids_to_delete) or valuation_means:
+                delta = ContentFingerprint()
+                delta.update(rows_to_insert)
+                payload = f"{read_metadata(conn).get('impronta_dati')}|{delta.hexdigest()}|{sorted(map(int, ids_to_delete))}|{sorted(valuation_means.items())}"
+                self._write_data_version(conn, hashlib.sha256(payload.encode('utf-8')).hexdigest())
+            conn.execute('COMMIT')
+            self._print_load_summary(conn)
+
         except Exception as e:
-            print(f"Errore durante il caricamento: {e}")
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            print(f"Errore durante il caricamento incrementale: {e}")
             raise
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+class ParquetSink(DataSink):
+    def __init__(self, output_dir, partition_column=None, dictionary_columns=None):
+        """
+        Destinazione colonnare: scrive `dipendenti` come dataset Parquet partizionato
+        (una directory `reparto=<valore>` per reparto) con le colonne a bassa cardinalità
+        codificate a dizionario. I lettori possono escludere partizioni e colonne e mappare
+        i file in memoria (es. pyarrow.dataset.dataset(output_dir, partitioning='hive')).
+        Args:
+            output_dir (str): Directory del dataset.
+            partition_column (str, optional): Colonna di partizionamento. Default: config.DEPARTMENT_COLUMN.
+            dictionary_columns (list, optional): Colonne codificate a dizionario.
+                Default: config.PARQUET_DICTIONARY_COLUMNS.
+        """
+        self.output_dir = output_dir
+        self.partition_column = partition_column or config.DEPARTMENT_COLUMN
+        self.dictionary_columns = list(dictionary_columns or config.PARQUET_DICTIONARY_COLUMNS)
+        self._staging_dir = None # Directory del caricamento in corso, sostituisce output_dir al commit
+        self._chunk_count = 0
+        self._row_count = 0
+
+    @staticmethod
+    def _import_pyarrow():
+        """Importa pyarrow solo quando serve: è necessario soltanto per l'output Parquet."""
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("L'output Parquet richiede pyarrow (pip install pyarrow).") from e
+        return pyarrow, pyarrow.parquet
+
+    def begin(self):
+        self._import_pyarrow()
+        print(f"\nScrittura del dataset Parquet in {self.output_dir}...")
+        self._staging_dir = f"{self.output_dir}.in_scrittura"
+        shutil.rmtree(self._staging_dir, ignore_errors=True)
+        os.makedirs(self._staging_dir)
+        self._chunk_count = 0
+        self._row_count = 0
+
+    def write_chunk(self, df):
+        pa, pq = self._import_pyarrow()
+        df = df.astype({col: 'category' for col in self.dictionary_columns if col in df.columns})
+        df = df.assign(**{col: widen_float(df[col]) for col in df.columns if df[col].dtype == 'float32'})
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_to_dataset(
+            table,
+            root_path=self._staging_dir,
+            partition_cols=[self.partition_column],
+            basename_template=f"parte-{self._chunk_count:05d}-{{i}}.parquet",
+            use_dictionary=[col for col in self.dictionary_columns if col in df.columns],
+        )
+        self._chunk_count += 1
+        self._row_count += len(df)
+
+    def commit(self):
+        """
+        Sostituisce il dataset precedente con quello appena scritto. La directory precedente
+        viene spostata da parte e rimossa solo dopo che la nuova è al suo posto.
+        """
+        staging_dir, self._staging_dir = self._staging_dir, None
+        previous_dir = f"{self.output_dir}.precedente"
+        shutil.rmtree(previous_dir, ignore_errors=True)
+        if os.path.exists(self.output_dir):
+            os.replace(self.output_dir, previous_dir)
+        os.replace(staging_dir, self.output_dir)
+        shutil.rmtree(previous_dir, ignore_errors=True)
+        partitions = [name for name in os.listdir(self.output_dir) if name.startswith(f"{self.partition_column}=")]
+        print(f"Scritti {self._row_count} record in {len(partitions)} partizioni per {self.partition_column}.")
+
+    def abort(self):
+        if self._staging_dir is None:
+            return
+        shutil.rmtree(self._staging_dir, ignore_errors=True)
+        self._staging_dir = None
+
+    def output_signature(self):
+        """File del dataset con dimensione e data di modifica; None se non ci sono file Parquet."""
+        files = []
+        for root, _, names in os.walk(self.output_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                files.append([os.path.relpath(path, self.output_dir), stat.st_size, stat.st_mtime_ns])
+        if not any(name.endswith('.parquet') for name, _, _ in files):
+            return None
+        return sorted(files)
@@ -1,7 +1,303 @@
+import multiprocessing
+import os
 import pandas as pd
 import numpy as np
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from src import config
+from src.instrumentation import PipelineInstrumentation
+from src.validation import REASON_DUPLICATE, NonEmptyStringRule, RangeRule, ValidationStage, valid_string_mask
+
+# Versione della logica di trasformazione: va incrementata a ogni modifica che cambia i dati
+# prodotti, perché fa parte dell'impronta con cui si saltano le esecuzioni invariate
+TRANSFORMER_VERSION = 1
+
+def _duplicate_check_columns(df):
+    """
+    Restituisce le colonne usate per il controllo dei duplicati (tutte tranne 'id' e il file
+    di provenienza: la stessa riga in due export è un duplicato).
+    """
+    # Se l'id non è l'identificativo univoco e altre colonne possono definire un duplicato
+    columns = [col for col in df.columns if col not in ('id', config.SOURCE_FILE_COLUMN)]
+    if not columns: # Se c'è solo la colonna id o nessuna colonna
+        columns = df.columns.tolist()
+    return columns
+
+def row_hashes(df, columns):
+    """
+    Calcola un hash a 64 bit per riga sulle colonne indicate.
+    I tipi vengono normalizzati (numerici in float64, date in nanosecondi) in modo che
+    lo stesso contenuto produca lo stesso hash anche in blocchi con dtype diversi.
+    Args:
+        df (pd.DataFrame): Dati di cui calcolare gli hash.
+        columns (list): Colonne da includere nell'hash.
+    Returns:
+        np.ndarray: Array uint64 con un hash per riga.
+    """
+    normalized = {}
+    for col in columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = series.dt.as_unit('ns')
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            series = series.astype('float64')
+        normalized[col] = series
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized), index=False).to_numpy()
+
+class SeenRowHashes:
+    def __init__(self):
+        """
+        Hash delle righe già viste nella trasformazione a blocchi, in un array uint64 ordinato:
+        8 byte per riga distinta (più una copia temporanea quando si aggiunge un blocco) e
+        ricerche vettoriali con `np.searchsorted`.
+        """
+        self.hashes = np.empty(0, dtype='uint64')
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def contains(self, hashes):
+        """
+        Args:
+            hashes (np.ndarray): Hash uint64 (es. `row_hashes`).
+        Returns:
+            np.ndarray: Maschera booleana, True per gli hash già registrati.
+        """
+        positions = np.searchsorted(self.hashes, hashes)
+        found = positions < len(self.hashes)
+        found[found] = self.hashes[positions[found]] == hashes[found]
+        return found
+
+    def add(self, hashes):
+        """
+        Registra hash non ancora presenti.
+        Args:
+            hashes (np.ndarray): Hash uint64 (es. `row_hashes`).
+        """
+        # Con kind='stable' NumPy usa timsort, che unisce in tempo lineare le due sequenze ordinate
+        merged = np.concatenate([self.hashes, np.unique(hashes)])
+        merged.sort(kind='stable') # In place: durante l'aggiunta la memoria è al più doppia
+        self.hashes = merged
+
+def tier_values(values, bins, tier_values):
+    """
+    Assegna a ogni valore il valore della fascia in cui ricade, in modo vettoriale.
+    Le fasce sono intervalli [bins[i], bins[i+1]), come pd.cut(..., right=False).
+    Args:
+        values (pd.Series): Valori numerici da classificare.
+        bins (list): Limiti delle fasce, in ordine crescente.
+        tier_values (list): Valore associato a ciascuna fascia (len(bins) - 1 elementi).
+    Returns:
+        pd.Series: Valore della fascia per ogni elemento, con lo stesso indice di `values`.
+    """
+    tier_index = np.searchsorted(np.asarray(bins, dtype='float64'), values.to_numpy(dtype='float64'), side='right') - 1
+    tier_index = np.clip(tier_index, 0, len(tier_values) - 1)
+    return pd.Series(np.asarray(tier_values)[tier_index], index=values.index)
+
+def as_datetime(series):
+    """pd.to_datetime(errors='coerce'), saltato se la colonna è già datetime (es. lettori tipizzati)."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, errors='coerce')
+
+def as_numeric(series):
+    """pd.to_numeric(errors='coerce'), saltato se la colonna è già numerica (es. lettori tipizzati)."""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series
+    return pd.to_numeric(series, errors='coerce')
+
+def map_by_key(keys, mapping):
+    """
+    Come `keys.map(mapping)`, ma restituisce sempre i valori di `mapping` anche quando le chiavi
+    sono categoriche (Series.map su una colonna categorica produce una colonna categorica):
+    in quel caso la ricerca avviene una volta per categoria e si espande tramite i codici.
+    Args:
+        keys (pd.Series): Chiavi (es. reparto), anche categoriche.
+        mapping (pd.Series): Valori indicizzati per chiave.
+    Returns:
+        pd.Series: Valore per ogni chiave (mancante se la chiave non è in `mapping`).
+    """
+    if len(mapping) == 0:
+        # Series.map con una mappatura vuota la converte in float64 (fallisce per le date),
+        # es. un lotto in accodamento interamente già caricato
+        return pd.Series(mapping.reindex(keys.to_numpy()).array, index=keys.index, name=keys.name)
+    if not isinstance(keys.dtype, pd.CategoricalDtype):
+        return keys.map(mapping)
+    per_category = mapping.reindex(keys.cat.categories).array
+    return pd.Series(per_category.take(keys.cat.codes.to_numpy(), allow_fill=True), index=keys.index, name=keys.name)
+
+def memory_by_column(df):
+    """Memoria occupata da ogni colonna in byte (stringhe incluse)."""
+    return df.memory_usage(deep=True, index=False)
+
+def compact_frame(df):
+    """
+    Riduce la memoria del DataFrame trasformato: categoriche per le stringhe a bassa cardinalità
+    (config.COMPACT_CATEGORICAL_COLUMNS), stringhe Arrow per i nomi (config.COMPACT_STRING_COLUMNS),
+    interi ridotti al tipo più piccolo che contiene i valori e float32 per le colonne di
+    config.DERIVED_COLUMN_DECIMALS quando la conversione non perde precisione a quei decimali.
+    Args:
+        df (pd.DataFrame): DataFrame trasformato.
+    Returns:
+        pd.DataFrame: DataFrame compatto (stessi valori, tipi più piccoli).
+    """
+    compacted = {}
+    for col in df.columns:
+        series = df[col]
+        if col in config.COMPACT_CATEGORICAL_COLUMNS:
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                compacted[col] = series.cat.remove_unused_categories()
+            else:
+                compacted[col] = series.astype('category')
+        elif col in config.COMPACT_STRING_COLUMNS:
+            # Con pandas >= 3 il dtype `str` è già basato su Arrow: nessuna conversione necessaria
+            already_arrow = isinstance(series.dtype, pd.StringDtype) and series.dtype.storage == 'pyarrow'
+            if not already_arrow:
+                compacted[col] = series.astype(config.COMPACT_STRING_DTYPE)
+        elif pd.api.types.is_integer_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            compacted[col] = pd.to_numeric(series, downcast='integer')
+        elif col in config.DERIVED_COLUMN_DECIMALS and series.dtype == 'float64':
+            narrowed = series.astype('float32')
+            restored = narrowed.astype('float64').round(config.DERIVED_COLUMN_DECIMALS[col])
+            if np.array_equal(restored.to_numpy(), series.to_numpy(), equal_nan=True):
+                compacted[col] = narrowed
+    return df.assign(**compacted) if compacted else df
+
+def restore_transformed_dtypes(df):
+    """
+    Riporta la tabella `dipendenti` riletta dal database ai tipi del DataFrame trasformato:
+    fasce come categoriche ordinate secondo le etichette di config (come le produce pd.cut)
+    e rappresentazione compatta di `compact_frame`.
+    Args:
+        df (pd.DataFrame): Righe di `dipendenti` (es. DataLoader.read_table_chunks()).
+    Returns:
+        pd.DataFrame: DataFrame con i tipi del risultato della trasformazione.
+    """
+    band_labels = {'fascia_eta': config.AGE_LABELS, 'fascia_stipendio': config.SALARY_LABELS,
+                   'anzianita': config.SENIORITY_LABELS}
+    restored = {col: pd.Categorical(df[col], categories=labels, ordered=True)
+                for col, labels in band_labels.items() if col in df.columns}
+    return compact_frame(df.assign(**restored))
+
+class TransformAggregates:
+    def __init__(self):
+        """
+        Aggregati per reparto raccolti in streaming, necessari per l'imputazione
+        e per `valutazione_stipendio`. Le mediane delle date di assunzione sono esatte:
+        per ogni reparto si conserva un istogramma (valore -> occorrenze), la cui
+        dimensione dipende dal numero di date distinte e non dal numero di righe.
+        """
+        self.salary_sum = {}
+        self.salary_count = {}
+        self.hire_date_counts = {}
+
+    def update(self, df, sign=1):
+        """
+        Aggiunge agli aggregati un blocco già validato e deduplicato (o lo sottrae, con sign=-1).
+        Args:
+            df (pd.DataFrame): Blocco di dati validato.
+            sign (int): 1 per aggiungere le righe, -1 per rimuoverle (ETL incrementale).
+        """
+        salary_groups = df.groupby(config.DEPARTMENT_COLUMN, observed=True)[config.SALARY_COLUMN].agg(['sum', 'count'])
+        for department, row in salary_groups.iterrows():
+            self.salary_sum[department] = self.salary_sum.get(department, 0.0) + sign * row['sum']
+            self.salary_count[department] = self.salary_count.get(department, 0) + sign * int(row['count'])
+
+        valid_dates = df[config.HIRE_DATE_COLUMN].notna()
+        date_groups = pd.DataFrame({
+            config.DEPARTMENT_COLUMN: df.loc[valid_dates, config.DEPARTMENT_COLUMN],
+            config.HIRE_DATE_COLUMN: df.loc[valid_dates, config.HIRE_DATE_COLUMN].dt.as_unit('ns').astype('int64')
+        }).value_counts(sort=False)
+        for (department, value), count in date_groups.items():
+            department_counts = self.hire_date_counts.setdefault(department, Counter())
+            department_counts[value] += sign * int(count)
+            if department_counts[value] <= 0:
+                del department_counts[value]
+
+    def merge(self, other):
+        """
+        Unisce gli aggregati di un'altra partizione a quelli correnti.
+        Args:
+            other (TransformAggregates): Aggregati da unire.
+        """
+        for department, total in other.salary_sum.items():
+            self.salary_sum[department] = self.salary_sum.get(department, 0.0) + total
+        for department, count in other.salary_count.items():
+            self.salary_count[department] = self.salary_count.get(department, 0) + count
+        for department, counts in other.hire_date_counts.items():
+            self.hire_date_counts.setdefault(department, Counter()).update(counts)
+
+    @staticmethod
+    def _median_from_counts(counts):
+        """Mediana esatta di un istogramma {valore: occorrenze} (media dei due centrali se pari)."""
+        total = sum(counts.values())
+        if total == 0:
+            return pd.NaT
+        lower_pos, upper_pos = (total - 1) // 2, total // 2
+        lower = upper = None
+        cumulative = 0
+        for value in sorted(counts):
+            cumulative += counts[value]
+            if lower is None and cumulative > lower_pos:
+                lower = value
+            if cumulative > upper_pos:
+                upper = value
+                break
+        return pd.Timestamp((lower + upper) // 2, unit='ns')
+
+    def salary_mean_by_department(self):
+        """Stipendio medio (sui valori osservati) per reparto."""
+        return pd.Series({
+            department: self.salary_sum[department] / count if count else np.nan
+            for department, count in self.salary_count.items()
+        }, dtype='float64')
+
+    def global_salary_mean(self):
+        """Stipendio medio globale (sui valori osservati)."""
+        total_count = sum(self.salary_count.values())
+        return sum(self.salary_sum.values()) / total_count if total_count else np.nan
+
+    def hire_date_median_by_department(self):
+        """Mediana esatta della data di assunzione per reparto."""
+        return pd.Series({
+            department: self._median_from_counts(counts)
+            for department, counts in self.hire_date_counts.items()
+        }, dtype='datetime64[ns]')
+
+    def global_hire_date_median(self):
+        """Mediana esatta globale della data di assunzione."""
+        global_counts = Counter()
+        for counts in self.hire_date_counts.values():
+            global_counts.update(counts)
+        return self._median_from_counts(global_counts)
+
+def _validate_partition(transformer, partition):
+    """
+    Primo passo di una partizione (eseguito in un processo worker): validazione,
+    deduplicazione e aggregati parziali per reparto.
+    """
+    valid_partition, counters, rejected_rows = transformer._validate(partition, verbose=False, deduplicate=True)
+    counters['missing_stipendio_imputed_total'] = int(valid_partition[config.SALARY_COLUMN].isna().sum())
+    counters['missing_data_assunzione_imputed_total'] = int(valid_partition[config.HIRE_DATE_COLUMN].isna().sum())
+
+    aggregates = TransformAggregates()
+    aggregates.update(valid_partition)
+    return valid_partition, counters, aggregates, rejected_rows
+
+def _derive_partition(transformer, partition, salary_mean_by_department, global_avg_salary,
+                      hire_date_median_by_department, global_median_hire_date):
+    """
+    Secondo passo di una partizione (eseguito in un processo worker): imputazione
+    con gli aggregati globali già uniti e creazione delle colonne derivate.
+    """
+    partition = transformer._impute(
+        partition, salary_mean_by_department, global_avg_salary,
+        hire_date_median_by_department, global_median_hire_date
+    )
+    # Dopo l'imputazione la media di reparto coincide con la media osservata (o con quella globale)
+    mean_salary_by_department = salary_mean_by_department.fillna(global_avg_salary)
+    return transformer._derive_columns(partition, mean_salary_by_department)
 
 class DataTransformer:
     def __init__(self):
@@ -11,141 +307,148 @@ class DataTransformer:
         self.current_time = datetime.now()
         self.MAX_WORKING_AGE = 70  # Definizione età lavorativa massima
         self.MIN_WORKING_AGE = 16  # Definizione età lavorativa minima
+        self.last_transform_stats = None # Statistiche dell'ultima trasformazione a blocchi
+        self.rejected_rows = None # Righe scartate dall'ultima trasformazione, con `motivo_scarto`
+        self.last_memory_report = None # Memoria per colonna prima/dopo la compattazione dell'ultima trasformazione
+        # Misure per sotto-fase (validazione, deduplicazione, imputazione, ...): disattivate
+        # salvo che l'orchestratore non assegni la propria strumentazione
+        self.instrumentation = PipelineInstrumentation(enabled=False)
+        self.validation_stage = ValidationStage([
+            RangeRule('eta_non_valida', 'invalid_ages_removed', config.AGE_COLUMN,
+                      self.MIN_WORKING_AGE, self.MAX_WORKING_AGE),
+            NonEmptyStringRule('nome_non_valido', 'invalid_names_removed', 'nome'),
+            NonEmptyStringRule('cognome_non_valido', 'invalid_surnames_removed', 'cognome'),
+            NonEmptyStringRule('reparto_non_valido', 'invalid_departments_removed', config.DEPARTMENT_COLUMN),
+        ])
 
-    def transform_data(self, df):
+    def _validate(self, df, verbose=True, deduplicate=False):
         """
-        Trasforma e pulisce i dati, includendo nuove validazioni.
+        Applica le correzioni (stipendi negativi, date future, età non numeriche) e la fase di
+        validazione, costruendo un'unica maschera di scarto: le righe valide vengono materializzate
+        una sola volta e le righe scartate sono restituite con il relativo motivo.
         Args:
-            df (pd.DataFrame): DataFrame da trasformare.
+            df (pd.DataFrame): DataFrame da validare.
+            verbose (bool): Se stampare i messaggi di validazione.
+            deduplicate (bool): Se scartare anche i duplicati (prima occorrenza mantenuta).
         Returns:
-            pd.DataFrame: DataFrame trasformato.
-            dict: Statistiche sulla trasformazione.
-        Raises:
-            ValueError: Se il DataFrame è None.
+            pd.DataFrame: DataFrame validato (copia).
+            dict: Contatori delle validazioni (e 'duplicati_rimossi' se `deduplicate`).
+            pd.DataFrame: Righe scartate, con la colonna `motivo_scarto`.
         """
-        print("\nTrasformando i dati...")
-        if df is None:
-            raise ValueError("Nessun dato da trasformare. Esegui prima l'estrazione.")
+        with self.instrumentation.stage('validazione', rows_in=len(df)) as validation_step:
+            working, counters, reason_codes, missing_columns = self._evaluate_rules(df, verbose)
+            validation_step.rows_out = int((reason_codes == 0).sum())
 
-        # Copia per evitare warning di SettingWithCopyWarning
-        df_transformed = df.copy()
+        if deduplicate:
+            with self.instrumentation.stage('deduplicazione', rows_in=validation_step.rows_out) as deduplication_step:
+                counters['duplicati_rimossi'] = self.validation_stage.mark_duplicates(
+                    working, reason_codes, _duplicate_check_columns(working))
+                deduplication_step.rows_out = validation_step.rows_out - counters['duplicati_rimossi']
 
-        # Inizializzazione contatori per le statistiche di validazione
-        negative_salaries_handled = 0
-        future_hire_dates_handled = 0
-        invalid_ages_removed = 0
-        invalid_names_removed = 0
-        invalid_surnames_removed = 0
-        invalid_departments_removed = 0
+        if verbose:
+            if counters['invalid_ages_removed'] > 0:
+                print(f"Rimossi {counters['invalid_ages_removed']} record con età non valide (min: {self.MIN_WORKING_AGE}, max: {self.MAX_WORKING_AGE}, o non numeriche).")
+            for rule in self.validation_stage.rules:
+                if isinstance(rule, NonEmptyStringRule) and counters[rule.stat_key] > 0:
+                    print(f"Rimossi {counters[rule.stat_key]} record con '{rule.column}' non valido.")
+            for col in missing_columns:
+                print(f"Attenzione: la colonna '{col}' non è presente nel DataFrame per la validazione.")
         
-        initial_rows = len(df_transformed)
+        keep_mask = reason_codes == 0
+        rejected_rows = working[~keep_mask]
+        rejected_rows.insert(len(rejected_rows.columns), 'motivo_scarto',
+                             self.validation_stage.reason_labels(reason_codes[~keep_mask]))
+        valid_rows = working[keep_mask]
+        # Le categorie dei soli valori scartati (es. reparto vuoto) non devono comparire nei conteggi
+        categorical_columns = [col for col in valid_rows.columns if isinstance(valid_rows[col].dtype, pd.CategoricalDtype)]
+        if categorical_columns:
+            valid_rows = valid_rows.assign(**{col: valid_rows[col].cat.remove_unused_categories() for col in categorical_columns})
+        return valid_rows, counters, rejected_rows
+
+    def _evaluate_rules(self, df, verbose=True):
+        """
+        Correzioni preliminari (stipendi negativi, date future, età non numeriche) e regole di validazione.
+        Args:
+            df (pd.DataFrame): DataFrame da validare.
+            verbose (bool): Se stampare i messaggi sulle correzioni.
+        Returns:
+            pd.DataFrame: DataFrame con le colonne corrette.
+            dict: Contatori delle correzioni e delle regole.
+            np.ndarray: Codici di scarto per riga (0 = valida).
+            list: Colonne delle regole assenti dal DataFrame.
+        """
+        counters = {
+            'negative_salaries_handled': 0,
+            'future_hire_dates_handled': 0,
+        }
+        corrected_columns = {}
 
         # 0. Validazioni preliminari
         # 0.1 Validazione Stipendi Negativi
-        if config.SALARY_COLUMN in df_transformed.columns:
-            negative_salary_mask = df_transformed[config.SALARY_COLUMN] < 0
-            negative_salaries_handled = negative_salary_mask.sum()
-            if negative_salaries_handled > 0:
-                print(f"Trovati {negative_salaries_handled} record con stipendi negativi. Saranno convertiti in NaN.")
-                df_transformed.loc[negative_salary_mask, config.SALARY_COLUMN] = np.nan
+        if config.SALARY_COLUMN in df.columns:
+            negative_salary_mask = df[config.SALARY_COLUMN] < 0
+            counters['negative_salaries_handled'] = negative_salary_mask.sum()
+            if counters['negative_salaries_handled'] > 0:
+                if verbose:
+                    print(f"Trovati {counters['negative_salaries_handled']} record con stipendi negativi. Saranno convertiti in NaN.")
+                corrected_columns[config.SALARY_COLUMN] = df[config.SALARY_COLUMN].mask(negative_salary_mask)
         
         # 0.2 Validazione Date di Assunzione Future
-        if config.HIRE_DATE_COLUMN in df_transformed.columns:
+        if config.HIRE_DATE_COLUMN in df.columns:
             # Converti prima in datetime, coercing errors
-            df_transformed[config.HIRE_DATE_COLUMN] = pd.to_datetime(df_transformed[config.HIRE_DATE_COLUMN], errors='coerce')
-            future_hire_date_mask = df_transformed[config.HIRE_DATE_COLUMN] > self.current_time
-            future_hire_dates_handled = future_hire_date_mask.sum()
-            if future_hire_dates_handled > 0:
-                print(f"Trovate {future_hire_dates_handled} date di assunzione future. Saranno convertite in NaT.")
-                df_transformed.loc[future_hire_date_mask, config.HIRE_DATE_COLUMN] = pd.NaT
-
-        # 0.3 Validazione Età
-        if config.AGE_COLUMN in df_transformed.columns:
-            # Assicurati che l'età sia numerica, gli errori diventano NaN
-            df_transformed[config.AGE_COLUMN] = pd.to_numeric(df_transformed[config.AGE_COLUMN], errors='coerce')
-            invalid_age_mask = (df_transformed[config.AGE_COLUMN] < self.MIN_WORKING_AGE) | \
-                               (df_transformed[config.AGE_COLUMN] > self.MAX_WORKING_AGE) | \
-                               (df_transformed[config.AGE_COLUMN].isna()) # Rimuovi anche le età diventate NaN per coercizione
-            
-            rows_before_age_validation = len(df_transformed)
-            df_transformed = df_transformed[~invalid_age_mask]
-            invalid_ages_removed = rows_before_age_validation - len(df_transformed)
-            if invalid_ages_removed > 0:
-                print(f"Rimossi {invalid_ages_removed} record con età non valide (min: {self.MIN_WORKING_AGE}, max: {self.MAX_WORKING_AGE}, o non numeriche).")
-
-        # 0.4 Validazione Nome, Cognome, Reparto (Stringhe non vuote)
-        critical_string_columns = {
-            'nome': 'invalid_names_removed',
-            'cognome': 'invalid_surnames_removed',
-            config.DEPARTMENT_COLUMN: 'invalid_departments_removed'
-        }
-
-        for col, stat_key in critical_string_columns.items():
-            if col in df_transformed.columns:
-                rows_before_col_validation = len(df_transformed)
-                # Maschera per valori non stringa, stringhe vuote o stringhe di soli spazi
-                invalid_mask = (~df_transformed[col].apply(lambda x: isinstance(x, str))) | \
-                               (df_transformed[col].str.strip() == '') | \
-                               (df_transformed[col].isna())
-                
-                df_transformed = df_transformed[~invalid_mask]
-                removed_count = rows_before_col_validation - len(df_transformed)
-                
-                if stat_key == 'invalid_names_removed':
-                    invalid_names_removed = removed_count
-                elif stat_key == 'invalid_surnames_removed':
-                    invalid_surnames_removed = removed_count
-                elif stat_key == 'invalid_departments_removed':
-                    invalid_departments_removed = removed_count
-                
-                if removed_count > 0:
-                    print(f"Rimossi {removed_count} record con '{col}' non valido.")
-            else:
-                print(f"Attenzione: la colonna '{col}' non è presente nel DataFrame per la validazione.")
-
-
-        # 1. Rimuovere i duplicati
-        # Considera tutte le colonne tranne 'id' per i duplicati
-        # Se l'id non è l'identificativo univoco e altre colonne possono definire un duplicato
-        columns_to_check_duplicates = [col for col in df_transformed.columns if col != 'id']
-        if not columns_to_check_duplicates: # Se c'è solo la colonna id o nessuna colonna
-             columns_to_check_duplicates = df_transformed.columns.tolist()
-        
-        size_before_duplicates = len(df_transformed)
-        df_transformed.drop_duplicates(subset=columns_to_check_duplicates, inplace=True)
-        duplicates_removed = size_before_duplicates - len(df_transformed)
-        print(f"Rimossi {duplicates_removed} record duplicati.")
+            hire_dates = as_datetime(df[config.HIRE_DATE_COLUMN])
+            future_hire_date_mask = hire_dates > self.current_time
+            counters['future_hire_dates_handled'] = future_hire_date_mask.sum()
+            if counters['future_hire_dates_handled'] > 0:
+                if verbose:
+                    print(f"Trovate {counters['future_hire_dates_handled']} date di assunzione future. Saranno convertite in NaT.")
+                hire_dates = hire_dates.mask(future_hire_date_mask)
+            corrected_columns[config.HIRE_DATE_COLUMN] = hire_dates
 
-        # 2. Gestire i valori mancanti
-        # Nota: i valori mancanti creati dalle validazioni (stipendio, data_assunzione) verranno gestiti qui
-        missing_salary_count_after_validation = df_transformed[config.SALARY_COLUMN].isna().sum()
-        missing_hire_date_count_after_validation = df_transformed[config.HIRE_DATE_COLUMN].isna().sum()
+        # 0.3 Età numerica: gli errori diventano NaN e vengono scartati dalla regola sull'età
+        if config.AGE_COLUMN in df.columns:
+            corrected_columns[config.AGE_COLUMN] = as_numeric(df[config.AGE_COLUMN])
+            
+        working = df.assign(**corrected_columns)
 
-        # Calcolo dello stipendio medio per reparto
-        avg_salary_by_department = df_transformed.groupby(config.DEPARTMENT_COLUMN)[config.SALARY_COLUMN].transform('mean')
-        global_avg_salary = df_transformed[config.SALARY_COLUMN].mean() 
+        # 0.3-0.4 Età, Nome, Cognome, Reparto in un'unica maschera (i duplicati si marcano in `_validate`)
+        reason_codes, rule_counters, missing_columns = self.validation_stage.evaluate(working)
+        counters.update(rule_counters)
+        return working, counters, reason_codes, missing_columns
 
-        df_transformed[config.SALARY_COLUMN] = df_transformed[config.SALARY_COLUMN].fillna(avg_salary_by_department)
-        # Se avg_salary_by_department è NaN (e.g. un reparto ha solo NaN come stipendi), usa la media globale
+    def _impute(self, df_transformed, salary_mean_by_department, global_avg_salary,
+                hire_date_median_by_department, global_median_hire_date):
+        """
+        Imputa stipendi e date di assunzione mancanti a partire da aggregati già calcolati.
+        L'operazione è locale alla riga: può essere applicata a un blocco alla volta.
+        Args:
+            df_transformed (pd.DataFrame): DataFrame validato e deduplicato (modificato sul posto).
+            salary_mean_by_department (pd.Series): Stipendio medio indicizzato per reparto.
+            global_avg_salary (float): Stipendio medio globale (fallback).
+            hire_date_median_by_department (pd.Series): Data di assunzione mediana per reparto.
+            global_median_hire_date (pd.Timestamp): Data di assunzione mediana globale (fallback).
+        Returns:
+            pd.DataFrame: DataFrame con i valori imputati.
+        """
+        departments = df_transformed[config.DEPARTMENT_COLUMN]
+        df_transformed[config.SALARY_COLUMN] = df_transformed[config.SALARY_COLUMN].fillna(map_by_key(departments, salary_mean_by_department))
+        # Se la media di reparto è NaN (e.g. un reparto ha solo NaN come stipendi), usa la media globale
         df_transformed[config.SALARY_COLUMN] = df_transformed[config.SALARY_COLUMN].fillna(global_avg_salary)
         
-        # Gestione data assunzione mancante
-        # Assicurati che la colonna data_assunzione sia datetime (dovrebbe esserlo già dal check precedente)
-        df_transformed[config.HIRE_DATE_COLUMN] = pd.to_datetime(df_transformed[config.HIRE_DATE_COLUMN], errors='coerce')
-        
-        median_hire_date_by_department_transform = df_transformed.groupby(config.DEPARTMENT_COLUMN)[config.HIRE_DATE_COLUMN].transform('median')
-        global_median_hire_date = df_transformed[config.HIRE_DATE_COLUMN].median()
-
-        df_transformed[config.HIRE_DATE_COLUMN] = df_transformed[config.HIRE_DATE_COLUMN].fillna(median_hire_date_by_department_transform)
+        df_transformed[config.HIRE_DATE_COLUMN] = as_datetime(df_transformed[config.HIRE_DATE_COLUMN])
+        df_transformed[config.HIRE_DATE_COLUMN] = df_transformed[config.HIRE_DATE_COLUMN].fillna(map_by_key(departments, hire_date_median_by_department))
         df_transformed[config.HIRE_DATE_COLUMN] = df_transformed[config.HIRE_DATE_COLUMN].fillna(global_median_hire_date)
+        return df_transformed
         
-        # Ricalcola i conteggi dei valori imputati dopo l'effettiva imputazione
-        imputed_salary_count = missing_salary_count_after_validation
-        imputed_hire_date_count = missing_hire_date_count_after_validation
-
-        print(f"Imputati {imputed_salary_count} valori mancanti per stipendio.")
-        print(f"Imputati {imputed_hire_date_count} valori mancanti per data assunzione.")
-
+    def _derive_columns(self, df_transformed, mean_salary_by_department):
+        """
+        Converte i tipi e crea le colonne derivate.
+        Args:
+            df_transformed (pd.DataFrame): DataFrame validato e imputato (modificato sul posto).
+            mean_salary_by_department (pd.Series): Stipendio medio per reparto usato per `valutazione_stipendio`.
+        Returns:
+            pd.DataFrame: DataFrame con le colonne derivate.
+        """
         # 3. Convertire i tipi di dati
         # L'età è già stata validata e le righe problematiche rimosse, quindi astype(int) dovrebbe essere sicuro.
         df_transformed[config.AGE_COLUMN] = df_transformed[config.AGE_COLUMN].astype(int)
@@ -174,9 +477,7 @@ class DataTransformer:
             right=False
         )
         
-        df_transformed['bonus'] = df_transformed['anni_di_servizio'].apply(
-            lambda anni: 500 if anni < 2 else (1000 if anni < 5 else 2000)
-        )
+        df_transformed['bonus'] = tier_values(df_transformed['anni_di_servizio'], config.BONUS_BINS, config.BONUS_VALUES)
         
         df_transformed['anzianita'] = pd.cut(
             df_transformed['anni_di_servizio'],
@@ -185,27 +486,359 @@ class DataTransformer:
             right=False
         )
         
-        mean_salary_by_dept_transform = df_transformed.groupby(config.DEPARTMENT_COLUMN)[config.SALARY_COLUMN].transform('mean')
+        mean_salary_by_dept_transform = map_by_key(df_transformed[config.DEPARTMENT_COLUMN], mean_salary_by_department)
         df_transformed['valutazione_stipendio'] = np.where(
-            df_transformed[config.SALARY_COLUMN] > mean_salary_by_dept_transform * 1.1, 'Sopra Media',
-            np.where(df_transformed[config.SALARY_COLUMN] < mean_salary_by_dept_transform * 0.9, 'Sotto Media', 'Nella Media')
+            df_transformed[config.SALARY_COLUMN] > mean_salary_by_dept_transform * config.VALUATION_UPPER_FACTOR, 'Sopra Media',
+            np.where(df_transformed[config.SALARY_COLUMN] < mean_salary_by_dept_transform * config.VALUATION_LOWER_FACTOR, 'Sotto Media', 'Nella Media')
         )
+        return df_transformed
+
+    def _compact(self, df, memory_before=None):
+        """
+        Applica `compact_frame` e aggiorna `self.last_memory_report` (byte per colonna prima e dopo).
+        Args:
+            df (pd.DataFrame): DataFrame trasformato.
+            memory_before (pd.Series, optional): Memoria già accumulata da blocchi precedenti
+                (modalità a blocchi): il nuovo blocco viene sommato al report esistente.
+        Returns:
+            pd.DataFrame: DataFrame compatto.
+        """
+        with self.instrumentation.stage('compattazione', rows_in=len(df)) as step:
+            compacted = compact_frame(df)
+            step.rows_out = len(compacted)
+        report = pd.DataFrame({
+            'dtype_prima': df.dtypes.astype(str),
+            'dtype_dopo': compacted.dtypes.astype(str),
+            'byte_prima': memory_by_column(df),
+            'byte_dopo': memory_by_column(compacted),
+        })
+        if memory_before is not None:
+            report[['byte_prima', 'byte_dopo']] += memory_before[['byte_prima', 'byte_dopo']].reindex(report.index, fill_value=0)
+        self.last_memory_report = report
+        return compacted
+
+    def transform_data(self, df):
+        """
+        Trasforma e pulisce i dati, includendo nuove validazioni.
+        Args:
+            df (pd.DataFrame): DataFrame da trasformare.
+        Returns:
+            pd.DataFrame: DataFrame trasformato.
+            dict: Statistiche sulla trasformazione.
+        Raises:
+            ValueError: Se il DataFrame è None.
+        """
+        print("\nTrasformando i dati...")
+        if df is None:
+            raise ValueError("Nessun dato da trasformare. Esegui prima l'estrazione.")
+
+        initial_rows = len(df)
+
+        # 0-1. Validazioni preliminari e rimozione dei duplicati (tutte le colonne tranne 'id')
+        df_transformed, validation_counters, self.rejected_rows = self._validate(df, deduplicate=True)
+        duplicates_removed = validation_counters.pop('duplicati_rimossi')
+        print(f"Rimossi {duplicates_removed} record duplicati.")
+
+        # 2. Gestire i valori mancanti
+        # Nota: i valori mancanti creati dalle validazioni (stipendio, data_assunzione) verranno gestiti qui
+        missing_salary_count_after_validation = df_transformed[config.SALARY_COLUMN].isna().sum()
+        missing_hire_date_count_after_validation = df_transformed[config.HIRE_DATE_COLUMN].isna().sum()
+
+        # Calcolo degli aggregati per reparto (stipendio medio e data di assunzione mediana)
+        with self.instrumentation.stage('imputazione', rows_in=len(df_transformed)) as step:
+            df_transformed[config.HIRE_DATE_COLUMN] = as_datetime(df_transformed[config.HIRE_DATE_COLUMN])
+            department_groups = df_transformed.groupby(config.DEPARTMENT_COLUMN)
+            df_transformed = self._impute(
+                df_transformed,
+                salary_mean_by_department=department_groups[config.SALARY_COLUMN].mean(),
+                global_avg_salary=df_transformed[config.SALARY_COLUMN].mean(),
+                hire_date_median_by_department=department_groups[config.HIRE_DATE_COLUMN].median(),
+                global_median_hire_date=df_transformed[config.HIRE_DATE_COLUMN].median()
+            )
+            step.rows_out = len(df_transformed)
+
+        # Ricalcola i conteggi dei valori imputati dopo l'effettiva imputazione
+        imputed_salary_count = missing_salary_count_after_validation
+        imputed_hire_date_count = missing_hire_date_count_after_validation
+
+        print(f"Imputati {imputed_salary_count} valori mancanti per stipendio.")
+        print(f"Imputati {imputed_hire_date_count} valori mancanti per data assunzione.")
+
+        # 3-4. Conversione dei tipi e colonne derivate
+        with self.instrumentation.stage('derivazione', rows_in=len(df_transformed)) as step:
+            mean_salary_by_department = df_transformed.groupby(config.DEPARTMENT_COLUMN)[config.SALARY_COLUMN].mean()
+            df_transformed = self._derive_columns(df_transformed, mean_salary_by_department)
+            step.rows_out = len(df_transformed)
 
         transform_stats = {
             'initial_rows': initial_rows,
             'rows_after_validation_and_cleaning': len(df_transformed),
-            'negative_salaries_handled': negative_salaries_handled,
-            'future_hire_dates_handled': future_hire_dates_handled,
-            'invalid_ages_removed': invalid_ages_removed,
-            'invalid_names_removed': invalid_names_removed,
-            'invalid_surnames_removed': invalid_surnames_removed,
-            'invalid_departments_removed': invalid_departments_removed,
+            **validation_counters,
             'missing_stipendio_imputed_total': imputed_salary_count, # Totale imputati dopo validazione e imputazione
             'missing_data_assunzione_imputed_total': imputed_hire_date_count, # Totale imputati dopo validazione e imputazione
             'duplicati_rimossi': duplicates_removed,
+            'duplicati_nell_esecuzione': duplicates_removed,
+            'duplicati_tra_esecuzioni': 0, # Solo in modalità di accodamento e incrementale
             # 'stipendio_medio_per_reparto_input': avg_salary_by_department_before_imputation, # Richiederebbe calcolo separato prima
             'conteggio_per_reparto_output': df_transformed[config.DEPARTMENT_COLUMN].value_counts().to_dict()
         }
+        df_transformed = self._compact(df_transformed)
+        transform_stats['memoria_per_colonna'] = self.last_memory_report
         
         print("Trasformazione completata.")
         return df_transformed, transform_stats
+
+    @staticmethod
+    def _unseen_rows_mask(df, seen_hashes, fingerprint_index=None):
+        """
+        Maschera delle righe di un blocco non ancora viste (nel blocco stesso o in blocchi
+        precedenti); gli hash delle nuove righe vengono registrati in `seen_hashes` (SeenRowHashes).
+        Con un `fingerprint_index` vengono scartate anche le prime occorrenze già caricate
+        da esecuzioni precedenti (una ricerca vettoriale per blocco).
+        Returns:
+            np.ndarray: Maschera delle righe da mantenere.
+            np.ndarray: Maschera dei duplicati di esecuzioni precedenti.
+            np.ndarray: Hash uint64 delle righe.
+        """
+        hashes = row_hashes(df, _duplicate_check_columns(df))
+        first_seen = ~pd.Series(hashes).duplicated().to_numpy()
+        first_seen[first_seen] = ~seen_hashes.contains(hashes[first_seen])
+        seen_hashes.add(hashes[first_seen])
+        cross_run = np.zeros(len(hashes), dtype=bool)
+        if fingerprint_index is not None:
+            cross_run[first_seen] = fingerprint_index.contains(hashes[first_seen])
+        return first_seen & ~cross_run, cross_run, hashes
+
+    def collect_aggregates(self, chunks, fingerprint_index=None):
+        """
+        Primo passaggio della trasformazione out-of-core: valida e deduplica ogni blocco
+        e raccoglie gli aggregati per reparto necessari all'imputazione.
+        La deduplicazione globale usa un array ordinato di hash a 64 bit per riga (SeenRowHashes),
+        quindi la memoria cresce con il numero di righe distinte (8 byte ciascuna, 16 durante
+        l'aggiunta di un blocco) e non con la loro ampiezza.
+        Args:
+            chunks (iterable): Blocchi di dati grezzi (es. DataExtractor.extract_chunks()).
+            fingerprint_index (RowFingerprintIndex, optional): Impronte delle righe caricate da
+                esecuzioni precedenti, escluse dagli aggregati (modalità di accodamento).
+        Returns:
+            TransformAggregates: Aggregati per reparto.
+        """
+        print("\nTrasformazione a blocchi - passaggio 1: raccolta degli aggregati per reparto...")
+        aggregates = TransformAggregates()
+        seen_hashes = SeenRowHashes()
+        for chunk in chunks:
+            valid_chunk, _, _ = self._validate(chunk, verbose=False)
+            with self.instrumentation.stage('deduplicazione', rows_in=len(valid_chunk)) as step:
+                unseen_mask, _, _ = self._unseen_rows_mask(valid_chunk, seen_hashes, fingerprint_index)
+                step.rows_out = int(unseen_mask.sum())
+            aggregates.update(valid_chunk[unseen_mask])
+        print(f"Aggregati raccolti per {len(aggregates.salary_count)} reparti.")
+        return aggregates
+
+    def transform_chunks(self, chunks, aggregates, fingerprint_index=None):
+        """
+        Secondo passaggio della trasformazione out-of-core: applica validazione, deduplicazione,
+        imputazione e colonne derivate blocco per blocco, usando gli aggregati del primo passaggio.
+        Le statistiche complessive sono disponibili in `self.last_transform_stats` al termine.
+        Args:
+            chunks (iterable): Gli stessi blocchi di dati grezzi del primo passaggio, riletti.
+            aggregates (TransformAggregates): Aggregati prodotti da `collect_aggregates`.
+            fingerprint_index (RowFingerprintIndex, optional): Impronte delle righe caricate da
+                esecuzioni precedenti: le righe già presenti vengono scartate come duplicati e
+                quelle mantenute vengono registrate nell'indice prima di restituire il blocco
+                (il chiamante le carica nella stessa transazione).
+        Yields:
+            pd.DataFrame: Blocco trasformato.
+        """
+        print("\nTrasformazione a blocchi - passaggio 2: validazione, imputazione e colonne derivate...")
+        salary_mean_by_department = aggregates.salary_mean_by_department()
+        global_avg_salary = aggregates.global_salary_mean()
+        hire_date_median_by_department = aggregates.hire_date_median_by_department()
+        global_median_hire_date = aggregates.global_hire_date_median()
+        # Dopo l'imputazione la media di reparto coincide con la media osservata (o con quella globale)
+        mean_salary_by_department = salary_mean_by_department.fillna(global_avg_salary)
+
+        stats = {
+            'initial_rows': 0,
+            'rows_after_validation_and_cleaning': 0,
+            'negative_salaries_handled': 0,
+            'future_hire_dates_handled': 0,
+            'invalid_ages_removed': 0,
+            'invalid_names_removed': 0,
+            'invalid_surnames_removed': 0,
+            'invalid_departments_removed': 0,
+            'missing_stipendio_imputed_total': 0,
+            'missing_data_assunzione_imputed_total': 0,
+            'duplicati_rimossi': 0,
+            'duplicati_nell_esecuzione': 0,
+            'duplicati_tra_esecuzioni': 0,
+        }
+        department_counts = Counter()
+        seen_hashes = SeenRowHashes()
+        rejected_chunks = []
+        memory_report_started = False
+
+        for chunk in chunks:
+            stats['initial_rows'] += len(chunk)
+            valid_chunk, validation_counters, rejected_rows = self._validate(chunk, verbose=False)
+            for key, value in validation_counters.items():
+                stats[key] += int(value)
+
+            with self.instrumentation.stage('deduplicazione', rows_in=len(valid_chunk)) as step:
+                unseen_mask, cross_run_mask, hashes = self._unseen_rows_mask(valid_chunk, seen_hashes, fingerprint_index)
+                step.rows_out = int(unseen_mask.sum())
+            if fingerprint_index is not None:
+                fingerprint_index.add(hashes[unseen_mask])
+            deduplicated_chunk = valid_chunk[unseen_mask]
+            duplicate_rows = valid_chunk[~unseen_mask].assign(motivo_scarto=REASON_DUPLICATE)
+            rejected_chunks.extend(frame for frame in (rejected_rows, duplicate_rows) if len(frame) > 0)
+            stats['duplicati_rimossi'] += len(duplicate_rows)
+            stats['duplicati_tra_esecuzioni'] += int(cross_run_mask.sum())
+            stats['duplicati_nell_esecuzione'] += len(duplicate_rows) - int(cross_run_mask.sum())
+            stats['missing_stipendio_imputed_total'] += int(deduplicated_chunk[config.SALARY_COLUMN].isna().sum())
+            stats['missing_data_assunzione_imputed_total'] += int(deduplicated_chunk[config.HIRE_DATE_COLUMN].isna().sum())
+
+            with self.instrumentation.stage('imputazione', rows_in=len(deduplicated_chunk)) as step:
+                transformed_chunk = self._impute(
+                    deduplicated_chunk.copy(), salary_mean_by_department, global_avg_salary,
+                    hire_date_median_by_department, global_median_hire_date
+                )
+                step.rows_out = len(transformed_chunk)
+            with self.instrumentation.stage('derivazione', rows_in=len(transformed_chunk)) as step:
+                transformed_chunk = self._derive_columns(transformed_chunk, mean_salary_by_department)
+                step.rows_out = len(transformed_chunk)
+            stats['rows_after_validation_and_cleaning'] += len(transformed_chunk)
+            department_counts.update(transformed_chunk[config.DEPARTMENT_COLUMN].value_counts().to_dict())
+            memory_report = self.last_memory_report if memory_report_started else None
+            transformed_chunk = self._compact(transformed_chunk, memory_report)
+            memory_report_started = True
+            yield transformed_chunk
+
+        stats['conteggio_per_reparto_output'] = dict(department_counts.most_common())
+        if memory_report_started:
+            stats['memoria_per_colonna'] = self.last_memory_report
+        self.last_transform_stats = stats
+        self.rejected_rows = pd.concat(rejected_chunks) if rejected_chunks else None
+
+        print(f"Rimossi {stats['invalid_ages_removed']} record con età non valide, "
+              f"{stats['invalid_names_removed'] + stats['invalid_surnames_removed'] + stats['invalid_departments_removed']} con stringhe non valide.")
+        print(f"Rimossi {stats['duplicati_rimossi']} record duplicati ({stats['duplicati_nell_esecuzione']} nell'input, "
+              f"{stats['duplicati_tra_esecuzioni']} già caricati in esecuzioni precedenti).")
+        print(f"Imputati {stats['missing_stipendio_imputed_total']} valori mancanti per stipendio.")
+        print(f"Imputati {stats['missing_data_assunzione_imputed_total']} valori mancanti per data assunzione.")
+        print("Trasformazione a blocchi completata.")
+
+    def _partition(self, df, max_workers):
+        """
+        Suddivide il DataFrame in partizioni indipendenti per la trasformazione parallela.
+        La chiave primaria è il reparto (tutti i passi dipendenti da gruppi sono per reparto);
+        ogni reparto è ulteriormente diviso in bucket in base all'hash di nome e cognome,
+        che la validazione non modifica: righe duplicate finiscono sempre nello stesso bucket.
+        Args:
+            df (pd.DataFrame): DataFrame da partizionare.
+            max_workers (int): Numero di processi worker.
+        Returns:
+            list: Lista di DataFrame (partizioni), ciascuno con l'indice originale.
+        """
+        department_codes, departments = pd.factorize(df[config.DEPARTMENT_COLUMN]) # NaN -> -1
+        num_buckets = max(1, -(-2 * max_workers // max(1, len(departments))))
+        bucket_columns = [col for col in ('nome', 'cognome') if col in df.columns]
+        if bucket_columns and num_buckets > 1:
+            buckets = (row_hashes(df, bucket_columns) % np.uint64(num_buckets)).astype('int64')
+        else:
+            buckets = np.zeros(len(df), dtype='int64')
+        partition_keys = (department_codes.astype('int64') + 1) * num_buckets + buckets
+        positions_by_key = pd.Series(partition_keys).groupby(partition_keys).indices
+        return [df.iloc[positions] for positions in positions_by_key.values()]
+
+    def transform_data_parallel(self, df, max_workers=None):
+        """
+        Trasforma i dati in parallelo su più processi, partizionando per reparto.
+        Ogni partizione viene validata, deduplicata e aggregata in un worker; gli aggregati
+        parziali (somme, conteggi e istogrammi delle date) vengono uniti per ottenere le medie
+        e le mediane globali di fallback, poi un secondo giro di worker applica imputazione
+        e colonne derivate. Il risultato mantiene l'ordine originale delle righe.
+        Args:
+            df (pd.DataFrame): DataFrame da trasformare.
+            max_workers (int, optional): Numero di processi. Default: config.PARALLEL_WORKERS o os.cpu_count().
+        Returns:
+            pd.DataFrame: DataFrame trasformato.
+            dict: Statistiche sulla trasformazione.
+        Raises:
+            ValueError: Se il DataFrame è None.
+        """
+        print("\nTrasformando i dati in parallelo...")
+        if df is None:
+            raise ValueError("Nessun dato da trasformare. Esegui prima l'estrazione.")
+
+        max_workers = max_workers or config.PARALLEL_WORKERS or os.cpu_count() or 1
+        partitions = self._partition(df, max_workers)
+        print(f"Suddivisi {len(df)} record in {len(partitions)} partizioni su {max_workers} processi.")
+
+        stats = {
+            'initial_rows': len(df),
+            'negative_salaries_handled': 0,
+            'future_hire_dates_handled': 0,
+            'invalid_ages_removed': 0,
+            'invalid_names_removed': 0,
+            'invalid_surnames_removed': 0,
+            'invalid_departments_removed': 0,
+            'missing_stipendio_imputed_total': 0,
+            'missing_data_assunzione_imputed_total': 0,
+            'duplicati_rimossi': 0,
+        }
+        aggregates = TransformAggregates()
+
+        # Avvio senza fork: la trasformazione può essere eseguita nel thread di PipelineJobRunner
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context(config.PROCESS_START_METHOD)) as executor:
+            # 1. Validazione, deduplicazione e aggregati parziali per partizione
+            # (i worker non misurano le sotto-fasi: si misura il tempo complessivo di ogni giro)
+            validated_partitions = []
+            rejected_partitions = []
+            with self.instrumentation.stage('validazione_deduplicazione', rows_in=len(df)) as step:
+                for partition, counters, partial_aggregates, rejected_rows in executor.map(
+                        _validate_partition, [self] * len(partitions), partitions):
+                    for key, value in counters.items():
+                        stats[key] += int(value)
+                    aggregates.merge(partial_aggregates)
+                    if len(partition) > 0:
+                        validated_partitions.append(partition)
+                    if len(rejected_rows) > 0:
+                        rejected_partitions.append(rejected_rows)
+                step.rows_out = sum(len(partition) for partition in validated_partitions)
+
+            # 2. Merge: aggregati per reparto e fallback globali
+            salary_mean_by_department = aggregates.salary_mean_by_department()
+            global_avg_salary = aggregates.global_salary_mean()
+            hire_date_median_by_department = aggregates.hire_date_median_by_department()
+            global_median_hire_date = aggregates.global_hire_date_median()
+
+            # 3. Imputazione e colonne derivate per partizione
+            num_partitions = len(validated_partitions)
+            with self.instrumentation.stage('imputazione_derivazione', rows_in=step.rows_out) as step:
+                transformed_partitions = list(executor.map(
+                    _derive_partition, [self] * num_partitions, validated_partitions,
+                    [salary_mean_by_department] * num_partitions, [global_avg_salary] * num_partitions,
+                    [hire_date_median_by_department] * num_partitions, [global_median_hire_date] * num_partitions
+                ))
+                step.rows_out = sum(len(partition) for partition in transformed_partitions)
+
+        if transformed_partitions:
+            df_transformed = pd.concat(transformed_partitions).sort_index()
+        else:
+            df_transformed = self._derive_columns(df.iloc[0:0].copy(), salary_mean_by_department)
+        self.rejected_rows = pd.concat(rejected_partitions).sort_index() if rejected_partitions else None
+
+        print(f"Rimossi {stats['duplicati_rimossi']} record duplicati.")
+        print(f"Imputati {stats['missing_stipendio_imputed_total']} valori mancanti per stipendio.")
+        print(f"Imputati {stats['missing_data_assunzione_imputed_total']} valori mancanti per data assunzione.")
+
+        stats['duplicati_nell_esecuzione'] = stats['duplicati_rimossi']
+        stats['duplicati_tra_esecuzioni'] = 0
+        stats['rows_after_validation_and_cleaning'] = len(df_transformed)
+        stats['conteggio_per_reparto_output'] = df_transformed[config.DEPARTMENT_COLUMN].value_counts().to_dict()
+        df_transformed = self._compact(df_transformed)
+        stats['memoria_per_colonna'] = self.last_memory_report
+        print("Trasformazione parallela completata.")
+        return df_transformed, stats
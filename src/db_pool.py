@@ -0,0 +1,106 @@
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+from src import config
+
+def read_metadata(conn):
+    """
+    Legge i metadati dei caricamenti (tabella config.METADATA_TABLE). Solo libreria standard:
+    la dashboard la usa a ogni esecuzione dello script senza importare pandas.
+    Args:
+        conn (sqlite3.Connection): Connessione al database.
+    Returns:
+        dict: Chiave -> valore (es. 'versione_dati', 'impronta_dati'); vuoto se la tabella non esiste.
+    """
+    try:
+        return dict(conn.execute(f'SELECT chiave, valore FROM "{config.METADATA_TABLE}"').fetchall())
+    except sqlite3.OperationalError: # Database creato da una versione precedente
+        return {}
+
+class ReadOnlyConnectionPool:
+    def __init__(self, db_path, size=None, timeout=None):
+        """
+        Pool di connessioni SQLite in sola lettura condiviso tra le sessioni della dashboard.
+        Le connessioni (URI `mode=ro`) vengono aperte al primo uso, configurate una volta con
+        config.SQLITE_READ_PRAGMAS (mmap, cache, query_only) e riutilizzate, insieme alla cache
+        delle istruzioni preparate di sqlite3 (config.SQLITE_STATEMENT_CACHE_SIZE): una query
+        con lo stesso testo e parametri diversi non viene ricompilata. In modalità WAL ogni
+        query legge l'ultima versione confermata senza bloccare né attendere i caricamenti.
+        Se il file del database viene sostituito, le connessioni al vecchio file vengono riaperte.
+        Args:
+            db_path (str): Percorso del database SQLite.
+            size (int, optional): Connessioni al massimo. Default: config.DASHBOARD_POOL_SIZE.
+            timeout (float, optional): Attesa massima (secondi) di una connessione libera e dei
+                lock di SQLite. Default: config.SQLITE_READ_TIMEOUT.
+        """
+        self.db_path = db_path
+        self.size = size or config.DASHBOARD_POOL_SIZE
+        self.timeout = config.SQLITE_READ_TIMEOUT if timeout is None else timeout
+        self._idle = queue.LifoQueue() # Coppie (connessione, identità del file) libere; LIFO riusa le più "calde"
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._closed = False
+
+    def _file_identity(self):
+        """(device, inode) del file del database, per riconoscerne la sostituzione."""
+        stat = os.stat(self.db_path)
+        return stat.st_dev, stat.st_ino
+
+    def _open(self):
+        """Apre e configura una nuova connessione in sola lettura."""
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=self.timeout,
+                               check_same_thread=False, cached_statements=config.SQLITE_STATEMENT_CACHE_SIZE)
+        for pragma, value in config.SQLITE_READ_PRAGMAS.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Presta una connessione del pool per la durata del blocco `with`.
+        Yields:
+            sqlite3.Connection: Connessione in sola lettura (da non chiudere).
+        Raises:
+            TimeoutError: Se nessuna connessione si libera entro `timeout` secondi.
+            sqlite3.OperationalError: Se il database non esiste o non è leggibile.
+        """
+        if self._closed:
+            raise RuntimeError("Pool di connessioni chiuso.")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Nessuna connessione libera al database {self.db_path} entro {self.timeout}s.")
+        entry = None
+        try:
+            identity = self._file_identity() if os.path.exists(self.db_path) else None
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if entry is not None and entry[1] != identity:
+                entry[0].close()
+                entry = None
+            if entry is None:
+                entry = (self._open(), identity)
+            yield entry[0]
+        except sqlite3.DatabaseError:
+            # Connessione in stato incerto (database sostituito, corrotto, ...): non viene riusata
+            if entry is not None:
+                entry[0].close()
+                entry = None
+            raise
+        finally:
+            if entry is not None:
+                if self._closed:
+                    entry[0].close()
+                else:
+                    self._idle.put(entry)
+            self._slots.release()
+
+    def close(self):
+        """Chiude le connessioni libere; quelle in uso vengono chiuse alla restituzione."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait()[0].close()
+            except queue.Empty:
+                break
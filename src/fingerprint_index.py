@@ -0,0 +1,67 @@
+import numpy as np
+from src import config
+
+def _json_array(values):
+    """Array JSON di interi, passato come unico parametro a `json_each` (nessun limite di parametri)."""
+    return '[' + ','.join(map(str, values.tolist())) + ']'
+
+class RowFingerprintIndex:
+    def __init__(self, conn, table=None):
+        """
+        Indice persistente delle impronte delle righe già caricate (hash a 64 bit di `row_hashes`
+        sulle colonne dei duplicati, prima dell'imputazione), per riconoscere i duplicati tra
+        esecuzioni diverse. Le impronte sono la chiave primaria di una tabella SQLite WITHOUT ROWID
+        nel database di output: 8 byte per riga nell'albero B, nessun dato in memoria.
+        Ricerche e inserimenti avvengono per lotto con un'unica istruzione (impronte ordinate,
+        passate come array JSON a `json_each`), quindi la memoria è O(lotto).
+        L'indice usa la connessione del chiamante e non apre né chiude transazioni: va aggiornato
+        nella stessa transazione che carica le righe.
+        Args:
+            conn (sqlite3.Connection): Connessione al database di output.
+            table (str, optional): Nome della tabella. Default: config.FINGERPRINT_TABLE.
+        """
+        self.conn = conn
+        self.table = table or config.FINGERPRINT_TABLE
+
+    def exists(self):
+        """True se la tabella dell'indice esiste."""
+        return self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                 (self.table,)).fetchone() is not None
+
+    def create(self):
+        """Crea la tabella dell'indice, se non esiste."""
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.table}" (impronta INTEGER PRIMARY KEY) WITHOUT ROWID')
+
+    def count(self):
+        """Numero di impronte registrate."""
+        return self.conn.execute(f'SELECT COUNT(*) FROM "{self.table}"').fetchone()[0]
+
+    def contains(self, hashes):
+        """
+        Cerca un lotto di impronte nell'indice.
+        Args:
+            hashes (np.ndarray): Impronte uint64 (es. `row_hashes`).
+        Returns:
+            np.ndarray: Maschera booleana, True per le impronte già presenti.
+        """
+        signed = np.asarray(hashes, dtype='uint64').view('int64')
+        if len(signed) == 0:
+            return np.zeros(0, dtype=bool)
+        # Valori ordinati: le ricerche sulla chiave primaria percorrono l'albero in ordine
+        cursor = self.conn.execute(
+            f'SELECT impronta FROM "{self.table}" WHERE impronta IN (SELECT value FROM json_each(?))',
+            (_json_array(np.unique(signed)),))
+        found = np.fromiter((row[0] for row in cursor), dtype='int64')
+        return np.isin(signed, found)
+
+    def add(self, hashes):
+        """
+        Registra un lotto di impronte (quelle già presenti vengono ignorate).
+        Args:
+            hashes (np.ndarray): Impronte uint64 (es. `row_hashes`).
+        """
+        signed = np.asarray(hashes, dtype='uint64').view('int64')
+        if len(signed) == 0:
+            return
+        self.conn.execute(f'INSERT OR IGNORE INTO "{self.table}" SELECT value FROM json_each(?)',
+                          (_json_array(np.unique(signed)),))
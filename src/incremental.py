@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+from collections import Counter
+from src import config
+from src.data_transformation import TransformAggregates, _duplicate_check_columns, as_datetime, row_hashes
+from src.validation import REASON_DUPLICATE
+
+LOADED = 'caricata' # Esito delle righe presenti in `dipendenti`
+STATE_COLUMNS = ['id', 'hash_riga', 'hash_contenuto', 'esito', 'reparto', 'stipendio', 'data_assunzione']
+
+def _signed_hashes(df, columns):
+    """Hash per riga come interi con segno a 64 bit (il tipo INTEGER di SQLite)."""
+    return row_hashes(df, columns).view('int64')
+
+def _changed_departments(old_values, new_values):
+    """Reparti il cui valore (media o mediana di imputazione) è cambiato, inclusi quelli nuovi o scomparsi."""
+    departments = old_values.index.union(new_values.index)
+    old_values = old_values.reindex(departments)
+    new_values = new_values.reindex(departments)
+    unchanged = (old_values == new_values) | (old_values.isna() & new_values.isna())
+    return set(departments[~unchanged.to_numpy()])
+
+class IncrementalETL:
+    def __init__(self, transformer, loader):
+        """
+        ETL incrementale basato sull'id del dipendente e su un hash del contenuto di ogni riga.
+        Ad ogni esecuzione confronta l'input con lo stato persistito nel database di output,
+        trasforma solo le righe nuove o modificate e applica il delta con un upsert. Gli aggregati
+        per reparto (somme degli stipendi e istogrammi delle date di assunzione) sono persistiti
+        e aggiornati con le sole differenze, così imputazione e `valutazione_stipendio` restano
+        coerenti con l'intero dataset.
+        Nota: le colonne che dipendono dalla data corrente (anni_di_servizio, bonus, anzianita)
+        delle righe invariate restano quelle calcolate al loro ultimo caricamento; un'esecuzione
+        completa le riallinea.
+        Args:
+            transformer (DataTransformer): Trasformatore usato per validazione, imputazione e colonne derivate.
+            loader (DataLoader): Caricatore che gestisce stato e upsert nel database SQLite.
+        """
+        self.transformer = transformer
+        self.loader = loader
+
+    @staticmethod
+    def _aggregates_from_tables(salary_aggregates, hire_date_aggregates):
+        """Ricostruisce gli aggregati per reparto dalle tabelle persistite."""
+        aggregates = TransformAggregates()
+        if salary_aggregates is not None:
+            for department, total, count in salary_aggregates[['reparto', 'somma', 'conteggio']].itertuples(index=False):
+                aggregates.salary_sum[department] = total
+                aggregates.salary_count[department] = int(count)
+        if hire_date_aggregates is not None:
+            for department, value, count in hire_date_aggregates[['reparto', 'data_assunzione', 'conteggio']].itertuples(index=False):
+                aggregates.hire_date_counts.setdefault(department, Counter())[int(value)] = int(count)
+        return aggregates
+
+    @staticmethod
+    def _aggregates_to_tables(aggregates):
+        """Converte gli aggregati per reparto nelle tabelle da persistere."""
+        salary_aggregates = pd.DataFrame({
+            'reparto': list(aggregates.salary_count),
+            'somma': [aggregates.salary_sum.get(department, 0.0) for department in aggregates.salary_count],
+            'conteggio': list(aggregates.salary_count.values()),
+        })
+        hire_date_aggregates = pd.DataFrame(
+            [(department, value, count)
+             for department, counts in aggregates.hire_date_counts.items()
+             for value, count in counts.items()],
+            columns=['reparto', 'data_assunzione', 'conteggio']
+        )
+        return salary_aggregates, hire_date_aggregates
+
+    @staticmethod
+    def _observed_frame(state_rows):
+        """Valori osservati (pre-imputazione) delle righe di stato, nel formato atteso da TransformAggregates."""
+        return pd.DataFrame({
+            config.DEPARTMENT_COLUMN: state_rows['reparto'],
+            config.SALARY_COLUMN: state_rows['stipendio'].astype('float64'),
+            config.HIRE_DATE_COLUMN: pd.to_datetime(state_rows['data_assunzione'], unit='us'),
+        })
+
+    @staticmethod
+    def _state_rows(rows, content_columns, outcome, raw_row_hashes):
+        """Righe di stato per le righe rielaborate."""
+        # Date in microsecondi: restano esatte anche se SQLite le rilegge come float (colonna con NULL)
+        hire_dates = as_datetime(rows[config.HIRE_DATE_COLUMN])
+        hire_date_us = pd.Series(hire_dates.to_numpy(dtype='datetime64[us]').view('int64'), index=rows.index)
+        return pd.DataFrame({
+            'id': rows['id'].astype('int64'),
+            'hash_riga': raw_row_hashes.loc[rows.index],
+            'hash_contenuto': _signed_hashes(rows, content_columns),
+            'esito': outcome,
+            'reparto': rows[config.DEPARTMENT_COLUMN],
+            'stipendio': rows[config.SALARY_COLUMN],
+            'data_assunzione': hire_date_us.astype(object).where(hire_dates.notna(), None),
+        }, index=rows.index)
+
+    def run(self, raw):
+        """
+        Esegue un'iterazione incrementale: rileva righe nuove, modificate ed eliminate,
+        trasforma solo il delta e lo applica al database.
+        Args:
+            raw (pd.DataFrame): Dati grezzi completi estratti dall'input.
+        Returns:
+            pd.DataFrame: Righe trasformate inserite o aggiornate in questa esecuzione.
+            dict: Statistiche del delta e della trasformazione.
+        Raises:
+            ValueError: Se la colonna 'id' manca, contiene valori nulli o duplicati.
+        """
+        print("\nETL incrementale: rilevamento delle righe nuove, modificate ed eliminate...")
+        if 'id' not in raw.columns or raw['id'].isna().any() or raw['id'].duplicated().any():
+            raise ValueError("La modalità incrementale richiede una colonna 'id' univoca e non nulla.")
+
+        state, salary_tables, hire_date_tables = self.loader.read_incremental_state()
+        full_rebuild = state is None
+        if full_rebuild:
+            print("Nessuno stato incrementale trovato: tutte le righe sono considerate nuove.")
+            state = pd.DataFrame({col: pd.Series(dtype='int64' if col in ('id', 'hash_riga', 'hash_contenuto') else object)
+                                  for col in STATE_COLUMNS})
+        state = state.set_index('id')
+        old_aggregates = self._aggregates_from_tables(salary_tables, hire_date_tables)
+
+        # 1. Classificazione delle righe per id e hash del contenuto grezzo
+        raw_ids = raw['id'].astype('int64')
+        raw_row_hashes = pd.Series(_signed_hashes(raw, raw.columns.tolist()), index=raw.index)
+        previous_hashes = state['hash_riga'].astype('Int64').reindex(raw_ids.to_numpy())
+        is_new = previous_hashes.isna().to_numpy()
+        is_changed = ~is_new & (previous_hashes.to_numpy(dtype='int64', na_value=0) != raw_row_hashes.to_numpy())
+        deleted_ids = state.index.difference(raw_ids)
+        removed_ids = pd.Index(raw_ids[is_changed]).union(deleted_ids)
+
+        removed_state = state.loc[removed_ids]
+        removed_loaded = removed_state[removed_state['esito'] == LOADED]
+        remaining_loaded = state[(state['esito'] == LOADED) & ~state.index.isin(removed_ids)]
+
+        # Duplicati invariati di righe rimosse: vanno rivalutati perché possono diventare la prima occorrenza
+        unchanged_ids = raw_ids[~is_new & ~is_changed]
+        resurrected_ids = state.index[
+            (state['esito'] == REASON_DUPLICATE)
+            & state['hash_contenuto'].isin(removed_loaded['hash_contenuto'])
+            & state.index.isin(unchanged_ids)
+        ]
+        delta_raw = raw[is_new | is_changed | raw_ids.isin(resurrected_ids).to_numpy()]
+        print(f"Righe nuove: {int(is_new.sum())}, modificate: {int(is_changed.sum())}, "
+              f"eliminate: {len(deleted_ids)}, invariate: {len(unchanged_ids)}.")
+
+        # 2. Validazione del delta e deduplicazione rispetto alle righe già caricate
+        valid_delta, counters, rejected_rows = self.transformer._validate(delta_raw, verbose=False, deduplicate=True)
+        content_columns = _duplicate_check_columns(valid_delta)
+        cross_run_duplicates = np.isin(_signed_hashes(valid_delta, content_columns),
+                                       remaining_loaded['hash_contenuto'].to_numpy(dtype='int64'))
+        counters['duplicati_nell_esecuzione'] = counters['duplicati_rimossi']
+        counters['duplicati_tra_esecuzioni'] = int(cross_run_duplicates.sum())
+        counters['duplicati_rimossi'] += counters['duplicati_tra_esecuzioni']
+        rejected_rows = pd.concat([rejected_rows, valid_delta[cross_run_duplicates].assign(motivo_scarto=REASON_DUPLICATE)])
+        kept_delta = valid_delta[~cross_run_duplicates]
+
+        # 3. Aggiornamento degli aggregati per reparto con le sole differenze
+        new_aggregates = TransformAggregates()
+        new_aggregates.merge(old_aggregates)
+        new_aggregates.update(self._observed_frame(removed_loaded), sign=-1)
+        new_aggregates.update(kept_delta)
+
+        old_salary_fill = old_aggregates.salary_mean_by_department().fillna(old_aggregates.global_salary_mean())
+        new_salary_mean = new_aggregates.salary_mean_by_department()
+        new_global_salary = new_aggregates.global_salary_mean()
+        new_salary_fill = new_salary_mean.fillna(new_global_salary)
+        old_date_fill = old_aggregates.hire_date_median_by_department().fillna(old_aggregates.global_hire_date_median())
+        new_hire_date_median = new_aggregates.hire_date_median_by_department()
+        new_global_hire_date = new_aggregates.global_hire_date_median()
+        new_date_fill = new_hire_date_median.fillna(new_global_hire_date)
+        salary_changed = _changed_departments(old_salary_fill, new_salary_fill)
+        date_changed = _changed_departments(old_date_fill, new_date_fill)
+
+        # Righe invariate con valori imputati in reparti il cui valore di imputazione è cambiato
+        refresh_state = remaining_loaded[
+            (remaining_loaded['stipendio'].isna() & remaining_loaded['reparto'].isin(salary_changed))
+            | (remaining_loaded['data_assunzione'].isna() & remaining_loaded['reparto'].isin(date_changed))
+        ]
+        refresh_raw = raw[raw_ids.isin(refresh_state.index).to_numpy()]
+        refresh_valid, _, _ = self.transformer._validate(refresh_raw, verbose=False)
+
+        # 4. Imputazione e colonne derivate solo per il delta (e le righe da riallineare)
+        missing_salaries = int(kept_delta[config.SALARY_COLUMN].isna().sum())
+        missing_hire_dates = int(kept_delta[config.HIRE_DATE_COLUMN].isna().sum())
+        rows_to_transform = pd.concat([kept_delta, refresh_valid])
+        transformed = self.transformer._impute(
+            rows_to_transform.copy(), new_salary_mean, new_global_salary, new_hire_date_median, new_global_hire_date
+        )
+        transformed = self.transformer._derive_columns(transformed, new_salary_fill)
+        transformed = self.transformer._compact(transformed)
+
+        # 5. Applicazione del delta: upsert, rivalutazione dei reparti, stato e aggregati
+        state_rows = pd.concat([
+            self._state_rows(kept_delta, content_columns, LOADED, raw_row_hashes),
+            self._state_rows(rejected_rows, content_columns, rejected_rows['motivo_scarto'].astype(str), raw_row_hashes),
+        ])
+        salary_aggregates, hire_date_aggregates = self._aggregates_to_tables(new_aggregates)
+        self.loader.apply_delta(
+            rows_to_insert=transformed,
+            ids_to_delete=removed_ids.union(pd.Index(refresh_state.index)).tolist(),
+            state_rows=state_rows[STATE_COLUMNS],
+            state_ids_to_delete=deleted_ids.tolist(),
+            salary_aggregates=salary_aggregates,
+            hire_date_aggregates=hire_date_aggregates,
+            valuation_means={department: new_salary_fill[department]
+                             for department in salary_changed if department in new_salary_fill.index},
+            full_rebuild=full_rebuild
+        )
+
+        self.transformer.rejected_rows = rejected_rows
+        stats = {
+            'righe_nuove': int(is_new.sum()),
+            'righe_modificate': int(is_changed.sum()),
+            'righe_eliminate': len(deleted_ids),
+            'righe_invariate': len(unchanged_ids),
+            'righe_riallineate': len(refresh_valid),
+            'initial_rows': len(delta_raw),
+            'rows_after_validation_and_cleaning': len(kept_delta),
+            **counters,
+            'missing_stipendio_imputed_total': missing_salaries,
+            'missing_data_assunzione_imputed_total': missing_hire_dates,
+            'conteggio_per_reparto_output': kept_delta[config.DEPARTMENT_COLUMN].value_counts().to_dict(),
+        }
+        print(f"Delta applicato: {len(kept_delta)} righe caricate, {len(refresh_valid)} riallineate, "
+              f"{len(deleted_ids)} eliminate, {counters['duplicati_rimossi']} duplicati scartati.")
+        return transformed, stats
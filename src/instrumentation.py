@@ -0,0 +1,237 @@
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError: # Non disponibile su Windows: il picco RSS non viene misurato
+    resource = None
+
+def peak_rss_bytes():
+    """
+    Picco della memoria residente (RSS) del processo dall'avvio, in byte, oppure None
+    se non misurabile. È un massimo storico: cresce solo se una fase supera i picchi precedenti.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024 # Linux restituisce KiB, macOS byte
+
+class StageRecord:
+    def __init__(self, name):
+        """
+        Misure di una fase (o sotto-fase) della pipeline. Se la stessa fase viene eseguita
+        più volte (es. una volta per blocco) le misure si accumulano.
+        Args:
+            name (str): Nome completo della fase (es. 'transform.validazione').
+        """
+        self.name = name
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.tracemalloc_peak_bytes = None
+        self.rss_peak_bytes = None
+        self.rss_growth_bytes = 0
+        self.rows_in = None
+        self.rows_out = None
+
+    def to_dict(self):
+        return {
+            'fase': self.name,
+            'chiamate': self.calls,
+            'wall_secondi': round(self.wall_seconds, 6),
+            'cpu_secondi': round(self.cpu_seconds, 6),
+            'tracemalloc_picco_byte': self.tracemalloc_peak_bytes,
+            'rss_picco_byte': self.rss_peak_bytes,
+            'rss_crescita_byte': self.rss_growth_bytes,
+            'righe_in': self.rows_in,
+            'righe_out': self.rows_out,
+        }
+
+class StageHandle:
+    def __init__(self):
+        """Valori impostati dal codice misurato durante la fase (righe in ingresso e in uscita)."""
+        self.rows_in = None
+        self.rows_out = None
+
+class PipelineInstrumentation:
+    def __init__(self, enabled=True, trace_memory=False):
+        """
+        Raccoglie tempo wall, tempo CPU, picco di memoria e righe in/out per fase e sotto-fase.
+        Le fasi si annidano: una sotto-fase aperta dentro 'transform' si chiama 'transform.<nome>'.
+        Args:
+            enabled (bool): Se False le fasi non vengono misurate (nessun costo aggiuntivo).
+            trace_memory (bool): Se misurare il picco di allocazioni Python con tracemalloc
+                (più preciso dell'RSS ma rallenta sensibilmente il codice che alloca molto).
+        """
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records = {} # nome completo -> StageRecord, in ordine di prima esecuzione
+        self._stack = [] # [nome completo, picco tracemalloc osservato finora]
+        self._started_tracemalloc = False
+        self._listeners = []
+
+    def __getstate__(self):
+        # I worker della trasformazione parallela ricevono una copia disattivata
+        state = self.__dict__.copy()
+        state.update(enabled=False, records={}, _stack=[], _started_tracemalloc=False, _listeners=[])
+        return state
+
+    def add_listener(self, listener):
+        """
+        Registra una funzione chiamata all'inizio e alla fine di ogni fase (es. per mostrare
+        l'avanzamento della pipeline). Le eccezioni della funzione non interrompono la pipeline.
+        Args:
+            listener (callable): Chiamata come listener(evento, record, handle), con evento
+                'inizio' o 'fine', il StageRecord della fase e lo StageHandle corrente
+                (con le righe in ingresso e, alla fine, in uscita).
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, event, record, handle):
+        for listener in self._listeners:
+            try:
+                listener(event, record, handle)
+            except Exception as e:
+                print(f"Errore nel listener della strumentazione: {e}")
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Misura un blocco di codice come fase della pipeline.
+        Args:
+            name (str): Nome della fase (relativo alla fase che la contiene).
+            rows_in (int, optional): Righe in ingresso (impostabili anche sull'handle).
+        Yields:
+            StageHandle: Handle su cui impostare `rows_in`/`rows_out`.
+        """
+        handle = StageHandle()
+        handle.rows_in = rows_in
+        if not self.enabled:
+            yield handle
+            return
+
+        full_name = f"{self._stack[-1][0]}.{name}" if self._stack else name
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            # Il picco raggiunto finora appartiene alla fase esterna: viene conservato prima dell'azzeramento
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._stack.append([full_name, 0])
+        record = self.records.setdefault(full_name, StageRecord(full_name)) # Registrata all'ingresso: le fasi esterne precedono le interne
+        rss_before = peak_rss_bytes()
+        self._notify('inizio', record, handle)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield handle
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+            _, stage_peak = self._stack.pop()
+            record.calls += 1
+            record.wall_seconds += wall
+            record.cpu_seconds += cpu
+            rss_after = peak_rss_bytes()
+            if rss_after is not None:
+                record.rss_peak_bytes = rss_after
+                record.rss_growth_bytes += rss_after - rss_before
+            if self.trace_memory and tracemalloc.is_tracing():
+                stage_peak = max(stage_peak, tracemalloc.get_traced_memory()[1])
+                record.tracemalloc_peak_bytes = max(record.tracemalloc_peak_bytes or 0, stage_peak)
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], stage_peak)
+                tracemalloc.reset_peak()
+                if not self._stack and self._started_tracemalloc:
+                    tracemalloc.stop()
+                    self._started_tracemalloc = False
+            for attribute in ('rows_in', 'rows_out'):
+                value = getattr(handle, attribute)
+                if value is not None:
+                    setattr(record, attribute, (getattr(record, attribute) or 0) + int(value))
+            self._notify('fine', record, handle)
+
+    def reset(self):
+        """Elimina le misure raccolte (es. prima di una nuova esecuzione della pipeline)."""
+        self.records = {}
+
+    def to_dict(self):
+        """Misure raccolte, nel formato scritto da `write_json`."""
+        return {
+            'generato_il': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'fasi': [record.to_dict() for record in self.records.values()],
+        }
+
+    @staticmethod
+    def _write_atomically(path, content):
+        """Scrive su un file temporaneo e lo rinomina: chi legge non vede mai un file parziale."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temporary_path, path)
+
+    def write_json(self, path):
+        """
+        Scrive le misure in formato JSON.
+        Args:
+            path (str): Percorso del file di output.
+        """
+        self._write_atomically(path, json.dumps(self.to_dict(), indent=2, ensure_ascii=False))
+
+    def to_prometheus(self, prefix='etl'):
+        """
+        Misure nel formato testuale di Prometheus (una serie per fase, etichetta `fase`).
+        Args:
+            prefix (str): Prefisso dei nomi delle metriche.
+        Returns:
+            str: Contenuto per il textfile collector di node_exporter.
+        """
+        metrics = [
+            ('wall_seconds', 'wall_seconds', "Tempo wall della fase in secondi."),
+            ('cpu_seconds', 'cpu_seconds', "Tempo CPU del processo principale durante la fase in secondi."),
+            ('tracemalloc_peak_bytes', 'tracemalloc_peak_bytes', "Picco di allocazioni Python (tracemalloc) in byte."),
+            ('rss_peak_bytes', 'rss_peak_bytes', "Picco RSS del processo al termine della fase in byte."),
+            ('rows_in', 'rows_in', "Righe in ingresso alla fase."),
+            ('rows_out', 'rows_out', "Righe in uscita dalla fase."),
+            ('calls', 'calls', "Numero di esecuzioni della fase."),
+        ]
+        lines = []
+        for attribute, metric_name, help_text in metrics:
+            samples = [(record.name, getattr(record, attribute)) for record in self.records.values()
+                       if getattr(record, attribute) is not None]
+            if not samples:
+                continue
+            full_metric_name = f"{prefix}_stage_{metric_name}"
+            lines.append(f"# HELP {full_metric_name} {help_text}")
+            lines.append(f"# TYPE {full_metric_name} gauge")
+            for stage_name, value in samples:
+                escaped_name = stage_name.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{full_metric_name}{{fase="{escaped_name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='etl'):
+        """
+        Scrive le misure per il textfile collector di Prometheus (file `.prom`).
+        Args:
+            path (str): Percorso del file di output.
+            prefix (str): Prefisso dei nomi delle metriche.
+        """
+        self._write_atomically(path, self.to_prometheus(prefix))
+
+    def print_summary(self):
+        """Stampa una tabella riassuntiva delle misure."""
+        if not self.records:
+            return
+        print("\nStrumentazione della pipeline (tempo wall, CPU, memoria, righe):")
+        for record in self.records.values():
+            depth = record.name.count('.')
+            memory = record.tracemalloc_peak_bytes if record.tracemalloc_peak_bytes is not None else record.rss_peak_bytes
+            memory_text = f"{memory / 2**20:.1f} MiB" if memory is not None else "n/d"
+            rows_text = f"{record.rows_in if record.rows_in is not None else '-'} -> {record.rows_out if record.rows_out is not None else '-'}"
+            print(f"{'  ' * depth}- {record.name.rsplit('.', 1)[-1]}: wall {record.wall_seconds:.3f}s, "
+                  f"CPU {record.cpu_seconds:.3f}s, memoria {memory_text}, righe {rows_text}")
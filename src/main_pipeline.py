@@ -1,79 +1,580 @@
+import argparse
+import hashlib
+import json
+import os
+import pandas as pd
 from src import config
+from src.aggregation import GroupStatistics
+from src.checkpoints import StageCheckpoints, input_digests, input_identity
 from src.data_extraction import DataExtractor
-from src.data_transformation import DataTransformer
-from src.data_loading import DataLoader
+from src.data_transformation import TRANSFORMER_VERSION, DataTransformer, restore_transformed_dtypes
+from src.data_loading import DataLoader, ParquetSink, write_to_sinks
+from src.incremental import IncrementalETL
+from src.instrumentation import PipelineInstrumentation
 from src.reporting import ReportGenerator
 
+# Valori di `stages` per run_full_pipeline (e --stages da riga di comando)
+PIPELINE_STAGES = ('etl', 'report', 'all')
+# Modalità di caricamento di run_full_pipeline: completo in memoria (`run_etl`), completo a
+# blocchi (`run_etl_out_of_core`), in accodamento (`run_etl_append`) o incrementale (`run_etl_incremental`)
+LOAD_MODES = ('full', 'out_of_core', 'append', 'incremental')
+
 class ETLPipelineOrchestrator:
-    def __init__(self, input_path, output_db_path, viz_dir):
+    def __init__(self, input_path, output_db_path, viz_dir, extra_sinks=None, instrumentation=None,
+                 checkpoint_dir=None):
         """
         Inizializza l'orchestratore della pipeline ETL.
         Args:
             input_path (str): Percorso del file CSV di input.
             output_db_path (str): Percorso del database SQLite di output.
             viz_dir (str): Directory per salvare le visualizzazioni.
+            extra_sinks (list, optional): Destinazioni aggiuntive (DataSink, es. ParquetSink)
+                scritte insieme al database SQLite.
+            instrumentation (PipelineInstrumentation, optional): Raccolta delle misure per fase.
+                Default: strumentazione attiva, con tracemalloc secondo config.METRICS_TRACE_MEMORY.
+            checkpoint_dir (str, optional): Directory dei checkpoint delle fasi di `run_etl` e
+                `run_reporting` (es. config.CHECKPOINT_DIR), necessari per riprendere un'esecuzione
+                interrotta con `resume`. Se None non vengono salvati checkpoint.
         """
+        self.instrumentation = instrumentation or PipelineInstrumentation(trace_memory=config.METRICS_TRACE_MEMORY)
         self.extractor = DataExtractor(input_path)
         self.transformer = DataTransformer()
+        self.transformer.instrumentation = self.instrumentation
         self.loader = DataLoader(output_db_path)
+        self.extra_sinks = list(extra_sinks or [])
         self.reporter = ReportGenerator(viz_dir)
+        self.input_path = input_path
+        self.checkpoints = StageCheckpoints(checkpoint_dir) if checkpoint_dir else None
+        self.resumed_stages = [] # Fasi ripristinate dai checkpoint nell'esecuzione corrente
+        self.run_fingerprint = None # Impronta dell'esecuzione completa (vedi `compute_run_fingerprint`)
+        self.input_files = None # Impronte dei file di input, registrate insieme a `run_fingerprint`
+        self.load_mode = 'full' # Modalità di caricamento dell'esecuzione (vedi LOAD_MODES)
         
         self.raw_data = None
         self.original_data_copy = None # Per statistiche o confronti futuri se necessario
         self.transformed_data = None
         self.transform_stats = None
+        self.rejected_rows = None # Righe scartate in trasformazione, con `motivo_scarto`
+        # Statistiche di gruppo dei dati trasformati (GroupStatistics), calcolate una volta e usate
+        # da tabelle di riepilogo, report testuale e grafici
+        self.group_statistics = None
 
-    def run_etl(self):
-        """Esegue i passaggi Extract, Transform, Load."""
+    def _start_checkpoints(self, resume):
+        """
+        Avvia i checkpoint dell'esecuzione (se abilitati): la chiave è l'identità dei file di
+        input e il database di output, quindi si riprende solo la stessa esecuzione.
+        Returns:
+            list: Fasi da ripristinare dai checkpoint invece di eseguirle.
+        """
+        if self.checkpoints is None:
+            if resume:
+                print("Checkpoint non abilitati (checkpoint_dir): l'esecuzione parte da zero.")
+            self.resumed_stages = []
+            return self.resumed_stages
+        run_key = {'input': input_identity(self.input_path), 'database': os.path.abspath(self.loader.db_path)}
+        self.resumed_stages = self.checkpoints.start(run_key, resume)
+        return self.resumed_stages
+
+    def _save_checkpoint(self, stage, *attributes):
+        """Salva gli attributi prodotti da una fase e la segna come completata (se i checkpoint sono abilitati)."""
+        if self.checkpoints is None or self.checkpoints.manifest is None: # Nessuna esecuzione avviata da run_etl
+            return
+        with self.instrumentation.stage(f'checkpoint_{stage}'):
+            self.checkpoints.save(stage, **{attribute: getattr(self, attribute) for attribute in attributes})
+
+    def _restore_checkpoint(self, stage):
+        """Ripristina gli attributi salvati da una fase completata in un'esecuzione precedente."""
+        with self.instrumentation.stage(f'ripristino_{stage}'):
+            for attribute, value in self.checkpoints.load(stage).items():
+                setattr(self, attribute, value)
+        print(f"Fase '{stage}' ripristinata dal checkpoint.")
+
+    def run_etl(self, parallel=False, max_workers=None, resume=False):
+        """
+        Esegue i passaggi Extract, Transform, Load.
+        Con i checkpoint abilitati (`checkpoint_dir`) l'output di ogni fase (dati grezzi, dati
+        trasformati con statistiche e righe scartate, statistiche di gruppo) viene salvato al
+        termine della fase, e il caricamento viene segnato come completato.
+        Args:
+            parallel (bool): Se eseguire la trasformazione su più processi, partizionando per reparto.
+            max_workers (int, optional): Numero di processi per la trasformazione parallela.
+            resume (bool): Se riprendere l'ultima esecuzione interrotta con lo stesso input e database,
+                ripristinando dai checkpoint le fasi già completate invece di eseguirle di nuovo.
+        """
         try:
-            self.raw_data, self.original_data_copy = self.extractor.extract_data()
-            if self.raw_data is not None:
-                self.transformed_data, self.transform_stats = self.transformer.transform_data(self.raw_data)
-                if self.transformed_data is not None:
-                    self.loader.load_data(self.transformed_data)
+            completed = self._start_checkpoints(resume)
+            if 'transform' in completed:
+                self._restore_checkpoint('transform')
+            else:
+                if 'extract' in completed:
+                    self._restore_checkpoint('extract')
+                    self.original_data_copy = self.raw_data.copy(deep=False) if self.raw_data is not None else None
                 else:
-                    print("Trasformazione non ha prodotto dati, caricamento saltato.")
+                    with self.instrumentation.stage('extract') as stage:
+                        self.raw_data, self.original_data_copy = self.extractor.extract_data()
+                        stage.rows_out = len(self.raw_data) if self.raw_data is not None else 0
+                    self._save_checkpoint('extract', 'raw_data')
+                if self.raw_data is None:
+                    print("Estrazione non ha prodotto dati, pipeline interrotta.")
+                    return
+                with self.instrumentation.stage('transform', rows_in=len(self.raw_data)) as stage:
+                    if parallel:
+                        self.transformed_data, self.transform_stats = self.transformer.transform_data_parallel(self.raw_data, max_workers)
+                    else:
+                        self.transformed_data, self.transform_stats = self.transformer.transform_data(self.raw_data)
+                    stage.rows_out = len(self.transformed_data) if self.transformed_data is not None else 0
+                self.rejected_rows = self.transformer.rejected_rows
+                self._save_checkpoint('transform', 'transformed_data', 'transform_stats', 'rejected_rows')
+            if self.transformed_data is None:
+                print("Trasformazione non ha prodotto dati, caricamento saltato.")
+                return
+            if 'aggregazione' in completed:
+                self._restore_checkpoint('aggregazione')
             else:
-                print("Estrazione non ha prodotto dati, pipeline interrotta.")
+                with self.instrumentation.stage('aggregazione', rows_in=len(self.transformed_data)):
+                    self.group_statistics = GroupStatistics.from_frame(self.transformed_data)
+                self._save_checkpoint('aggregazione', 'group_statistics')
+            if 'load' in completed:
+                print("Caricamento già completato nell'esecuzione ripresa.")
+                return
+            with self.instrumentation.stage('load', rows_in=len(self.transformed_data)) as stage:
+                with self.instrumentation.stage('sqlite', rows_in=len(self.transformed_data)):
+                    self.loader.load_data(self.transformed_data, statistics=self.group_statistics)
+                for sink in self.extra_sinks:
+                    with self.instrumentation.stage(type(sink).__name__, rows_in=len(self.transformed_data)):
+                        sink.write(self.transformed_data)
+                stage.rows_out = len(self.transformed_data)
+            self._save_checkpoint('load')
         except Exception as e:
             print(f"Errore durante l'esecuzione ETL: {e}")
             # Potrebbe essere utile propagare l'eccezione o gestirla più specificamente
             raise 
 
+    def run_etl_out_of_core(self, chunksize=None):
+        """
+        Esegue Extract, Transform, Load a blocchi, con memoria costante rispetto alla dimensione dell'input.
+        Il file viene letto due volte: il primo passaggio raccoglie gli aggregati per reparto,
+        il secondo trasforma e carica un blocco alla volta. I dati trasformati non restano
+        in memoria, quindi `transformed_data` rimane None.
+        Args:
+            chunksize (int, optional): Righe per blocco. Default: config.CHUNK_SIZE.
+        """
+        try:
+            # Estrazione e trasformazione si alternano blocco per blocco: le misure sono per passaggio
+            with self.instrumentation.stage('aggregati'):
+                aggregates = self.transformer.collect_aggregates(self.extractor.extract_chunks(chunksize))
+            with self.instrumentation.stage('transform_load') as stage:
+                self.group_statistics = GroupStatistics()
+                transformed_chunks = self._with_group_statistics(
+                    self.transformer.transform_chunks(self.extractor.extract_chunks(chunksize), aggregates))
+                if self.extra_sinks:
+                    print(f"\nCaricamento a blocchi dei dati in {self.loader.db_path}...")
+                    self.loader.group_statistics = self.group_statistics
+                    write_to_sinks(transformed_chunks, [self.loader] + self.extra_sinks)
+                else:
+                    self.loader.load_chunks(transformed_chunks, statistics=self.group_statistics)
+                stage.rows_in = self.transformer.last_transform_stats['initial_rows']
+                stage.rows_out = self.transformer.last_transform_stats['rows_after_validation_and_cleaning']
+            self.transform_stats = self.transformer.last_transform_stats
+            self.rejected_rows = self.transformer.rejected_rows
+        except Exception as e:
+            print(f"Errore durante l'esecuzione ETL a blocchi: {e}")
+            raise
+
+    def _with_group_statistics(self, chunks):
+        """Aggiorna `self.group_statistics` con ogni blocco trasformato mentre viene caricato."""
+        for chunk in chunks:
+            with self.instrumentation.stage('aggregazione', rows_in=len(chunk)):
+                self.group_statistics.update(chunk)
+            yield chunk
+
+    def run_etl_incremental(self):
+        """
+        Esegue l'ETL in modalità incrementale: trasforma e carica solo le righe nuove o modificate
+        (per id e hash del contenuto) ed elimina quelle non più presenti nell'input.
+        Alla prima esecuzione (nessuno stato nel database) la tabella viene ricostruita da zero.
+        In `transformed_data` restano solo le righe del delta. Le destinazioni aggiuntive
+        non supportano i delta e vengono riscritte rileggendo la tabella aggiornata.
+        """
+        try:
+            with self.instrumentation.stage('extract') as stage:
+                self.raw_data, self.original_data_copy = self.extractor.extract_data()
+                stage.rows_out = len(self.raw_data) if self.raw_data is not None else 0
+            if self.raw_data is None:
+                print("Estrazione non ha prodotto dati, pipeline interrotta.")
+                return
+            with self.instrumentation.stage('incrementale', rows_in=len(self.raw_data)) as stage:
+                self.transformed_data, self.transform_stats = IncrementalETL(self.transformer, self.loader).run(self.raw_data)
+                stage.rows_out = len(self.transformed_data)
+            # Le tabelle di riepilogo sono aggiornate in SQL per i soli gruppi toccati; per il report sul delta
+            with self.instrumentation.stage('aggregazione', rows_in=len(self.transformed_data)):
+                self.group_statistics = GroupStatistics.from_frame(self.transformed_data)
+            self.rejected_rows = self.transformer.rejected_rows
+            if self.extra_sinks:
+                with self.instrumentation.stage('load'):
+                    write_to_sinks(self.loader.read_table_chunks(), self.extra_sinks)
+        except Exception as e:
+            print(f"Errore durante l'esecuzione ETL incrementale: {e}")
+            raise
+
+    def run_etl_append(self, chunksize=None):
+        """
+        Esegue l'ETL in modalità di accodamento: l'input è un nuovo lotto di righe da aggiungere
+        a `dipendenti`, trasformato a blocchi come in `run_etl_out_of_core`. Le righe già caricate
+        da esecuzioni precedenti (indice persistente delle impronte, config.FINGERPRINT_TABLE)
+        vengono scartate come duplicati; le statistiche distinguono i duplicati nell'input
+        ('duplicati_nell_esecuzione') da quelli tra esecuzioni ('duplicati_tra_esecuzioni').
+        Righe e impronte sono scritte in un'unica transazione e le tabelle di riepilogo sono
+        ricalcolate per i soli gruppi toccati. Imputazione e `valutazione_stipendio` usano gli
+        aggregati del lotto. I dati trasformati non restano in memoria (`transformed_data` è None);
+        le destinazioni aggiuntive vengono riscritte rileggendo la tabella aggiornata.
+        Args:
+            chunksize (int, optional): Righe per blocco. Default: config.CHUNK_SIZE.
+        """
+        try:
+            print(f"\nCaricamento in accodamento dei dati in {self.loader.db_path}...")
+            fingerprint_index = self.loader.begin_append()
+            try:
+                with self.instrumentation.stage('aggregati'):
+                    aggregates = self.transformer.collect_aggregates(self.extractor.extract_chunks(chunksize), fingerprint_index)
+                with self.instrumentation.stage('transform_load') as stage:
+                    for chunk in self.transformer.transform_chunks(self.extractor.extract_chunks(chunksize), aggregates,
+                                                                   fingerprint_index):
+                        with self.instrumentation.stage('sqlite', rows_in=len(chunk)):
+                            self.loader.append_chunk(chunk)
+                    self.loader.commit_append()
+                    stage.rows_in = self.transformer.last_transform_stats['initial_rows']
+                    stage.rows_out = self.transformer.last_transform_stats['rows_after_validation_and_cleaning']
+            except Exception:
+                self.loader.abort_append()
+                raise
+            self.transform_stats = self.transformer.last_transform_stats
+            self.rejected_rows = self.transformer.rejected_rows
+            if self.extra_sinks:
+                with self.instrumentation.stage('load'):
+                    write_to_sinks(self.loader.read_table_chunks(), self.extra_sinks)
+        except Exception as e:
+            print(f"Errore durante l'esecuzione ETL in accodamento: {e}")
+            raise
+
     def run_reporting(self):
-        """Genera report e visualizzazioni."""
+        """
+        Genera report e visualizzazioni (saltati se già completati nell'esecuzione ripresa).
+        Con i checkpoint abilitati la fase viene segnata come completata solo se termina senza errori.
+        Returns:
+            bool: True se report e visualizzazioni sono stati generati.
+        """
+        if 'reporting' in self.resumed_stages:
+            print("Report e visualizzazioni già generati nell'esecuzione ripresa.")
+            return True
         if self.transformed_data is None or self.transform_stats is None:
             print("Dati trasformati non disponibili. Impossibile generare report e visualizzazioni.")
             print("Assicurarsi di aver eseguito run_etl() con successo.")
-            return
+            return False
 
         try:
-            self.reporter.generate_text_report(self.transformed_data, self.transform_stats)
-            self.reporter.generate_visualizations(self.transformed_data)
+            with self.instrumentation.stage('reporting', rows_in=len(self.transformed_data)):
+                if self.group_statistics is None:
+                    self.group_statistics = GroupStatistics.from_frame(self.transformed_data)
+                with self.instrumentation.stage('report_testuale'):
+                    self.reporter.generate_text_report(self.transformed_data, self.transform_stats, self.group_statistics)
+                with self.instrumentation.stage('visualizzazioni'):
+                    self.reporter.generate_visualizations(self.transformed_data, self.group_statistics)
+            self._save_checkpoint('reporting')
+            return True
         except Exception as e:
             print(f"Errore durante la generazione di report/visualizzazioni: {e}")
             # Potrebbe essere utile propagare l'eccezione
+            return False
+
+    def write_metrics(self, json_path=None, prometheus_path=None):
+        """
+        Stampa e salva le misure per fase raccolte durante l'esecuzione.
+        Args:
+            json_path (str, optional): File JSON. Default: config.METRICS_JSON_PATH (None = non scritto).
+            prometheus_path (str, optional): File per il textfile collector di Prometheus.
+                Default: config.METRICS_PROMETHEUS_PATH (None = non scritto).
+        """
+        json_path = json_path or config.METRICS_JSON_PATH
+        prometheus_path = prometheus_path or config.METRICS_PROMETHEUS_PATH
+        self.instrumentation.print_summary()
+        if json_path:
+            self.instrumentation.write_json(json_path)
+            print(f"Metriche della pipeline salvate in: {json_path}")
+        if prometheus_path:
+            self.instrumentation.write_prometheus(prometheus_path)
+            print(f"Metriche Prometheus salvate in: {prometheus_path}")
 
-    def run_full_pipeline(self):
-        """Esegue l'intera pipeline ETL con report e visualizzazioni."""
-        print("Avvio della pipeline ETL completa...")
-        self.run_etl()
-        self.run_reporting()
+    def compute_run_fingerprint(self, metadata=None):
+        """
+        Calcola l'impronta dell'esecuzione completa: contenuto dei file di input (SHA-256,
+        ricalcolato solo per i file con dimensione o data di modifica diverse da quelle
+        registrate), valori di config.RUN_FINGERPRINT_CONFIG, TRANSFORMER_VERSION e data
+        corrente (anni di servizio, bonus e anzianità dipendono dal giorno dell'esecuzione).
+        Imposta `run_fingerprint` e `input_files`.
+        Args:
+            metadata (dict, optional): Metadati del database (DataLoader.read_data_version()).
+        Returns:
+            str: Impronta esadecimale, oppure None se l'input non esiste.
+        """
+        metadata = metadata or {}
+        known_files = json.loads(metadata['file_input']) if metadata.get('file_input') else None
+        try:
+            self.input_files = input_digests(self.input_path, known_files)
+        except FileNotFoundError:
+            self.input_files = self.run_fingerprint = None
+            return None
+        payload = {
+            'input': [[label, digest] for label, _, _, _, digest in self.input_files],
+            'config': {name: getattr(config, name) for name in config.RUN_FINGERPRINT_CONFIG},
+            'versione_trasformazione': TRANSFORMER_VERSION,
+            # Un lotto accodato si aggiunge al contenuto precedente: non equivale a un caricamento
+            # completo dello stesso input (le altre modalità producono invece la stessa tabella)
+            'accodamento': self.load_mode == 'append',
+            'data': self.transformer.current_time.date().isoformat(),
+        }
+        serialized = json.dumps(payload, sort_keys=True, default=repr)
+        self.run_fingerprint = hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+        return self.run_fingerprint
+
+    def _restore_from_database(self):
+        """Rilegge i dati trasformati dalla tabella `dipendenti` (con i tipi del DataFrame trasformato)."""
+        with self.instrumentation.stage('ripristino_database') as stage:
+            self.transformed_data = restore_transformed_dtypes(pd.concat(self.loader.read_table_chunks(), ignore_index=True))
+            stage.rows_out = len(self.transformed_data)
+
+    def _skip_unchanged_run(self, reporting=True):
+        """
+        Confronta l'impronta dell'esecuzione con quella registrata nel database dall'ultima
+        esecuzione completa. Se coincidono (e `dipendenti` non è cambiata da allora) l'ETL
+        viene saltato; se mancano solo le visualizzazioni vengono rigenerate dalla tabella caricata.
+        Args:
+            reporting (bool): Se l'esecuzione comprende le visualizzazioni (False = solo ETL).
+        Returns:
+            bool: True se l'esecuzione è stata saltata (visualizzazioni eventualmente rigenerate).
+        """
+        metadata = self.loader.read_data_version()
+        fingerprint = self.compute_run_fingerprint(metadata)
+        if (fingerprint is None or metadata.get('impronta_esecuzione') != fingerprint
+                or metadata.get('versione_esecuzione') != metadata.get('versione_dati')):
+            return False
+        if json.dumps(self.input_files) != metadata.get('file_input'):
+            # Stesso contenuto con date di modifica diverse: evita di rileggere i file la prossima volta
+            self.loader.write_metadata({'file_input': json.dumps(self.input_files)})
+        sinks_rewritten = self._rewrite_stale_sinks(metadata)
+        if not reporting:
+            print("Input, configurazione e versione della trasformazione invariati rispetto all'ultima esecuzione: "
+                  "database già aggiornato, ETL saltato.")
+            if sinks_rewritten:
+                self.write_metrics()
+            return True
+        recorded_visualizations = metadata.get('visualizzazioni_esecuzione')
+        if recorded_visualizations and json.loads(recorded_visualizations) == self.reporter.current_visualization_hashes():
+            print("Input, configurazione e versione della trasformazione invariati rispetto all'ultima esecuzione: "
+                  "database e visualizzazioni già aggiornati, esecuzione saltata.")
+            if sinks_rewritten:
+                self.write_metrics()
+            return True
+        print("Input, configurazione e versione della trasformazione invariati rispetto all'ultima esecuzione: "
+              "database già aggiornato, vengono rigenerate solo le visualizzazioni.")
+        self._restore_from_database()
+        with self.instrumentation.stage('reporting', rows_in=len(self.transformed_data)):
+            with self.instrumentation.stage('aggregazione', rows_in=len(self.transformed_data)):
+                self.group_statistics = GroupStatistics.from_frame(self.transformed_data)
+            with self.instrumentation.stage('visualizzazioni'):
+                self.reporter.generate_visualizations(self.transformed_data, self.group_statistics)
+        self.loader.write_metadata({'visualizzazioni_esecuzione': json.dumps(self.reporter.current_visualization_hashes())})
+        self.write_metrics()
+        return True
+
+    def _sink_signatures(self):
+        """Firme dell'output delle destinazioni aggiuntive, per posizione e tipo (vedi DataSink.output_signature)."""
+        return {f"{position}:{type(sink).__name__}": sink.output_signature()
+                for position, sink in enumerate(self.extra_sinks)}
+
+    def _rewrite_stale_sinks(self, metadata):
+        """
+        Riscrive dalla tabella caricata le destinazioni aggiuntive il cui output manca o è
+        cambiato rispetto alle firme registrate dall'ultima esecuzione (es. dataset Parquet rimosso).
+        Args:
+            metadata (dict): Metadati del database (DataLoader.read_data_version()).
+        Returns:
+            bool: True se almeno una destinazione è stata riscritta.
+        """
+        recorded = json.loads(metadata['destinazioni_esecuzione']) if metadata.get('destinazioni_esecuzione') else {}
+        current = self._sink_signatures()
+        stale = [sink for key, sink in zip(current, self.extra_sinks)
+                 if current[key] is None or current[key] != recorded.get(key)]
+        if not stale:
+            return False
+        print(f"Output mancante o modificato per {', '.join(type(sink).__name__ for sink in stale)}: "
+              "riscritto dalla tabella caricata.")
+        with self.instrumentation.stage('load'):
+            for sink in stale:
+                with self.instrumentation.stage(type(sink).__name__):
+                    sink.write_chunks(restore_transformed_dtypes(chunk) for chunk in self.loader.read_table_chunks())
+        self.loader.write_metadata({'destinazioni_esecuzione': json.dumps(self._sink_signatures())})
+        return True
+
+    def _record_run(self, visualizations=False):
+        """
+        Registra nel database l'impronta dell'esecuzione appena caricata, con la versione dei dati
+        prodotta; con `visualizations` registra anche gli hash dei grafici generati.
+        """
+        if self.run_fingerprint is None:
+            return
+        if visualizations:
+            self.loader.write_metadata({'visualizzazioni_esecuzione': json.dumps(self.reporter.current_visualization_hashes())})
+            return
+        self.loader.write_metadata({
+            'impronta_esecuzione': self.run_fingerprint,
+            'versione_esecuzione': self.loader.read_data_version().get('versione_dati'),
+            'file_input': json.dumps(self.input_files),
+            'destinazioni_esecuzione': json.dumps(self._sink_signatures()),
+            'visualizzazioni_esecuzione': None, # Da registrare di nuovo dopo i report di questa esecuzione
+        })
+
+    def run_reporting_from_database(self):
+        """
+        Genera report e visualizzazioni dai dati già caricati nel database, senza eseguire l'ETL
+        (es. dopo un'esecuzione `--stages etl`). Le statistiche di pulizia della trasformazione non
+        sono disponibili e il report le indica come N/A.
+        Returns:
+            bool: True se report e visualizzazioni sono stati generati.
+        """
+        if not os.path.exists(self.loader.db_path):
+            print(f"Database {self.loader.db_path} non trovato. Eseguire prima la fase ETL.")
+            return False
+        self._restore_from_database()
+        self.transform_stats = {}
+        if not self.run_reporting():
+            return False
+        metadata = self.loader.read_data_version()
+        if metadata.get('impronta_esecuzione') and metadata.get('versione_esecuzione') == metadata.get('versione_dati'):
+            # Il database è quello dell'ultima esecuzione registrata: i grafici le corrispondono
+            self.loader.write_metadata({'visualizzazioni_esecuzione': json.dumps(self.reporter.current_visualization_hashes())})
+        return True
+
+    def run_full_pipeline(self, resume=False, force=False, stages='all', parallel=False, max_workers=None,
+                          load_mode='full', chunksize=None):
+        """
+        Esegue l'intera pipeline ETL con report e visualizzazioni.
+        Se input, configurazione e versione della trasformazione coincidono con l'ultima esecuzione
+        completa registrata nel database, la pipeline termina subito (vedi `compute_run_fingerprint`),
+        rigenerando al più le visualizzazioni mancanti.
+        Se tutte le fasi vengono completate i checkpoint sono eliminati; altrimenti restano
+        disponibili per riprendere l'esecuzione.
+        Args:
+            resume (bool): Se riprendere l'ultima esecuzione interrotta (vedi `run_etl`).
+            force (bool): Se eseguire la pipeline anche se input e configurazione non sono cambiati.
+            stages (str): Fasi da eseguire: 'all' (ETL, report e visualizzazioni), 'etl' (senza
+                report: matplotlib non viene importato) o 'report' (dai dati già nel database,
+                vedi `run_reporting_from_database`).
+            parallel (bool): Se trasformare su più processi (vedi `DataTransformer.transform_data_parallel`).
+            max_workers (int, optional): Numero di processi per la trasformazione parallela.
+                Default: config.PARALLEL_WORKERS o numero di CPU.
+            load_mode (str): 'full' (caricamento completo in memoria), 'out_of_core' (caricamento
+                completo a blocchi, per input più grandi della memoria), 'append' (l'input è un nuovo
+                lotto da accodare, scartando le righe già caricate da lotti precedenti) o 'incremental'
+                (solo righe nuove, modificate o eliminate). Nelle modalità diverse da 'full' report e
+                visualizzazioni riguardano l'intera tabella, riletta dal database (con 'out_of_core'
+                usare stages='etl' per restare a memoria limitata); checkpoint e trasformazione
+                parallela sono disponibili solo con 'full'.
+            chunksize (int, optional): Righe per blocco con 'out_of_core' e 'append'. Default: config.CHUNK_SIZE.
+        Raises:
+            ValueError: Se `stages` o `load_mode` non sono valori ammessi (PIPELINE_STAGES, LOAD_MODES).
+        """
+        if stages not in PIPELINE_STAGES:
+            raise ValueError(f"Fasi non valide: {stages!r}. Valori ammessi: {', '.join(PIPELINE_STAGES)}.")
+        if load_mode not in LOAD_MODES:
+            raise ValueError(f"Modalità di caricamento non valida: {load_mode!r}. Valori ammessi: {', '.join(LOAD_MODES)}.")
+        self.load_mode = load_mode
+        if load_mode != 'full' and (resume or parallel):
+            print("Checkpoint e trasformazione parallela sono disponibili solo per il caricamento completo in memoria: opzioni ignorate.")
+        if stages == 'report':
+            print("Generazione di report e visualizzazioni dal database...")
+            self.run_reporting_from_database()
+            self.write_metrics()
+            return
+        print("Avvio della pipeline ETL completa..." if stages == 'all' else "Avvio della pipeline ETL (senza report)...")
+        if force:
+            self.compute_run_fingerprint(self.loader.read_data_version())
+        elif self._skip_unchanged_run(reporting=stages == 'all'):
+            return
+        if load_mode == 'out_of_core':
+            self.run_etl_out_of_core(chunksize)
+        elif load_mode == 'append':
+            self.run_etl_append(chunksize)
+        elif load_mode == 'incremental':
+            self.run_etl_incremental()
+        else:
+            self.run_etl(parallel=parallel, max_workers=max_workers, resume=resume)
+        if self.transform_stats is not None:
+            self._record_run()
+        if stages == 'all' and load_mode != 'full' and self.transform_stats is not None:
+            # Il report riguarda l'intera tabella, non solo il lotto o il delta appena caricati
+            self._restore_from_database()
+            self.group_statistics = None
+        if stages == 'all' and self.run_reporting():
+            self._record_run(visualizations=True)
+        self.write_metrics()
+        if self.checkpoints is not None and self.checkpoints.completed('reporting' if stages == 'all' else 'load'):
+            self.checkpoints.clear()
         print("\nPipeline ETL completata.")
         print(f"I dati elaborati sono stati salvati in: {config.OUTPUT_DB_PATH}")
-        print(f"Le visualizzazioni sono state salvate in: {config.VISUALIZATIONS_DIR}")
+        for sink in self.extra_sinks:
+            if isinstance(sink, ParquetSink):
+                print(f"Il dataset Parquet è stato salvato in: {sink.output_dir}")
+        if stages == 'all':
+            print(f"Le visualizzazioni sono state salvate in: {config.VISUALIZATIONS_DIR}")
 
 def main():
     """
     Funzione principale che inizializza e avvia la pipeline ETL.
     """
+    parser = argparse.ArgumentParser(description="Pipeline ETL dei dati dei dipendenti.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Riprende l'ultima esecuzione interrotta saltando le fasi completate (checkpoint in config.CHECKPOINT_DIR).")
+    parser.add_argument('--force', action='store_true',
+                        help="Esegue la pipeline anche se input, configurazione e versione della trasformazione non sono cambiati.")
+    parser.add_argument('--stages', choices=PIPELINE_STAGES, default='all',
+                        help="Fasi da eseguire: 'etl' (senza report, es. da cron), 'report' (dai dati già nel "
+                             "database) o 'all' (default).")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--parallel', action='store_true',
+                      help="Trasforma i dati su più processi, partizionando per reparto.")
+    mode.add_argument('--out-of-core', action='store_true',
+                      help="Legge, trasforma e carica l'input a blocchi (input più grandi della memoria; "
+                           "con --stages etl anche i report non rileggono la tabella).")
+    mode.add_argument('--append', action='store_true',
+                      help="Accoda l'input come nuovo lotto, scartando le righe già caricate da lotti precedenti "
+                           "(usare --append anche per il primo lotto, così l'indice delle impronte copre tutta la tabella).")
+    mode.add_argument('--incremental', action='store_true',
+                      help="Carica solo le righe nuove o modificate ed elimina quelle non più presenti nell'input.")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help="Righe per blocco con --out-of-core e --append (default: config.CHUNK_SIZE).")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processi per --parallel (default: config.PARALLEL_WORKERS o numero di CPU).")
+    args = parser.parse_args()
+    if args.workers is not None and not args.parallel:
+        parser.error("--workers richiede --parallel.")
+    if args.chunk_size is not None and not (args.out_of_core or args.append):
+        parser.error("--chunk-size richiede --out-of-core o --append.")
+    if args.resume and (args.out_of_core or args.append or args.incremental):
+        parser.error("--resume è disponibile solo per il caricamento completo in memoria.")
+    load_mode = ('out_of_core' if args.out_of_core else 'append' if args.append
+                 else 'incremental' if args.incremental else 'full')
     pipeline = ETLPipelineOrchestrator(
         input_path=config.INPUT_CSV_PATH,
         output_db_path=config.OUTPUT_DB_PATH,
-        viz_dir=config.VISUALIZATIONS_DIR
+        viz_dir=config.VISUALIZATIONS_DIR,
+        extra_sinks=[ParquetSink(config.OUTPUT_PARQUET_DIR)],
+        checkpoint_dir=config.CHECKPOINT_DIR
     )
     try:
-        pipeline.run_full_pipeline()
+        pipeline.run_full_pipeline(resume=args.resume, force=args.force, stages=args.stages,
+                                   parallel=args.parallel, max_workers=args.workers, load_mode=load_mode,
+                                   chunksize=args.chunk_size)
         print("\nEsecuzione della pipeline terminata con successo!")
     except Exception as e:
         print(f"\nERRORE CRITICO durante l'esecuzione della pipeline: {e}")
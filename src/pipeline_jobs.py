@@ -0,0 +1,141 @@
+import itertools
+import threading
+import time
+import traceback
+
+# Fasi principali di run_full_pipeline, per stimare l'avanzamento
+FULL_PIPELINE_STAGES = ['extract', 'transform', 'aggregazione', 'load', 'reporting']
+
+class PipelineJob:
+    def __init__(self, job_id):
+        """
+        Stato di un'esecuzione della pipeline in background, aggiornato dal thread del job e
+        letto dalle sessioni della dashboard tramite `snapshot`.
+        Args:
+            job_id (int): Numero progressivo del job.
+        """
+        self.job_id = job_id
+        self.status = 'in_esecuzione' # 'in_esecuzione', 'completato' o 'fallito'
+        self.started_at = time.time()
+        self.finished_at = None
+        self.current_stage = None
+        self.stages = {} # nome completo -> {'stato', 'righe_in', 'righe_out', 'secondi'}
+        self.error = None
+        self.error_traceback = None
+        self._lock = threading.Lock()
+
+    def on_stage_event(self, event, record, handle):
+        """Listener di PipelineInstrumentation: registra inizio, fine e righe di ogni fase."""
+        with self._lock:
+            if event == 'inizio':
+                self.current_stage = record.name
+                self.stages[record.name] = {'stato': 'in_esecuzione', 'righe_in': handle.rows_in,
+                                            'righe_out': None, 'secondi': None}
+            else:
+                self.stages[record.name] = {'stato': 'completata', 'righe_in': handle.rows_in,
+                                            'righe_out': handle.rows_out, 'secondi': round(record.wall_seconds, 3)}
+                parent = record.name.rpartition('.')[0]
+                self.current_stage = parent or None
+
+    def finish(self, error=None):
+        """Segna il job come terminato, con l'eventuale eccezione che lo ha interrotto."""
+        with self._lock:
+            self.finished_at = time.time()
+            self.current_stage = None
+            if error is None:
+                self.status = 'completato'
+            else:
+                self.status = 'fallito'
+                self.error = f"{type(error).__name__}: {error}"
+                self.error_traceback = ''.join(traceback.format_exception(error))
+
+    @property
+    def running(self):
+        return self.status == 'in_esecuzione'
+
+    def progress(self):
+        """Quota delle fasi principali di FULL_PIPELINE_STAGES completate (tra 0 e 1)."""
+        with self._lock:
+            if not self.running:
+                return 1.0
+            done = sum(1 for name in FULL_PIPELINE_STAGES if self.stages.get(name, {}).get('stato') == 'completata')
+        return done / len(FULL_PIPELINE_STAGES)
+
+    def snapshot(self):
+        """
+        Copia coerente dello stato del job, da leggere senza bloccare il thread della pipeline.
+        Returns:
+            dict: job_id, stato, fase_corrente, fasi (lista di dizionari), secondi, errore.
+        """
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                'job_id': self.job_id,
+                'stato': self.status,
+                'fase_corrente': self.current_stage,
+                'fasi': [{'fase': name, **values} for name, values in self.stages.items()],
+                'secondi': round(end - self.started_at, 1),
+                'errore': self.error,
+            }
+
+class PipelineJobRunner:
+    def __init__(self, pipeline_factory, on_success=None):
+        """
+        Esegue la pipeline completa in un thread in background, al massimo una alla volta
+        (single-flight): una richiesta di avvio durante un'esecuzione restituisce il job in corso
+        invece di avviarne un secondo sullo stesso database.
+        I pool di processi creati dalla pipeline (trasformazione parallela, disegno dei grafici)
+        usano config.PROCESS_START_METHOD ('spawn' o 'forkserver'): il processo della dashboard è
+        multithread e non va duplicato con fork dal thread del job.
+        Args:
+            pipeline_factory (callable): Crea un nuovo ETLPipelineOrchestrator per ogni job.
+            on_success (callable, optional): Chiamata senza argomenti al termine di un job
+                completato (es. per svuotare le cache della dashboard).
+        """
+        self.pipeline_factory = pipeline_factory
+        self.on_success = on_success
+        self.last_job = None
+        self._lock = threading.Lock() # Tenuto per tutta la durata di un job
+        self._job_ids = itertools.count(1)
+
+    def start(self, force=False):
+        """
+        Avvia la pipeline in background se non è già in esecuzione.
+        Args:
+            force (bool): Se eseguirla anche se input e configurazione non sono cambiati
+                (vedi ETLPipelineOrchestrator.run_full_pipeline).
+        Returns:
+            PipelineJob: Il job avviato, oppure quello già in corso.
+            bool: True se il job è stato avviato da questa chiamata.
+        """
+        if not self._lock.acquire(blocking=False):
+            return self.last_job, False
+        try:
+            job = PipelineJob(next(self._job_ids))
+            self.last_job = job
+            threading.Thread(target=self._run, args=(job, force), name=f"pipeline-job-{job.job_id}", daemon=True).start()
+        except Exception:
+            self._lock.release()
+            raise
+        return job, True
+
+    def _run(self, job, force=False):
+        """Corpo del thread: esegue la pipeline e registra l'esito nel job."""
+        error = None
+        try:
+            pipeline = self.pipeline_factory()
+            pipeline.instrumentation.add_listener(job.on_stage_event)
+            pipeline.run_full_pipeline(force=force)
+            if self.on_success is not None:
+                self.on_success()
+        except Exception as e:
+            error = e
+            print(f"Errore durante l'esecuzione della pipeline in background: {e}")
+        finally:
+            job.finish(error)
+            self._lock.release()
+
+    @property
+    def running(self):
+        """True se un job è in esecuzione."""
+        return self._lock.locked()
@@ -1,7 +1,193 @@
+import hashlib
+import json
+import multiprocessing
 import os
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from src import config
+from src.aggregation import GroupStatistics
+
+# Da incrementare quando cambia il modo di disegnare i grafici, per invalidare gli hash salvati
+VISUALIZATION_VERSION = 1
+
+def content_hash(payload):
+    """
+    Hash SHA-256 dei dati da disegnare di un grafico (array NumPy, liste, numeri e stringhe).
+    Args:
+        payload (dict): Dati del grafico prodotti da `figure_payloads`.
+    Returns:
+        str: Hash esadecimale.
+    """
+    digest = hashlib.sha256(f"v{VISUALIZATION_VERSION}".encode())
+    def update(value):
+        if isinstance(value, np.ndarray):
+            digest.update(f"{value.dtype}{value.shape}".encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        elif isinstance(value, dict):
+            for key in sorted(value):
+                digest.update(repr(key).encode())
+                update(value[key])
+        elif isinstance(value, (list, tuple)):
+            digest.update(f"[{len(value)}".encode())
+            for item in value:
+                update(item)
+        else:
+            digest.update(repr(value).encode())
+    update(payload)
+    return digest.hexdigest()
+
+def _box_stats(df):
+    """
+    Statistiche del boxplot degli stipendi per reparto (quartili, baffi a 1.5 IQR come matplotlib
+    e outlier), calcolate con operazioni vettoriali: il grafico non dipende più dal numero di righe.
+    Gli outlier di ogni reparto sono limitati a config.BOXPLOT_MAX_FLIERS (campione deterministico).
+    """
+    salary = df[config.SALARY_COLUMN].astype('float64')
+    departments = df[config.DEPARTMENT_COLUMN]
+    quartiles = salary.groupby(departments, observed=True).quantile([0.25, 0.5, 0.75]).unstack()
+    iqr = quartiles[0.75] - quartiles[0.25]
+    lower_limit = (quartiles[0.25] - 1.5 * iqr).reindex(departments).to_numpy()
+    upper_limit = (quartiles[0.75] + 1.5 * iqr).reindex(departments).to_numpy()
+    inside = (salary.to_numpy() >= lower_limit) & (salary.to_numpy() <= upper_limit)
+    whiskers = salary[inside].groupby(departments[inside], observed=True).agg(['min', 'max'])
+    outliers = salary[~inside]
+    stats = []
+    for department in quartiles.index:
+        department_outliers = outliers[departments[~inside] == department]
+        if len(department_outliers) > config.BOXPLOT_MAX_FLIERS:
+            department_outliers = department_outliers.sample(config.BOXPLOT_MAX_FLIERS, random_state=0)
+        stats.append({
+            'label': str(department),
+            'q1': float(quartiles.at[department, 0.25]),
+            'med': float(quartiles.at[department, 0.5]),
+            'q3': float(quartiles.at[department, 0.75]),
+            'whislo': float(whiskers.at[department, 'min']),
+            'whishi': float(whiskers.at[department, 'max']),
+            'fliers': np.sort(department_outliers.to_numpy()),
+        })
+    return stats
+
+def _scatter_points(df):
+    """
+    Punti dello scatter plot anni di servizio/stipendio. Oltre config.SCATTER_MAX_POINTS righe
+    si disegna un campione casuale deterministico: la densità per reparto resta rappresentativa
+    e il tempo di disegno e la dimensione del PNG non crescono con i dati.
+    """
+    departments = df[config.DEPARTMENT_COLUMN].astype('category')
+    points = pd.DataFrame({
+        'x': df['anni_di_servizio'].to_numpy(dtype='float64'),
+        'y': df[config.SALARY_COLUMN].to_numpy(dtype='float64'),
+        'c': departments.cat.codes.to_numpy(),
+    })
+    if len(points) > config.SCATTER_MAX_POINTS:
+        points = points.sample(config.SCATTER_MAX_POINTS, random_state=0).sort_index()
+    return {
+        'x': points['x'].to_numpy(),
+        'y': points['y'].to_numpy(),
+        'c': points['c'].to_numpy(),
+        'categories': [str(category) for category in departments.cat.categories],
+        'total_points': len(df),
+    }
+
+def figure_payloads(df, statistics):
+    """
+    Dati aggregati necessari a ciascun grafico (piccoli rispetto al DataFrame): sono gli unici
+    inviati ai processi di disegno e quelli su cui si calcola l'hash per saltare i grafici invariati.
+    Args:
+        df (pd.DataFrame): DataFrame elaborato (per boxplot e scatter plot, che usano le singole righe).
+        statistics (GroupStatistics): Statistiche di gruppo di `df` (conteggi e medie).
+    Returns:
+        dict: Nome del file -> dati del grafico.
+    """
+    salary_bands = statistics.counts('fascia_stipendio', config.SALARY_LABELS)
+    salary_bands = salary_bands[salary_bands > 0].sort_values(ascending=False, kind='stable')
+    department_counts = statistics.counts(config.DEPARTMENT_COLUMN).sort_values(kind='stable')
+    mean_salary_by_age = statistics.rollup('fascia_eta', config.AGE_LABELS)['stipendio_medio']
+    return {
+        'stipendi_per_reparto.png': {'stats': _box_stats(df)},
+        'fasce_stipendio.png': {'labels': [str(label) for label in salary_bands.index], 'values': salary_bands.to_numpy()},
+        'dipendenti_per_reparto.png': {'labels': [str(label) for label in department_counts.index], 'values': department_counts.to_numpy()},
+        'stipendio_medio_per_eta.png': {'labels': [str(label) for label in mean_salary_by_age.index], 'values': mean_salary_by_age.to_numpy()},
+        'stipendio_vs_anzianita.png': _scatter_points(df),
+    }
+
+def render_figure(filename, payload, path):
+    """
+    Disegna e salva un grafico con l'API a oggetti di matplotlib (Figure + backend Agg, senza lo
+    stato globale di pyplot): può essere eseguita in parallelo in processi separati.
+    Args:
+        filename (str): Nome del file del grafico (chiave di `figure_payloads`).
+        payload (dict): Dati del grafico.
+        path (str): Percorso del file PNG da scrivere.
+    Returns:
+        str: Eventuale messaggio di attenzione da stampare, altrimenti None.
+    """
+    # Import differito: matplotlib si carica solo quando si disegna (non per ETL, hash o report testuale)
+    from matplotlib.figure import Figure
+    warning = None
+    if filename == 'stipendi_per_reparto.png':
+        # 1. Distribuzione degli stipendi per reparto (boxplot)
+        fig = Figure(figsize=(12, 7))
+        ax = fig.subplots()
+        ax.bxp(payload['stats'])
+        ax.grid(True)
+        ax.set_title('Distribuzione degli Stipendi per Reparto')
+        ax.set_xlabel('Reparto')
+        ax.set_ylabel('Stipendio (€)')
+        ax.tick_params(axis='x', labelrotation=45)
+        for label in ax.get_xticklabels():
+            label.set_horizontalalignment('right')
+    elif filename == 'fasce_stipendio.png':
+        # 2. Distribuzione delle fasce di stipendio (pie chart)
+        fig = Figure(figsize=(8, 8))
+        ax = fig.subplots()
+        ax.pie(payload['values'], labels=payload['labels'], autopct='%1.1f%%', startangle=90, wedgeprops={'edgecolor': 'black'})
+        ax.set_title('Distribuzione delle Fasce di Stipendio')
+    elif filename == 'dipendenti_per_reparto.png':
+        # 3. Numero di dipendenti per reparto (bar chart)
+        fig = Figure(figsize=(10, 7))
+        ax = fig.subplots()
+        ax.barh(payload['labels'], payload['values'], color='skyblue', edgecolor='black')
+        ax.set_title('Numero di Dipendenti per Reparto')
+        ax.set_xlabel('Numero di Dipendenti')
+        ax.set_ylabel('Reparto')
+    elif filename == 'stipendio_medio_per_eta.png':
+        # 4. Stipendio medio per fascia d'età (bar chart)
+        fig = Figure(figsize=(10, 7))
+        ax = fig.subplots()
+        ax.bar(payload['labels'], payload['values'], color='lightcoral', edgecolor='black')
+        ax.set_title('Stipendio Medio per Fascia d\'Età')
+        ax.set_ylabel('Stipendio Medio (€)')
+        ax.set_xlabel('Fascia d\'Età')
+        ax.tick_params(axis='x', labelrotation=45)
+        for label in ax.get_xticklabels():
+            label.set_horizontalalignment('right')
+    elif filename == 'stipendio_vs_anzianita.png':
+        # 5. Relazione tra anni di servizio e stipendio (scatter plot)
+        fig = Figure(figsize=(10, 7))
+        ax = fig.subplots()
+        scatter = ax.scatter(payload['x'], payload['y'], alpha=0.6, c=payload['c'], cmap='viridis')
+        title = 'Relazione tra Anni di Servizio e Stipendio'
+        if len(payload['x']) < payload['total_points']:
+            title += f"\n(campione di {len(payload['x']):,} su {payload['total_points']:,} dipendenti)"
+        ax.set_title(title)
+        ax.set_xlabel('Anni di Servizio')
+        ax.set_ylabel('Stipendio (€)')
+
+        # Creazione legenda per i reparti
+        handles, _ = scatter.legend_elements(prop="colors", alpha=0.6)
+        if len(handles) == len(payload['categories']): # Aggiungi legenda solo se i colori corrispondono
+            ax.legend(handles, payload['categories'], title="Reparto")
+        else:
+            warning = "Attenzione: non è stato possibile generare una legenda accurata per lo scatter plot dei reparti."
+        ax.grid(True)
+    else:
+        raise ValueError(f"Visualizzazione sconosciuta: {filename}")
+
+    fig.tight_layout()
+    fig.savefig(path)
+    return warning
 
 class ReportGenerator:
     def __init__(self, visualizations_dir):
@@ -13,17 +199,21 @@ class ReportGenerator:
         self.visualizations_dir = visualizations_dir
         os.makedirs(self.visualizations_dir, exist_ok=True)
 
-    def generate_text_report(self, df, transform_stats):
+    def generate_text_report(self, df, transform_stats, statistics=None):
         """
         Genera un report testuale sui dati elaborati.
         Args:
             df (pd.DataFrame): DataFrame elaborato.
             transform_stats (dict): Statistiche dalla fase di trasformazione.
+            statistics (GroupStatistics, optional): Statistiche di gruppo di `df` già calcolate
+                (es. dall'orchestratore); se None vengono calcolate qui.
         Returns:
             dict: Un dizionario contenente le statistiche del report.
         """
         if df is None:
             raise ValueError("Nessun dato disponibile per il report.")
+        if statistics is None:
+            statistics = GroupStatistics.from_frame(df)
         
         print("\n=== Report sui Dati Elaborati ===")
         print(f"Numero totale di dipendenti dopo trasformazione: {len(df)}")
@@ -31,127 +221,129 @@ class ReportGenerator:
         print("\n1. Statistiche di Pulizia e Imputazione Dati:")
         print(f"- Valori mancanti per stipendio (imputati): {transform_stats.get('missing_stipendio_imputed', 'N/A')}")
         print(f"- Valori mancanti per data assunzione (imputati): {transform_stats.get('missing_data_assunzione_imputed', 'N/A')}")
-        print(f"- Duplicati rimossi: {transform_stats.get('duplicati_rimossi', 'N/A')}")
+        print(f"- Duplicati rimossi: {transform_stats.get('duplicati_rimossi', 'N/A')} "
+              f"(nell'input: {transform_stats.get('duplicati_nell_esecuzione', 'N/A')}, "
+              f"tra esecuzioni: {transform_stats.get('duplicati_tra_esecuzioni', 'N/A')})")
         
         print("\n2. Statistiche per Reparto (dati trasformati):")
-        reparto_stats = df.groupby(config.DEPARTMENT_COLUMN).agg(
-            numero_dipendenti=('id', 'count'),
-            stipendio_medio=(config.SALARY_COLUMN, 'mean'),
-            stipendio_min=(config.SALARY_COLUMN, 'min'),
-            stipendio_max=(config.SALARY_COLUMN, 'max'),
-            eta_media=(config.AGE_COLUMN, 'mean'),
-            media_anni_servizio=('anni_di_servizio', 'mean'),
-            totale_bonus=('bonus', 'sum')
-        ).round(2)
+        reparto_stats = statistics.rollup(config.DEPARTMENT_COLUMN)[[
+            'numero_dipendenti', 'stipendio_medio', 'stipendio_min', 'stipendio_max',
+            'eta_media', 'media_anni_servizio', 'totale_bonus'
+        ]].round(2)
         print(reparto_stats)
         
         print("\n3. Statistiche per Fascia d'Età (dati trasformati):")
-        eta_stats = df.groupby('fascia_eta', observed=False).agg(
-            numero_dipendenti=('id', 'count'),
-            stipendio_medio=(config.SALARY_COLUMN, 'mean'),
-            stipendio_min=(config.SALARY_COLUMN, 'min'),
-            stipendio_max=(config.SALARY_COLUMN, 'max'),
-            media_anni_servizio=('anni_di_servizio', 'mean')
-        ).round(2)
+        eta_stats = statistics.rollup('fascia_eta', config.AGE_LABELS)[[
+            'numero_dipendenti', 'stipendio_medio', 'stipendio_min', 'stipendio_max', 'media_anni_servizio'
+        ]].round(2)
         print(eta_stats)
         
         print("\n4. Statistiche per Anzianità (dati trasformati):")
-        anzianita_stats = df.groupby('anzianita', observed=False).agg(
-            numero_dipendenti=('id', 'count'),
-            stipendio_medio=(config.SALARY_COLUMN, 'mean'),
-            stipendio_min=(config.SALARY_COLUMN, 'min'),
-            stipendio_max=(config.SALARY_COLUMN, 'max')
-        ).round(2)
+        anzianita_stats = statistics.rollup('anzianita', config.SENIORITY_LABELS)[[
+            'numero_dipendenti', 'stipendio_medio', 'stipendio_min', 'stipendio_max'
+        ]].round(2)
         print(anzianita_stats)
         
         print("\n5. Distribuzione Fasce di Stipendio (dati trasformati):")
-        stipendio_distribution = df['fascia_stipendio'].value_counts().sort_index()
+        stipendio_distribution = statistics.counts('fascia_stipendio', config.SALARY_LABELS)
         print(stipendio_distribution.to_string())
         
         print("\n6. Distribuzione Valutazione Stipendio (dati trasformati):")
-        valutazione_distribution = df['valutazione_stipendio'].value_counts()
+        valutazione_distribution = statistics.counts('valutazione_stipendio').sort_values(ascending=False, kind='stable')
         print(valutazione_distribution.to_string())
+
+        memory_report = transform_stats.get('memoria_per_colonna')
+        if memory_report is not None:
+            print("\n7. Memoria per Colonna (prima e dopo la compattazione):")
+            memory_kib = memory_report.assign(
+                kib_prima=(memory_report['byte_prima'] / 1024).round(1),
+                kib_dopo=(memory_report['byte_dopo'] / 1024).round(1),
+            )[['dtype_prima', 'dtype_dopo', 'kib_prima', 'kib_dopo']]
+            print(memory_kib.to_string())
+            total_before, total_after = memory_report['byte_prima'].sum(), memory_report['byte_dopo'].sum()
+            print(f"Totale: {total_before / 1024:.1f} KiB -> {total_after / 1024:.1f} KiB "
+                  f"({total_before / max(total_after, 1):.1f}x)")
         
         return {
             'reparto_stats': reparto_stats,
             'eta_stats': eta_stats,
             'anzianita_stats': anzianita_stats,
             'stipendio_distribution': stipendio_distribution,
-            'valutazione_distribution': valutazione_distribution
+            'valutazione_distribution': valutazione_distribution,
+            'memory_report': memory_report
         }
 
-    def generate_visualizations(self, df):
+    def current_visualization_hashes(self):
+        """
+        Hash dei grafici dell'ultima generazione (config.VISUALIZATION_CACHE_FILE).
+        Returns:
+            dict: Nome del file -> hash, oppure None se la cache o uno dei grafici mancano.
+        """
+        cache_path = os.path.join(self.visualizations_dir, config.VISUALIZATION_CACHE_FILE)
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                hashes = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not all(os.path.exists(os.path.join(self.visualizations_dir, filename)) for filename in hashes):
+            return None
+        return hashes
+
+    def generate_visualizations(self, df, statistics=None):
         """
         Genera visualizzazioni grafiche dai dati elaborati.
+        Per ogni grafico si calcolano prima i dati aggregati da disegnare (statistiche dei boxplot,
+        conteggi, medie, punti campionati dello scatter plot): se il loro hash coincide con quello
+        della generazione precedente e il file esiste, il grafico non viene ridisegnato. I grafici
+        da aggiornare sono disegnati nello stesso processo (backend Agg, API a oggetti) oppure, da
+        config.VISUALIZATION_PARALLEL_MIN_ROWS righe in su, in processi separati avviati con
+        config.PROCESS_START_METHOD.
         Args:
             df (pd.DataFrame): DataFrame elaborato.
+            statistics (GroupStatistics, optional): Statistiche di gruppo di `df` già calcolate;
+                se None vengono calcolate qui.
+        Returns:
+            dict: Nome del file -> True se il grafico è stato ridisegnato, False se invariato.
         """
         if df is None:
             raise ValueError("Nessun dato disponibile per le visualizzazioni.")
+        if statistics is None:
+            statistics = GroupStatistics.from_frame(df)
         
         print(f"\nGenerazione delle visualizzazioni in {self.visualizations_dir}...")
 
-        # 1. Distribuzione degli stipendi per reparto (boxplot)
-        plt.figure(figsize=(12, 7))
-        df.boxplot(column=config.SALARY_COLUMN, by=config.DEPARTMENT_COLUMN, grid=True)
-        plt.title('Distribuzione degli Stipendi per Reparto')
-        plt.suptitle('') 
-        plt.xlabel('Reparto')
-        plt.ylabel('Stipendio (€)')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, 'stipendi_per_reparto.png'))
-        plt.close()
-        
-        # 2. Distribuzione delle fasce di stipendio (pie chart)
-        plt.figure(figsize=(8, 8))
-        df['fascia_stipendio'].value_counts().plot.pie(autopct='%1.1f%%', startangle=90, wedgeprops={'edgecolor': 'black'})
-        plt.title('Distribuzione delle Fasce di Stipendio')
-        plt.ylabel('') 
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, 'fasce_stipendio.png'))
-        plt.close()
+        cache_path = os.path.join(self.visualizations_dir, config.VISUALIZATION_CACHE_FILE)
+        previous_hashes = {}
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding='utf-8') as f:
+                previous_hashes = json.load(f)
         
-        # 3. Numero di dipendenti per reparto (bar chart)
-        plt.figure(figsize=(10, 7))
-        df[config.DEPARTMENT_COLUMN].value_counts().sort_values().plot.barh(color='skyblue', edgecolor='black')
-        plt.title('Numero di Dipendenti per Reparto')
-        plt.xlabel('Numero di Dipendenti')
-        plt.ylabel('Reparto')
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, 'dipendenti_per_reparto.png'))
-        plt.close()
+        figures = figure_payloads(df, statistics)
+        hashes = {filename: content_hash(payload) for filename, payload in figures.items()}
+        to_render = [
+            filename for filename in figures
+            if previous_hashes.get(filename) != hashes[filename]
+            or not os.path.exists(os.path.join(self.visualizations_dir, filename))
+        ]
+        paths = [os.path.join(self.visualizations_dir, filename) for filename in to_render]
+        payloads = [figures[filename] for filename in to_render]
         
-        # 4. Stipendio medio per fascia d'età (bar chart)
-        plt.figure(figsize=(10, 7))
-        df.groupby('fascia_eta', observed=False)[config.SALARY_COLUMN].mean().plot.bar(color='lightcoral', edgecolor='black')
-        plt.title('Stipendio Medio per Fascia d\'Età')
-        plt.ylabel('Stipendio Medio (€)')
-        plt.xlabel('Fascia d\'Età')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, 'stipendio_medio_per_eta.png'))
-        plt.close()
-        
-        # 5. Relazione tra anni di servizio e stipendio (scatter plot)
-        plt.figure(figsize=(10, 7))
-        scatter = plt.scatter(df['anni_di_servizio'], df[config.SALARY_COLUMN], 
-                              alpha=0.6, c=df[config.DEPARTMENT_COLUMN].astype('category').cat.codes, cmap='viridis')
-        plt.title('Relazione tra Anni di Servizio e Stipendio')
-        plt.xlabel('Anni di Servizio')
-        plt.ylabel('Stipendio (€)')
-        
-        # Creazione legenda per i reparti
-        handles, _ = scatter.legend_elements(prop="colors", alpha=0.6)
-        department_categories = df[config.DEPARTMENT_COLUMN].astype('category').cat.categories
-        if len(handles) == len(department_categories): # Aggiungi legenda solo se i colori corrispondono
-             plt.legend(handles, department_categories, title="Reparto")
+        max_workers = min(len(to_render), config.VISUALIZATION_WORKERS or os.cpu_count() or 1)
+        if max_workers > 1 and len(df) >= config.VISUALIZATION_PARALLEL_MIN_ROWS:
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     mp_context=multiprocessing.get_context(config.PROCESS_START_METHOD)) as executor:
+                warnings = list(executor.map(render_figure, to_render, payloads, paths))
         else:
-            print("Attenzione: non è stato possibile generare una legenda accurata per lo scatter plot dei reparti.")
-
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, 'stipendio_vs_anzianita.png'))
-        plt.close()
+            warnings = [render_figure(filename, payload, path) for filename, payload, path in zip(to_render, payloads, paths)]
+        for warning in warnings:
+            if warning:
+                print(warning)
+        
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(hashes, f, indent=2)
         
-        print(f"Visualizzazioni salvate con successo.")
\ No newline at end of file
+        skipped = len(figures) - len(to_render)
+        if skipped:
+            print(f"{skipped} visualizzazioni invariate rispetto all'ultima generazione, non ridisegnate.")
+        print(f"Visualizzazioni salvate con successo.")
+        return {filename: filename in to_render for filename in figures}
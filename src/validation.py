@@ -0,0 +1,117 @@
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+
+REASON_DUPLICATE = 'duplicato'
+
+def valid_string_mask(series):
+    """
+    Maschera delle stringhe valide (non mancanti, non vuote, non di soli spazi), in un'unica
+    passata vettoriale sul dtype stringa. Colonne non testuali sono considerate non valide.
+    Args:
+        series (pd.Series): Colonna da validare.
+    Returns:
+        pd.Series: Maschera booleana, True per i valori validi.
+    """
+    if not (series.dtype == object or pd.api.types.is_string_dtype(series)
+            or isinstance(series.dtype, pd.CategoricalDtype)):
+        return pd.Series(False, index=series.index)
+    # Per le colonne object i valori non stringa producono NaN, che non supera i confronti
+    return series.str.len().gt(0) & series.str.isspace().eq(False)
+
+class ValidationRule(ABC):
+    def __init__(self, reason, stat_key, column):
+        """
+        Regola di validazione su una colonna: le righe per cui `invalid_mask` è True vengono scartate.
+        Args:
+            reason (str): Codice del motivo di scarto (colonna `motivo_scarto` delle righe scartate).
+            stat_key (str): Chiave del contatore in `transform_stats`.
+            column (str): Colonna su cui si applica la regola.
+        """
+        self.reason = reason
+        self.stat_key = stat_key
+        self.column = column
+
+    @abstractmethod
+    def invalid_mask(self, series):
+        """Restituisce la maschera delle righe non valide."""
+
+class RangeRule(ValidationRule):
+    def __init__(self, reason, stat_key, column, min_value, max_value):
+        """
+        Scarta i valori mancanti o fuori dall'intervallo [min_value, max_value].
+        """
+        super().__init__(reason, stat_key, column)
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def invalid_mask(self, series):
+        return (series < self.min_value) | (series > self.max_value) | series.isna()
+
+class NonEmptyStringRule(ValidationRule):
+    def invalid_mask(self, series):
+        """Scarta valori non stringa, stringhe vuote o stringhe di soli spazi."""
+        return ~valid_string_mask(series)
+
+class ValidationStage:
+    def __init__(self, rules):
+        """
+        Fase di validazione componibile: valuta tutte le regole sullo stesso DataFrame,
+        costruisce un'unica maschera di scarto e materializza le righe valide una sola volta.
+        Ogni riga scartata è attribuita alla prima regola (in ordine) che la rifiuta.
+        Args:
+            rules (list): Lista di ValidationRule, nell'ordine di applicazione.
+        """
+        self.rules = list(rules)
+
+    def evaluate(self, df):
+        """
+        Valuta le regole e calcola per ogni riga il codice del motivo di scarto.
+        I duplicati si marcano poi con `mark_duplicates`.
+        Args:
+            df (pd.DataFrame): Dati da validare.
+        Returns:
+            np.ndarray: Codici per riga (0 = valida, i = regola i-esima).
+            dict: Righe scartate per regola (chiave `stat_key`).
+            list: Colonne richieste dalle regole ma assenti nel DataFrame.
+        """
+        reason_codes = np.zeros(len(df), dtype=np.int8)
+        counters = {}
+        missing_columns = []
+        for code, rule in enumerate(self.rules, start=1):
+            if rule.column not in df.columns:
+                missing_columns.append(rule.column)
+                counters[rule.stat_key] = 0
+                continue
+            newly_rejected = rule.invalid_mask(df[rule.column]).to_numpy(dtype=bool) & (reason_codes == 0)
+            reason_codes[newly_rejected] = code
+            counters[rule.stat_key] = int(newly_rejected.sum())
+        return reason_codes, counters, missing_columns
+
+    def mark_duplicates(self, df, reason_codes, deduplicate_on):
+        """
+        Marca come duplicate (codice len(rules) + 1) le righe valide già viste, mantenendo la prima occorrenza.
+        Args:
+            df (pd.DataFrame): Dati validati con `evaluate`.
+            reason_codes (np.ndarray): Codici prodotti da `evaluate` (modificati sul posto).
+            deduplicate_on (list): Colonne per il confronto dei duplicati.
+        Returns:
+            int: Numero di righe marcate come duplicate.
+        """
+        # Tutte le colonne usate dalle regole fanno parte di quelle dei duplicati, quindi righe
+        # identiche hanno lo stesso esito: `duplicated` sull'intero frame equivale a cercare
+        # i duplicati tra le sole righe valide, senza materializzarle.
+        duplicate_mask = df.duplicated(subset=deduplicate_on).to_numpy() & (reason_codes == 0)
+        reason_codes[duplicate_mask] = len(self.rules) + 1
+        return int(duplicate_mask.sum())
+
+    def reason_labels(self, reason_codes):
+        """
+        Converte i codici numerici in etichette dei motivi di scarto.
+        Args:
+            reason_codes (np.ndarray): Codici prodotti da `evaluate` (solo righe scartate).
+        Returns:
+            pd.Categorical: Motivo di scarto per riga.
+        """
+        categories = [rule.reason for rule in self.rules] + [REASON_DUPLICATE]
+        return pd.Categorical.from_codes(np.asarray(reason_codes, dtype=np.int64) - 1, categories=categories)
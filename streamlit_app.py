@@ -1,11 +1,10 @@
 import streamlit as st
-import pandas as pd
 import sqlite3
-import matplotlib.pyplot as plt
 import os
 
 from src import config
-from src.main_pipeline import ETLPipelineOrchestrator 
+from src.db_pool import ReadOnlyConnectionPool, read_metadata
+from src.pipeline_jobs import PipelineJobRunner
 
 # --- Configurazione Globale ---
 DB_PATH = config.OUTPUT_DB_PATH # Percorso al database SQLite
@@ -13,16 +12,64 @@ DB_PATH = config.OUTPUT_DB_PATH # Percorso al database SQLite
 db_exists = os.path.exists(DB_PATH)
 
 # --- Funzioni Helper ---
-@st.cache_data # Ottimo per memorizzare nella cache i dati caricati
-def load_data_from_db(query, db_path=DB_PATH):
-    """ Carica dati dal database SQLite. """
+@st.cache_resource # Un solo pool per processo, condiviso da tutte le sessioni
+def get_connection_pool(db_path=DB_PATH):
+    """ Pool di connessioni in sola lettura al database (aperte una volta e riutilizzate). """
+    return ReadOnlyConnectionPool(db_path)
+
+def get_data_version(db_path=DB_PATH):
+    """
+    Versione dei dati del database, letta a ogni esecuzione dello script (una riga dei metadati).
+    È parte della chiave di cache dei risultati: cambia solo quando un caricamento modifica i dati,
+    quindi i risultati in cache restano validi finché i dati non cambiano davvero.
+    """
+    if not os.path.exists(db_path):
+        return None
+    with get_connection_pool(db_path).connection() as conn:
+        fingerprint = read_metadata(conn).get('impronta_dati')
+    if fingerprint:
+        return fingerprint
+    # Database senza metadati (creato da una versione precedente): data di modifica e dimensione dei file
+    return ':'.join(f"{stat.st_mtime_ns}-{stat.st_size}" for stat in
+                    (os.stat(path) for path in (db_path, f"{db_path}-wal") if os.path.exists(path)))
+
+# Ottimo per memorizzare nella cache i dati caricati; numero e durata dei risultati limitati
+@st.cache_data(max_entries=config.DASHBOARD_CACHE_MAX_ENTRIES, ttl=config.DASHBOARD_CACHE_TTL_SECONDS)
+def load_data_from_db(query, data_version=None, db_path=DB_PATH):
+    """ Carica dati dal database SQLite (`data_version` serve solo come chiave di cache). """
+    # Import differito: pandas si carica solo quando una pagina legge dati dal database
+    import pandas as pd
     if not os.path.exists(db_path):
         st.warning(f"Database {db_path} non trovato. Eseguire prima la pipeline ETL.")
         return pd.DataFrame()
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    # Connessione in sola lettura del pool: in modalità WAL non blocca né attende i caricamenti in corso
+    with get_connection_pool(db_path).connection() as conn:
+        return pd.read_sql_query(query, conn)
+
+@st.cache_data(max_entries=config.DASHBOARD_CACHE_MAX_ENTRIES, ttl=config.DASHBOARD_CACHE_TTL_SECONDS)
+def query_dashboard(query_name, *args, data_version=None, db_path=DB_PATH):
+    """ Esegue una query di src.dashboard_queries: aggregazioni e paginazione avvengono in SQLite e il risultato è piccolo. """
+    if not os.path.exists(db_path):
+        st.warning(f"Database {db_path} non trovato. Eseguire prima la pipeline ETL.")
+        return None
+    with get_connection_pool(db_path).connection() as conn:
+        from src import dashboard_queries # Import differito (pandas, NumPy)
+        return getattr(dashboard_queries, query_name)(conn, *args)
+
+def create_pipeline():
+    """ Crea l'orchestratore della pipeline completa eseguita dalla dashboard. """
+    # Import differito: l'orchestratore (e le sue dipendenze) si carica solo quando si avvia la pipeline
+    from src.main_pipeline import ETLPipelineOrchestrator
+    return ETLPipelineOrchestrator(
+        input_path=config.INPUT_CSV_PATH,
+        output_db_path=config.OUTPUT_DB_PATH,
+        viz_dir=config.VISUALIZATIONS_DIR
+    )
+
+@st.cache_resource # Un solo esecutore per processo: al massimo una pipeline alla volta per tutte le sessioni
+def get_pipeline_runner():
+    """ Esecutore in background della pipeline (i risultati in cache sono legati alla versione dei dati). """
+    return PipelineJobRunner(create_pipeline)
 
 # --- Layout dell'App Streamlit ---
 st.set_page_config(layout="wide") # Usa l'intera larghezza della pagina
@@ -33,31 +80,51 @@ st.markdown("Visualizza i risultati della pipeline ETL ed esegui nuovamente l'el
 st.sidebar.title("Opzioni")
 
 st.sidebar.header("Esegui Pipeline")
-if st.sidebar.button("▶️ Avvia Pipeline ETL Completa"):
-    try:
-        with st.spinner("Esecuzione della pipeline ETL in corso... Questo potrebbe richiedere del tempo."):
-            pipeline = ETLPipelineOrchestrator(
-                input_path=config.INPUT_CSV_PATH,
-                output_db_path=config.OUTPUT_DB_PATH,
-                viz_dir=config.VISUALIZATIONS_DIR
-            )
-            pipeline.run_full_pipeline() # Questo metodo orchestra extract, transform, load, e reporting
-        st.sidebar.success("Pipeline ETL completata con successo!")
-        st.sidebar.info(f"Database aggiornato: {config.OUTPUT_DB_PATH}")
-        st.sidebar.info(f"Visualizzazioni (file) salvate in: {config.VISUALIZATIONS_DIR}")
-        st.balloons()
-        # Pulisci la cache per ricaricare i dati aggiornati
-        st.cache_data.clear()
-        # Aggiorna lo stato dell'esistenza del DB
-        global db_exists
-        db_exists = os.path.exists(DB_PATH)
-        # Ricarica la pagina per riflettere i nuovi dati
-        st.rerun() 
-    except FileNotFoundError as fnf_error:
-        st.sidebar.error(f"Errore File Non Trovato: {fnf_error}. Verifica il percorso del file input.csv in data/ e in config.py.")
-    except Exception as e:
-        st.sidebar.error(f"Errore critico durante l'esecuzione della pipeline ETL:")
-        st.sidebar.exception(e) # Mostra i dettagli dell'eccezione
+pipeline_runner = get_pipeline_runner()
+# La pipeline gira in un thread in background: la dashboard resta utilizzabile durante l'esecuzione
+force_run = st.sidebar.checkbox("Forza la rielaborazione", help="Esegue la pipeline anche se input e configurazione non sono cambiati dall'ultima esecuzione.")
+if st.sidebar.button("▶️ Avvia Pipeline ETL Completa", disabled=pipeline_runner.running):
+    job, started = pipeline_runner.start(force=force_run)
+    if not started:
+        st.sidebar.warning(f"La pipeline è già in esecuzione (job {job.job_id}, avviato da un'altra sessione).")
+
+def show_pipeline_job():
+    """ Mostra avanzamento e righe per fase dell'ultimo job; al termine ricarica la pagina con i nuovi dati. """
+    job = pipeline_runner.last_job
+    if job is None:
+        return
+    snapshot = job.snapshot()
+    # Un job già terminato all'apertura della sessione non provoca un nuovo caricamento della pagina
+    st.session_state.setdefault('ultimo_job_terminato', None if job.running else job.job_id)
+    if snapshot['stato'] == 'in_esecuzione':
+        current_stage = snapshot['fase_corrente'] or 'avvio'
+        st.progress(job.progress(), text=f"Pipeline in esecuzione (job {snapshot['job_id']}): {current_stage}, {snapshot['secondi']}s")
+    elif st.session_state['ultimo_job_terminato'] != snapshot['job_id']:
+        st.session_state['ultimo_job_terminato'] = snapshot['job_id']
+        st.session_state['festeggia'] = snapshot['stato'] == 'completato'
+        st.rerun() # Ricarica l'intera pagina: il database esiste o è stato aggiornato
+    elif snapshot['stato'] == 'completato' and not snapshot['fasi']:
+        st.success("Input, configurazione e versione della trasformazione invariati: database e visualizzazioni già aggiornati.")
+    elif snapshot['stato'] == 'completato':
+        st.success(f"Pipeline ETL completata con successo in {snapshot['secondi']}s!")
+        st.info(f"Database aggiornato: {config.OUTPUT_DB_PATH}")
+        st.info(f"Visualizzazioni (file) salvate in: {config.VISUALIZATIONS_DIR}")
+    elif snapshot['errore'] and snapshot['errore'].startswith('FileNotFoundError'):
+        st.error(f"Errore File Non Trovato: {snapshot['errore']}. Verifica il percorso del file input.csv in data/ e in config.py.")
+    else:
+        st.error(f"Errore critico durante l'esecuzione della pipeline ETL: {snapshot['errore']}")
+        with st.expander("Dettagli dell'errore"):
+            st.code(job.error_traceback)
+    if snapshot['fasi']:
+        with st.expander("Fasi della pipeline", expanded=snapshot['stato'] == 'in_esecuzione'):
+            import pandas as pd
+            st.dataframe(pd.DataFrame(snapshot['fasi']).astype({'righe_in': 'Int64', 'righe_out': 'Int64'}), hide_index=True)
+
+# Aggiornamento periodico del solo riquadro di stato mentre la pipeline è in esecuzione
+with st.sidebar:
+    st.fragment(show_pipeline_job, run_every=config.DASHBOARD_JOB_POLL_SECONDS if pipeline_runner.running else None)()
+if st.session_state.pop('festeggia', False):
+    st.balloons()
 
 st.sidebar.markdown("---")
 st.sidebar.header("Sezioni Report")
@@ -77,52 +144,63 @@ else:
     choice = None # Nessuna scelta se il DB non esiste
 
 # --- Contenuto Principale Basato sulla Scelta ---
+data_version = get_data_version() if db_exists else None
 
 if choice == "Panoramica Generale":
     st.header("📊 Panoramica Generale dei Dipendenti")
-    df_dipendenti = load_data_from_db("SELECT * FROM dipendenti")
-    if not df_dipendenti.empty:
-        st.write(f"Numero totale di dipendenti nel database: **{len(df_dipendenti)}**")
-        st.write("Primi record della tabella `dipendenti`:")
-        st.dataframe(df_dipendenti.head(), height=300)
+    total_rows = query_dashboard('count_rows', data_version=data_version)
+    if total_rows:
+        st.write(f"Numero totale di dipendenti nel database: **{total_rows}**")
+        st.write("Record della tabella `dipendenti`:")
+        # Solo la pagina richiesta viene letta dal database (LIMIT/OFFSET)
+        page_col, size_col = st.columns(2)
+        with size_col:
+            page_size = st.selectbox("Righe per pagina", config.DASHBOARD_PAGE_SIZES)
+        with page_col:
+            num_pages = -(-total_rows // page_size)
+            page = st.number_input(f"Pagina (di {num_pages})", min_value=1, max_value=num_pages, value=1, step=1)
+        st.dataframe(query_dashboard('read_page', int(page), page_size, data_version=data_version), height=300)
         
         col1, col2 = st.columns(2)
         with col1:
             st.subheader("Conteggio Dipendenti per Reparto")
-            if config.DEPARTMENT_COLUMN in df_dipendenti.columns:
-                counts_reparto = df_dipendenti[config.DEPARTMENT_COLUMN].value_counts()
-                st.bar_chart(counts_reparto)
+            counts_reparto = load_data_from_db(f"SELECT {config.DEPARTMENT_COLUMN}, numero_dipendenti FROM analisi_per_reparto ORDER BY {config.DEPARTMENT_COLUMN}", data_version)
+            if not counts_reparto.empty:
+                st.bar_chart(counts_reparto.set_index(config.DEPARTMENT_COLUMN)['numero_dipendenti'])
             else:
-                st.warning(f"Colonna '{config.DEPARTMENT_COLUMN}' non trovata.")
+                st.warning("Tabella 'analisi_per_reparto' vuota o non trovata.")
         
         with col2:
             st.subheader("Conteggio Dipendenti per Fascia d'Età")
-            if 'fascia_eta' in df_dipendenti.columns:
-                counts_eta = df_dipendenti['fascia_eta'].value_counts().sort_index()
-                st.bar_chart(counts_eta)
+            counts_eta = load_data_from_db("SELECT fascia_eta, numero_dipendenti FROM analisi_per_fascia_eta ORDER BY fascia_eta", data_version)
+            if not counts_eta.empty:
+                st.bar_chart(counts_eta.set_index('fascia_eta')['numero_dipendenti'])
             else:
-                st.warning("Colonna 'fascia_eta' non trovata.")
+                st.warning("Tabella 'analisi_per_fascia_eta' vuota o non trovata.")
     else:
         st.info("Nessun dato sui dipendenti trovato. Esegui la pipeline.")
 
 
 elif choice == "Analisi per Reparto":
     st.header("🏢 Analisi per Reparto")
-    # Dati dalla vista analisi_per_reparto
-    df_reparto_stats = load_data_from_db("SELECT reparto, numero_dipendenti, stipendio_medio, stipendio_min, stipendio_max, media_anni_servizio, totale_bonus FROM analisi_per_reparto")
+    # Dati dalla tabella di riepilogo analisi_per_reparto
+    df_reparto_stats = load_data_from_db("SELECT reparto, numero_dipendenti, stipendio_medio, stipendio_min, stipendio_max, media_anni_servizio, totale_bonus FROM analisi_per_reparto ORDER BY reparto", data_version)
     if not df_reparto_stats.empty:
         st.subheader("Statistiche Aggregate per Reparto")
         st.dataframe(df_reparto_stats)
 
         st.subheader("Distribuzione Stipendi per Reparto (Boxplot)")
-        df_dipendenti_sal_dept = load_data_from_db(f"SELECT {config.SALARY_COLUMN}, {config.DEPARTMENT_COLUMN} FROM dipendenti")
-        if not df_dipendenti_sal_dept.empty and config.SALARY_COLUMN in df_dipendenti_sal_dept.columns and config.DEPARTMENT_COLUMN in df_dipendenti_sal_dept.columns:
+        # Quartili, baffi e un campione degli outlier calcolati in SQLite: non si leggono tutti gli stipendi
+        box_stats = query_dashboard('salary_box_stats', data_version=data_version)
+        if box_stats:
+            # Import differito: matplotlib si carica solo nelle pagine che disegnano grafici
+            import matplotlib.pyplot as plt
             fig, ax = plt.subplots(figsize=(12, 7))
-            df_dipendenti_sal_dept.boxplot(column=config.SALARY_COLUMN, by=config.DEPARTMENT_COLUMN, ax=ax, grid=True)
+            ax.bxp(box_stats)
             ax.set_title('Distribuzione degli Stipendi per Reparto')
-            plt.suptitle('') # Rimuove il titolo automatico di pandas
             ax.set_xlabel('Reparto')
             ax.set_ylabel('Stipendio (€)')
+            ax.grid(True)
             plt.xticks(rotation=45, ha='right')
             plt.tight_layout()
             st.pyplot(fig)
@@ -133,8 +211,8 @@ elif choice == "Analisi per Reparto":
 
 elif choice == "Analisi per Fascia d'Età":
     st.header("🎂 Analisi per Fascia d'Età")
-    # Dati dalla vista analisi_per_fascia_eta
-    df_eta_stats = load_data_from_db("SELECT fascia_eta, numero_dipendenti, stipendio_medio, stipendio_min, stipendio_max, media_anni_servizio FROM analisi_per_fascia_eta")
+    # Dati dalla tabella di riepilogo analisi_per_fascia_eta
+    df_eta_stats = load_data_from_db("SELECT fascia_eta, numero_dipendenti, stipendio_medio, stipendio_min, stipendio_max, media_anni_servizio FROM analisi_per_fascia_eta ORDER BY fascia_eta", data_version)
     if not df_eta_stats.empty:
         st.subheader("Statistiche Aggregate per Fascia d'Età")
         st.dataframe(df_eta_stats)
@@ -151,15 +229,20 @@ elif choice == "Analisi per Fascia d'Età":
 
 elif choice == "Analisi per Anzianità":
     st.header("📈 Analisi per Anzianità")
-    # Dati dalla vista analisi_per_anzianita
-    df_anzianita_stats = load_data_from_db("SELECT anzianita, numero_dipendenti, stipendio_medio, stipendio_min, stipendio_max FROM analisi_per_anzianita")
+    # Dati dalla tabella di riepilogo analisi_per_anzianita
+    df_anzianita_stats = load_data_from_db("SELECT anzianita, numero_dipendenti, stipendio_medio, stipendio_min, stipendio_max FROM analisi_per_anzianita ORDER BY anzianita", data_version)
     if not df_anzianita_stats.empty:
         st.subheader("Statistiche Aggregate per Anzianità")
         st.dataframe(df_anzianita_stats)
 
         st.subheader("Relazione tra Anni di Servizio e Stipendio (Scatter Plot)")
-        df_dipendenti_full = load_data_from_db(f"SELECT anni_di_servizio, {config.SALARY_COLUMN}, {config.DEPARTMENT_COLUMN} FROM dipendenti")
-        if not df_dipendenti_full.empty and 'anni_di_servizio' in df_dipendenti_full.columns and config.SALARY_COLUMN in df_dipendenti_full.columns:
+        # Oltre config.SCATTER_MAX_POINTS righe si legge un campione deterministico scelto in SQL
+        sample = query_dashboard('scatter_sample', data_version=data_version)
+        df_dipendenti_full, total_points = sample if sample is not None else (None, 0)
+        if df_dipendenti_full is not None and not df_dipendenti_full.empty and 'anni_di_servizio' in df_dipendenti_full.columns and config.SALARY_COLUMN in df_dipendenti_full.columns:
+            if total_points > len(df_dipendenti_full):
+                st.caption(f"Campione di {len(df_dipendenti_full)} dipendenti su {total_points}.")
+            import matplotlib.pyplot as plt
             fig, ax = plt.subplots(figsize=(10, 7))
             if config.DEPARTMENT_COLUMN in df_dipendenti_full.columns:
                 # Crea colori per reparto
@@ -188,15 +271,17 @@ elif choice == "Analisi per Anzianità":
 
 elif choice == "Distribuzione Stipendi":
     st.header("💰 Distribuzione delle Fasce di Stipendio")
-    df_dipendenti = load_data_from_db(f"SELECT fascia_stipendio, {config.SALARY_COLUMN} FROM dipendenti") # definisce fascia_stipendio
-    if not df_dipendenti.empty and 'fascia_stipendio' in df_dipendenti.columns:
+    # Conteggi (GROUP BY) e istogramma calcolati in SQLite
+    df_fasce = query_dashboard('group_counts', 'fascia_stipendio', data_version=data_version)
+    if df_fasce is not None and not df_fasce.empty:
+        import matplotlib.pyplot as plt
         st.subheader("Conteggio per Fascia di Stipendio (Tabella)")
-        stipendio_distribution_table = df_dipendenti['fascia_stipendio'].value_counts().reset_index()
+        stipendio_distribution_table = df_fasce.copy()
         stipendio_distribution_table.columns = ['Fascia Stipendio', 'Numero Dipendenti']
         st.table(stipendio_distribution_table)
 
         st.subheader("Distribuzione delle Fasce di Stipendio (Grafico a Torta)")
-        fasce_stipendio_counts = df_dipendenti['fascia_stipendio'].value_counts()
+        fasce_stipendio_counts = df_fasce.set_index('fascia_stipendio')['numero_dipendenti']
         if not fasce_stipendio_counts.empty:
             fig, ax = plt.subplots(figsize=(8,8))
             fasce_stipendio_counts.plot.pie(autopct='%1.1f%%', ax=ax, startangle=90, wedgeprops={'edgecolor': 'black'})
@@ -207,16 +292,18 @@ elif choice == "Distribuzione Stipendi":
             st.warning("Nessun dato per le fasce di stipendio.")
             
         st.subheader(f"Istogramma della Distribuzione degli Stipendi ({config.SALARY_COLUMN})")
-        if config.SALARY_COLUMN in df_dipendenti.columns:
+        bin_edges, bin_counts = query_dashboard('salary_histogram', 20, data_version=data_version)
+        if bin_edges is not None:
             fig, ax = plt.subplots(figsize=(10,6))
-            ax.hist(df_dipendenti[config.SALARY_COLUMN].dropna(), bins=20, edgecolor='black', color='mediumseagreen')
+            # Intervalli già contati: ogni barra è pesata con il suo conteggio
+            ax.hist(bin_edges[:-1], bins=bin_edges, weights=bin_counts, edgecolor='black', color='mediumseagreen')
             ax.set_title('Distribuzione degli Stipendi')
             ax.set_xlabel('Stipendio (€)')
             ax.set_ylabel('Frequenza')
             plt.tight_layout()
             st.pyplot(fig)
         else:
-            st.warning(f"Colonna '{config.SALARY_COLUMN}' non trovata per l'istogramma.")
+            st.warning(f"Nessun valore di '{config.SALARY_COLUMN}' per l'istogramma.")
 
     else:
         st.info("Nessun dato sulla distribuzione degli stipendi. Esegui la pipeline.")
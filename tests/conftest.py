@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import config
+from src.main_pipeline import ETLPipelineOrchestrator
+
+# Data fissa per le trasformazioni confrontate tra loro (anni di servizio, bonus, date future)
+NOW = pd.Timestamp('2025-06-30 12:00:00')
+
+def make_dirty_frame(rows=240, seed=7):
+    """
+    Input piccolo con i casi sporchi gestiti dalla trasformazione: età non numeriche o fuori
+    intervallo, stipendi mancanti o negativi, date future, non valide o mancanti, reparti e
+    cognomi mancanti, un reparto senza stipendi osservati e duplicati con id diversi.
+    """
+    rng = np.random.default_rng(seed)
+    hire_dates = pd.Timestamp('2024-01-01') - pd.to_timedelta(rng.integers(0, 20 * 365, size=rows), unit='D')
+    df = pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'nome': rng.choice(['Mario', 'Laura', 'Giuseppe', 'Anna', 'Marco', 'Giulia'], size=rows),
+        'cognome': rng.choice(['Rossi', 'Bianchi', 'Verdi', 'Neri', 'Russo'], size=rows).astype(object),
+        'eta': rng.integers(20, 64, size=rows).astype(str).astype(object),
+        'stipendio': np.round(rng.uniform(25000, 80000, size=rows), 2),
+        'data_assunzione': hire_dates.strftime('%Y-%m-%d').astype(object),
+        'reparto': rng.choice(['Vendite', 'Marketing', 'Sviluppo', 'Risorse Umane', 'Amministrazione'],
+                              size=rows).astype(object),
+    })
+    df.loc[0:4, 'eta'] = 'abc'
+    df.loc[5:7, 'eta'] = '12'
+    df.loc[8:15, 'stipendio'] = np.nan
+    df.loc[16:19, 'stipendio'] = -1000.0
+    df.loc[20:22, 'data_assunzione'] = '2099-01-01'
+    df.loc[23:26, 'data_assunzione'] = 'notadate'
+    df.loc[27:29, 'data_assunzione'] = None
+    df.loc[30:31, 'reparto'] = None
+    df.loc[32:33, 'cognome'] = None
+    df.loc[35:39, ['reparto', 'stipendio']] = ['Legale', np.nan]
+    duplicates = df.iloc[40:80].assign(id=np.arange(rows + 1, rows + 41))
+    return pd.concat([df, duplicates], ignore_index=True)
+
+def normalize(df):
+    """Tipi comparabili tra le modalità (categorie e stringhe come testo, numeri come float arrotondati)."""
+    normalized = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(series):
+            normalized[col] = series.astype(object).where(series.notna(), None).astype(str)
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            normalized[col] = series.dt.as_unit('ns')
+        elif pd.api.types.is_numeric_dtype(series) and col != 'id':
+            normalized[col] = series.astype('float64').round(6)
+        else:
+            normalized[col] = series
+    return pd.DataFrame(normalized).sort_values('id', kind='stable').reset_index(drop=True)
+
+def assert_same_rows(actual, expected):
+    """Verifica che due risultati della trasformazione abbiano le stesse righe e colonne."""
+    pd.testing.assert_frame_equal(normalize(actual[expected.columns]), normalize(expected), check_dtype=False)
+
+@pytest.fixture(autouse=True)
+def metrics_in_tmp_path(tmp_path, monkeypatch):
+    """Le metriche delle esecuzioni di test non sovrascrivono quelle in data/."""
+    monkeypatch.setattr(config, 'METRICS_JSON_PATH', str(tmp_path / 'metriche_pipeline.json'))
+
+@pytest.fixture
+def dirty_frame():
+    return make_dirty_frame()
+
+@pytest.fixture
+def dirty_csv(tmp_path, dirty_frame):
+    path = tmp_path / 'input.csv'
+    dirty_frame.to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture
+def make_pipeline(tmp_path):
+    """Crea orchestratori con database e visualizzazioni nella directory temporanea del test."""
+    def make(input_path, db_name='output.db', **kwargs):
+        pipeline = ETLPipelineOrchestrator(input_path, str(tmp_path / db_name), str(tmp_path / 'visualizzazioni'), **kwargs)
+        pipeline.transformer.current_time = NOW
+        return pipeline
+    return make
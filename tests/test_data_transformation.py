@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import config
+from src.data_extraction import DataExtractor
+from src.data_transformation import DataTransformer, SeenRowHashes, TransformAggregates
+from tests.conftest import NOW, assert_same_rows
+
+COMPARED_STATS = ('initial_rows', 'rows_after_validation_and_cleaning', 'negative_salaries_handled',
+                  'future_hire_dates_handled', 'missing_stipendio_imputed_total',
+                  'missing_data_assunzione_imputed_total', 'duplicati_rimossi', 'conteggio_per_reparto_output')
+
+def make_transformer():
+    transformer = DataTransformer()
+    transformer.current_time = NOW
+    return transformer
+
+@pytest.fixture
+def reference(dirty_csv):
+    """Risultato della trasformazione in memoria (`transform_data`), riferimento per le altre modalità."""
+    raw, _ = DataExtractor(dirty_csv).extract_data()
+    return make_transformer().transform_data(raw)
+
+def assert_same_stats(actual, expected):
+    for key in COMPARED_STATS:
+        assert actual[key] == expected[key], key
+
+def test_reference_handles_dirty_rows(reference):
+    df, stats = reference
+    assert stats['initial_rows'] == 280
+    assert stats['duplicati_rimossi'] == 40
+    assert stats['negative_salaries_handled'] == 4
+    assert stats['future_hire_dates_handled'] == 3
+    assert df[[config.SALARY_COLUMN, config.HIRE_DATE_COLUMN]].notna().all().all()
+    assert df[config.AGE_COLUMN].between(18, 100).all()
+    assert df[config.DEPARTMENT_COLUMN].notna().all()
+
+def test_parallel_matches_in_memory(dirty_csv, reference):
+    raw, _ = DataExtractor(dirty_csv).extract_data()
+    df, stats = make_transformer().transform_data_parallel(raw, max_workers=2)
+    assert_same_rows(df, reference[0])
+    assert_same_stats(stats, reference[1])
+
+@pytest.mark.parametrize('chunksize', [37, 1000])
+def test_chunked_matches_in_memory(dirty_csv, reference, chunksize):
+    transformer = make_transformer()
+    extractor = DataExtractor(dirty_csv)
+    aggregates = transformer.collect_aggregates(extractor.extract_chunks(chunksize))
+    df = pd.concat(transformer.transform_chunks(extractor.extract_chunks(chunksize), aggregates), ignore_index=True)
+    assert_same_rows(df, reference[0])
+    assert_same_stats(transformer.last_transform_stats, reference[1])
+
+def test_seen_row_hashes_matches_set():
+    rng = np.random.default_rng(0)
+    seen, expected = SeenRowHashes(), set()
+    for _ in range(5):
+        # Valori ripetuti nel lotto e oltre 2**63 (bit alto impostato)
+        batch = rng.integers(0, 2**64 - 1, size=200, dtype='uint64', endpoint=True)
+        batch[:50] = batch[50:100]
+        probe = np.concatenate([batch, np.fromiter(expected, dtype='uint64', count=len(expected))[:30]])
+        assert (seen.contains(probe) == np.array([value in expected for value in probe.tolist()])).all()
+        seen.add(batch)
+        expected.update(batch.tolist())
+    assert len(seen) == len(expected)
+    assert (np.diff(seen.hashes.astype('float64')) >= 0).all()
+
+def test_seen_row_hashes_empty():
+    seen = SeenRowHashes()
+    assert not seen.contains(np.array([0, 2**64 - 1], dtype='uint64')).any()
+    seen.add(np.empty(0, dtype='uint64'))
+    assert len(seen) == 0
+
+def exact_median(values):
+    ordered = np.sort(values.astype('datetime64[ns]').astype('int64'))
+    middle = len(ordered) // 2
+    lower, upper = (ordered[middle - 1], ordered[middle]) if len(ordered) % 2 == 0 else (ordered[middle],) * 2
+    return pd.Timestamp((int(lower) + int(upper)) // 2, unit='ns')
+
+def hire_date_frame(rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        config.DEPARTMENT_COLUMN: rng.choice(['A', 'B', 'C'], size=rows),
+        config.SALARY_COLUMN: rng.uniform(20000, 60000, size=rows),
+        # Poche date distinte e ripetute, come nei dati reali
+        config.HIRE_DATE_COLUMN: pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 60, size=rows), unit='D'),
+    })
+
+@pytest.mark.parametrize('rows', [1, 2, 101, 1000])
+def test_histogram_medians_are_exact(rows):
+    df = hire_date_frame(rows, seed=rows)
+    aggregates = TransformAggregates()
+    for start in range(0, rows, 97):
+        aggregates.update(df.iloc[start:start + 97])
+    by_department = aggregates.hire_date_median_by_department()
+    for department, group in df.groupby(config.DEPARTMENT_COLUMN):
+        assert by_department[department] == exact_median(group[config.HIRE_DATE_COLUMN].to_numpy())
+    assert aggregates.global_hire_date_median() == exact_median(df[config.HIRE_DATE_COLUMN].to_numpy())
+
+def test_aggregates_subtract_and_merge():
+    df = hire_date_frame(500, seed=1)
+    removed, kept = df.iloc[:180], df.iloc[180:]
+    incremental = TransformAggregates()
+    incremental.update(df)
+    incremental.update(removed, sign=-1)
+    merged = TransformAggregates()
+    for part in (kept.iloc[:100], kept.iloc[100:]):
+        partial = TransformAggregates()
+        partial.update(part)
+        merged.merge(partial)
+    direct = TransformAggregates()
+    direct.update(kept)
+    for aggregates in (incremental, merged):
+        pd.testing.assert_series_equal(aggregates.hire_date_median_by_department().sort_index(),
+                                       direct.hire_date_median_by_department().sort_index())
+        pd.testing.assert_series_equal(aggregates.salary_mean_by_department().sort_index(),
+                                       direct.salary_mean_by_department().sort_index())
+        assert aggregates.global_hire_date_median() == exact_median(kept[config.HIRE_DATE_COLUMN].to_numpy())
+    assert all(count > 0 for counts in incremental.hire_date_counts.values() for count in counts.values())
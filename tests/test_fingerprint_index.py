@@ -0,0 +1,97 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from src import config
+from src.fingerprint_index import RowFingerprintIndex
+from tests.conftest import make_dirty_frame
+
+@pytest.fixture
+def index():
+    conn = sqlite3.connect(':memory:')
+    fingerprint_index = RowFingerprintIndex(conn)
+    fingerprint_index.create()
+    yield fingerprint_index
+    conn.close()
+
+def test_contains_and_add(index):
+    # Impronte uint64 oltre 2**63: memorizzate come INTEGER con segno
+    first = np.array([0, 1, 2**63, 2**64 - 1, 12345], dtype='uint64')
+    assert index.exists()
+    assert not index.contains(first).any()
+    index.add(np.concatenate([first, first[:2]]))
+    assert index.count() == len(first)
+    probe = np.array([2**64 - 1, 7, 1, 2**63 + 1, 1], dtype='uint64')
+    assert index.contains(probe).tolist() == [True, False, True, False, True]
+    index.add(probe)
+    assert index.count() == len(first) + 2
+
+def test_empty_batches(index):
+    empty = np.empty(0, dtype='uint64')
+    assert index.contains(empty).shape == (0,)
+    index.add(empty)
+    assert index.count() == 0
+
+def test_large_batch(index):
+    hashes = np.random.default_rng(0).integers(0, 2**64 - 1, size=50_000, dtype='uint64', endpoint=True)
+    index.add(hashes[:25_000])
+    assert index.contains(hashes).sum() == len(np.unique(hashes[:25_000]))
+
+def run_append(make_pipeline, path, db_name='accodamento.db', chunksize=41):
+    pipeline = make_pipeline(path, db_name)
+    pipeline.run_etl_append(chunksize=chunksize)
+    return pipeline
+
+def test_append_rejects_rows_loaded_by_earlier_runs(tmp_path, make_pipeline):
+    df = make_dirty_frame()
+    paths = {name: str(tmp_path / f'{name}.csv') for name in ('primo', 'secondo', 'unione')}
+    first, second = df.iloc[:180], df.iloc[120:]
+    first.to_csv(paths['primo'], index=False)
+    second.to_csv(paths['secondo'], index=False)
+    pd.concat([first, second]).to_csv(paths['unione'], index=False)
+
+    stats_first = run_append(make_pipeline, paths['primo']).transform_stats
+    stats_second = run_append(make_pipeline, paths['secondo']).transform_stats
+    single = make_pipeline(paths['unione'], 'unico.db')
+    single.run_etl_out_of_core(chunksize=41)
+
+    assert stats_first['duplicati_tra_esecuzioni'] == 0
+    assert stats_second['duplicati_tra_esecuzioni'] > 0
+    assert (stats_first['duplicati_rimossi'] + stats_second['duplicati_rimossi']
+            == single.transform_stats['duplicati_rimossi'])
+    query = 'SELECT id, nome, cognome, eta, reparto FROM dipendenti ORDER BY id, nome'
+    with sqlite3.connect(tmp_path / 'accodamento.db') as conn:
+        appended = pd.read_sql_query(query, conn)
+        loaded_rows = conn.execute('SELECT COUNT(*) FROM dipendenti').fetchone()[0]
+        assert conn.execute(f'SELECT COUNT(*) FROM {config.FINGERPRINT_TABLE}').fetchone()[0] == loaded_rows
+    with sqlite3.connect(tmp_path / 'unico.db') as conn:
+        pd.testing.assert_frame_equal(appended, pd.read_sql_query(query, conn))
+
+    # Lo stesso lotto accodato di nuovo non aggiunge righe
+    stats_again = run_append(make_pipeline, paths['secondo']).transform_stats
+    assert stats_again['rows_after_validation_and_cleaning'] == 0
+    with sqlite3.connect(tmp_path / 'accodamento.db') as conn:
+        assert conn.execute('SELECT COUNT(*) FROM dipendenti').fetchone()[0] == loaded_rows
+
+def test_failed_append_rolls_back_rows_and_fingerprints(tmp_path, dirty_csv, make_pipeline):
+    run_append(make_pipeline, dirty_csv)
+    with sqlite3.connect(tmp_path / 'accodamento.db') as conn:
+        before = [conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                  for table in ('dipendenti', config.FINGERPRINT_TABLE)]
+
+    path = str(tmp_path / 'nuovo_lotto.csv')
+    make_dirty_frame(seed=11).assign(id=lambda df: df['id'] + 1000).to_csv(path, index=False)
+    pipeline = make_pipeline(path, 'accodamento.db')
+    append_chunk = pipeline.loader.append_chunk
+    calls = []
+    def failing_append(df):
+        calls.append(len(df))
+        if len(calls) == 2:
+            raise RuntimeError("errore simulato")
+        append_chunk(df)
+    pipeline.loader.append_chunk = failing_append
+    with pytest.raises(RuntimeError):
+        pipeline.run_etl_append(chunksize=41)
+    with sqlite3.connect(tmp_path / 'accodamento.db') as conn:
+        assert [conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('dipendenti', config.FINGERPRINT_TABLE)] == before
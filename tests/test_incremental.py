@@ -0,0 +1,93 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from src import config
+from tests.conftest import make_dirty_frame
+
+SUMMARY_TABLES = {'analisi_per_reparto': 'reparto', 'analisi_per_fascia_eta': 'fascia_eta', 'analisi_per_anzianita': 'anzianita'}
+
+def read_table(db_path, query):
+    with sqlite3.connect(db_path) as conn:
+        df = pd.read_sql_query(query, conn)
+    numeric = df.select_dtypes('number').columns
+    df[numeric] = df[numeric].astype('float64').round(6)
+    return df
+
+def assert_same_database(actual_db, expected_db):
+    """Stessa tabella `dipendenti` e stesse tabelle di riepilogo."""
+    query = 'SELECT * FROM dipendenti ORDER BY id'
+    pd.testing.assert_frame_equal(read_table(actual_db, query), read_table(expected_db, query))
+    for table, column in SUMMARY_TABLES.items():
+        query = f'SELECT * FROM {table} ORDER BY {column}'
+        pd.testing.assert_frame_equal(read_table(actual_db, query), read_table(expected_db, query))
+
+def assert_summaries_match_table(db_path):
+    """Le tabelle di riepilogo corrispondono a un raggruppamento di `dipendenti` da zero."""
+    for table, column in SUMMARY_TABLES.items():
+        summary = read_table(db_path, f'SELECT {column}, numero_dipendenti FROM {table} ORDER BY {column}')
+        grouped = read_table(db_path, f'SELECT {column}, COUNT(*) AS numero_dipendenti FROM dipendenti '
+                                      f'GROUP BY {column} ORDER BY {column}')
+        pd.testing.assert_frame_equal(summary, grouped)
+
+def modified_frame(df, seed=1):
+    """Eliminazioni, modifiche di stipendio e nuove righe rispetto a `df`."""
+    rng = np.random.default_rng(seed)
+    changed = df.drop(index=rng.choice(df.index, 30, replace=False))
+    rows = rng.choice(changed.index, 25, replace=False)
+    changed.loc[rows, 'stipendio'] = pd.to_numeric(changed.loc[rows, 'stipendio']) + 1000
+    new_rows = df.sample(15, random_state=3).assign(id=np.arange(10_000, 10_015), nome='Nuovo')
+    return pd.concat([changed, new_rows])
+
+@pytest.fixture
+def run_both(tmp_path, make_pipeline):
+    """Carica lo stesso input in modo incrementale (database persistente) e completo (database nuovo)."""
+    def run(df):
+        path = str(tmp_path / 'input.csv')
+        df.to_csv(path, index=False)
+        incremental = make_pipeline(path, 'incrementale.db')
+        incremental.run_etl_incremental()
+        make_pipeline(path, 'completo.db').run_etl()
+        return incremental
+    return run
+
+def test_incremental_matches_full_load(tmp_path, run_both):
+    base = make_dirty_frame()
+    steps = [
+        base,
+        modified_frame(base),
+        # Un reparto rimosso e uno con soli stipendi mancanti: cambiano le medie usate per l'imputazione
+        modified_frame(base)[lambda df: df['reparto'] != 'Marketing'].assign(
+            stipendio=lambda df: df['stipendio'].mask(df['reparto'] == 'Vendite')),
+    ]
+    for step, df in enumerate(steps):
+        pipeline = run_both(df)
+        if step:
+            # Solo il delta viene trasformato
+            assert 0 < len(pipeline.transformed_data) < len(df) // 2
+        assert_same_database(tmp_path / 'incrementale.db', tmp_path / 'completo.db')
+        assert_summaries_match_table(tmp_path / 'incrementale.db')
+
+def test_incremental_rerun_is_a_no_op(tmp_path, run_both):
+    base = make_dirty_frame()
+    run_both(base)
+    pipeline = run_both(base)
+    assert len(pipeline.transformed_data) == 0
+    assert pipeline.transform_stats['duplicati_tra_esecuzioni'] == 0
+    assert_same_database(tmp_path / 'incrementale.db', tmp_path / 'completo.db')
+
+def test_incremental_requires_unique_ids(tmp_path, make_pipeline):
+    path = str(tmp_path / 'input.csv')
+    make_dirty_frame().assign(id=1).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        make_pipeline(path).run_etl_incremental()
+
+def test_out_of_core_matches_full_load(tmp_path, dirty_csv, make_pipeline):
+    make_pipeline(dirty_csv, 'completo.db').run_etl()
+    pipeline = make_pipeline(dirty_csv, 'blocchi.db')
+    pipeline.run_etl_out_of_core(chunksize=37)
+    assert pipeline.transformed_data is None
+    assert_same_database(tmp_path / 'blocchi.db', tmp_path / 'completo.db')
+    with sqlite3.connect(tmp_path / 'blocchi.db') as conn:
+        version = conn.execute(f"SELECT valore FROM {config.METADATA_TABLE} WHERE chiave = 'versione_dati'").fetchone()
+    assert version is not None
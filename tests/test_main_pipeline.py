@@ -0,0 +1,128 @@
+import os
+import shutil
+import sqlite3
+import pandas as pd
+import pytest
+from src import config
+from src.data_loading import ParquetSink
+from tests.conftest import normalize
+
+def fail(*args, **kwargs):
+    raise RuntimeError("fase eseguita di nuovo")
+
+def read_dipendenti(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return pd.read_sql_query('SELECT * FROM dipendenti ORDER BY id', conn)
+
+def run_etl_stage(pipeline, **kwargs):
+    """Esegue `run_full_pipeline` senza report; restituisce True se l'estrazione è stata eseguita."""
+    extract_data = pipeline.extractor.extract_data
+    calls = []
+    def spy():
+        calls.append(True)
+        return extract_data()
+    pipeline.extractor.extract_data = spy
+    pipeline.run_full_pipeline(stages='etl', **kwargs)
+    return bool(calls)
+
+def test_unchanged_run_is_skipped(dirty_csv, make_pipeline, monkeypatch):
+    assert run_etl_stage(make_pipeline(dirty_csv))
+    assert not run_etl_stage(make_pipeline(dirty_csv))
+    assert run_etl_stage(make_pipeline(dirty_csv), force=True)
+    # Stesso contenuto con una data di modifica diversa: l'impronta non cambia
+    os.utime(dirty_csv, ns=(10**18, 10**18))
+    assert not run_etl_stage(make_pipeline(dirty_csv))
+
+    hours_per_week = config.HOURS_PER_WEEK
+    monkeypatch.setattr(config, 'HOURS_PER_WEEK', hours_per_week - 2)
+    assert run_etl_stage(make_pipeline(dirty_csv))
+    monkeypatch.setattr(config, 'HOURS_PER_WEEK', hours_per_week)
+    assert run_etl_stage(make_pipeline(dirty_csv))
+    assert not run_etl_stage(make_pipeline(dirty_csv))
+
+    with open(dirty_csv, 'a', encoding='utf-8') as f:
+        f.write('99999,Mario,Rossi,40,50000,2010-01-01,Legale\n')
+    assert run_etl_stage(make_pipeline(dirty_csv))
+
+def test_run_after_other_load_is_not_skipped(dirty_csv, make_pipeline):
+    assert run_etl_stage(make_pipeline(dirty_csv))
+    # Un lotto accodato cambia la tabella: l'esecuzione registrata non corrisponde più al database
+    make_pipeline(dirty_csv).run_full_pipeline(stages='etl', load_mode='append', force=True)
+    assert run_etl_stage(make_pipeline(dirty_csv))
+    # Un caricamento incrementale dello stesso input produce la stessa tabella
+    make_pipeline(dirty_csv).run_full_pipeline(stages='etl', load_mode='incremental', force=True)
+    assert not run_etl_stage(make_pipeline(dirty_csv))
+
+def test_missing_visualizations_are_regenerated_without_etl(tmp_path, dirty_csv, make_pipeline):
+    make_pipeline(dirty_csv).run_full_pipeline()
+    charts = sorted(name for name in os.listdir(tmp_path / 'visualizzazioni') if name.endswith('.png'))
+    assert charts
+    os.remove(tmp_path / 'visualizzazioni' / charts[0])
+
+    pipeline = make_pipeline(dirty_csv)
+    pipeline.extractor.extract_data = pipeline.loader.load_data = fail
+    pipeline.run_full_pipeline()
+    assert sorted(name for name in os.listdir(tmp_path / 'visualizzazioni') if name.endswith('.png')) == charts
+
+    pipeline = make_pipeline(dirty_csv)
+    pipeline.extractor.extract_data = pipeline.reporter.generate_visualizations = fail
+    pipeline.run_full_pipeline()
+
+def read_parquet_dataset(path):
+    return normalize(pd.read_parquet(path))
+
+def test_skipped_run_rewrites_missing_parquet_output(tmp_path, dirty_csv, make_pipeline):
+    parquet_dir = str(tmp_path / 'dipendenti_parquet')
+    assert run_etl_stage(make_pipeline(dirty_csv, extra_sinks=[ParquetSink(parquet_dir)]))
+    expected = read_parquet_dataset(parquet_dir)
+
+    shutil.rmtree(parquet_dir)
+    pipeline = make_pipeline(dirty_csv, extra_sinks=[ParquetSink(parquet_dir)])
+    assert not run_etl_stage(pipeline)
+    pd.testing.assert_frame_equal(read_parquet_dataset(parquet_dir), expected)
+
+    # Output intatto: nessuna riscrittura
+    signature = ParquetSink(parquet_dir).output_signature()
+    pipeline = make_pipeline(dirty_csv, extra_sinks=[ParquetSink(parquet_dir)])
+    pipeline.loader.read_table_chunks = fail
+    assert not run_etl_stage(pipeline)
+    assert ParquetSink(parquet_dir).output_signature() == signature
+
+@pytest.fixture
+def checkpoint_pipeline(tmp_path, dirty_csv, make_pipeline):
+    return lambda: make_pipeline(dirty_csv, checkpoint_dir=str(tmp_path / 'checkpoint'))
+
+def test_resume_skips_completed_stages(tmp_path, dirty_csv, make_pipeline, checkpoint_pipeline):
+    make_pipeline(dirty_csv, 'riferimento.db').run_full_pipeline(stages='etl')
+    checkpoint_dir = tmp_path / 'checkpoint'
+
+    pipeline = checkpoint_pipeline()
+    pipeline.loader.load_data = fail
+    with pytest.raises(RuntimeError):
+        pipeline.run_full_pipeline(stages='etl')
+    assert pipeline.checkpoints.completed('transform') and not pipeline.checkpoints.completed('load')
+
+    pipeline = checkpoint_pipeline()
+    pipeline.extractor.extract_data = pipeline.transformer.transform_data = fail
+    pipeline.run_full_pipeline(stages='etl', resume=True)
+    assert 'transform' in pipeline.resumed_stages and 'load' not in pipeline.resumed_stages
+    pd.testing.assert_frame_equal(read_dipendenti(tmp_path / 'output.db'), read_dipendenti(tmp_path / 'riferimento.db'))
+    assert not checkpoint_dir.exists()
+
+def test_resume_restarts_when_input_changes(dirty_csv, checkpoint_pipeline):
+    pipeline = checkpoint_pipeline()
+    pipeline.loader.load_data = fail
+    with pytest.raises(RuntimeError):
+        pipeline.run_full_pipeline(stages='etl')
+
+    with open(dirty_csv, 'a', encoding='utf-8') as f:
+        f.write('99999,Mario,Rossi,40,50000,2010-01-01,Legale\n')
+    pipeline = checkpoint_pipeline()
+    assert run_etl_stage(pipeline, resume=True)
+    assert pipeline.resumed_stages == []
+
+def test_invalid_options(dirty_csv, make_pipeline):
+    with pytest.raises(ValueError):
+        make_pipeline(dirty_csv).run_full_pipeline(stages='load')
+    with pytest.raises(ValueError):
+        make_pipeline(dirty_csv).run_full_pipeline(load_mode='streaming')